@@ -1,5 +1,7 @@
 import streamlit as st
 
+from ui.imports import warm_up
+
 # Configure page settings
 st.set_page_config(
     page_title="Welcome to Fast & Fair!",
@@ -7,6 +9,9 @@ st.set_page_config(
     layout="wide",
 )
 
+# Start importing the solver libraries of the algorithm pages in the background, once per server
+warm_up()
+
 # Disable the scrollbar for the Streamlit sidebar
 st.markdown(
     """
@@ -39,15 +44,15 @@ st.write("Let's take a quick tour of the app's components:")
 tab1, tab2, tab3 = st.tabs(["App 1", "App 2", "App 3"])
 with tab1:
     image = "./resource/layout1.png"
-    st.image(image, caption="App Layout", use_column_width=True)
+    st.image(image, caption="App Layout", width="stretch")
 
 with tab2:
     image = "./resource/layout2.png"
-    st.image(image, caption="App Layout", use_column_width=True)
+    st.image(image, caption="App Layout", width="stretch")
 
 with tab3:
     image = "./resource/layout3.png"
-    st.image(image, caption="App Layout", use_column_width=True)
+    st.image(image, caption="App Layout", width="stretch")
 
 st.markdown(
     "- **Sidebar**: On the left, you'll find a handy sidebar for easy navigation.")
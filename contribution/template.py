@@ -9,6 +9,11 @@ import numpy as np
 import pandas as pd
 import streamlit as st
 
+# Largest instance the page accepts: use these as the max_value of the number inputs. The performance
+# check of pull requests (python -m core.conformance) runs the algorithm and its checker up to them.
+MAX_AGENTS = 100
+MAX_ITEMS = 1000
+
 # Load Preferences
 def load_preferences(m, n, upload_preferences):
     # Load preferences from file or user input
@@ -0,0 +1,11 @@
+"""
+The allocation algorithms behind the app pages, free of any Streamlit code.
+
+Every algorithm takes NumPy arrays (agents along the rows) and returns NumPy
+arrays, so it can be imported, benchmarked and run in batch jobs without
+rendering a page. The solver libraries (networkz, fairpyx) are only imported
+when their algorithm runs (see core.imports), which keeps `import core.algorithms` cheap.
+
+Outcomes are either bundles - a list with one int64 array of item indices per
+agent - or, for matchings, one item index per agent (-1 when unmatched).
+"""
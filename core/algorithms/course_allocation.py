@@ -0,0 +1,117 @@
+"""
+Course allocation with the fairpyx algorithms (page 5).
+
+Students are the agents and courses the items; both have capacities, and
+courses may clash with each other (see core.conflicts).
+"""
+import numpy as np
+
+from core import conflicts
+from core.imports import timed_import
+
+# algorithm name -> function name in fairpyx.algorithms
+ALGORITHMS = {
+    "Iterated maximum matching unadjusted": "iterated_maximum_matching_unadjusted",
+    "Iterated maximum matching adjusted": "iterated_maximum_matching_adjusted",
+    "Serial dictatorship": "serial_dictatorship",
+    "Round robin": "round_robin",
+    "Bidirectional round robin": "bidirectional_round_robin",
+    "Utilitarian matching": "utilitarian_matching",
+}
+
+
+# fairpyx instance over "Student i" / "Course j"; capacities are (m, 1) / (n, 1) arrays,
+# `courses_conflicts` holds a clash bitset per course
+def make_instance(courses_capacities, students_capacities, preferences, courses_conflicts=None):
+    fairpyx = timed_import("fairpyx")
+
+    n, m = preferences.shape
+    students = [f"Student {i+1}" for i in range(n)]
+    courses = [f"Course {j+1}" for j in range(m)]
+    student_index = {student: i for i, student in enumerate(students)}
+    course_index = {course: j for j, course in enumerate(courses)}
+    courses_conflicts = courses_conflicts or [0] * m
+
+    # Valuations are read from the array on demand rather than copied into n*m nested dicts
+    return fairpyx.Instance(
+        agents=students,
+        items=courses,
+        agent_capacities={student: int(students_capacities[i, 0]) for i, student in enumerate(students)},
+        valuations=lambda student, course: int(preferences[student_index[student], course_index[course]]),
+        item_capacities={course: int(courses_capacities[j, 0]) for j, course in enumerate(courses)},
+        item_conflicts={course: {courses[k] for k in conflicts.conflicting_courses(courses_conflicts[j])}
+                        for j, course in enumerate(courses)},
+    )
+
+
+# Run the chosen algorithms; returns {name: (bundles, explanation logger or None)} and the instance,
+# where bundles hold the course indices of every student. Explanations are recorded for the
+# iterated maximum matching algorithms when `explain` is set.
+def algorithm(courses_capacities, students_capacities, preferences, algo_names, courses_conflicts=None, explain=True):
+    fairpyx = timed_import("fairpyx")
+
+    from core.explanations import RecordingExplanationLogger
+
+    instance = make_instance(courses_capacities, students_capacities, preferences, courses_conflicts)
+    allocations = {}
+    for algo_name in algo_names:
+        function = getattr(fairpyx.algorithms, ALGORITHMS[algo_name])
+        explanation_logger = None
+        if explain and algo_name.startswith("Iterated maximum matching"):
+            # Explanations are recorded compactly and rendered per student on demand
+            explanation_logger = RecordingExplanationLogger(instance.agents, language="en")
+            allocation = fairpyx.divide(algorithm=function, instance=instance, explanation_logger=explanation_logger)
+        else:
+            allocation = fairpyx.divide(algorithm=function, instance=instance)
+        allocations[algo_name] = (to_bundles(allocation, len(preferences)), explanation_logger)
+    return allocations, instance
+
+
+# Course indices of every student from a fairpyx allocation {"Student i": ["Course j", ...]}
+def to_bundles(allocation, n):
+    return [np.array(sorted(int(course.split()[1]) - 1 for course in allocation.get(f"Student {i+1}", [])),
+                     dtype=np.int64)
+            for i in range(n)]
+
+
+# fairpyx allocation {"Student i": ["Course j", ...]} from bundles of course indices
+def to_allocation(bundles):
+    return {f"Student {i+1}": [f"Course {j+1}" for j in bundle.tolist()] for i, bundle in enumerate(bundles)}
+
+
+# Summary of every algorithm: utilitarian / egalitarian value, max / mean envy, and students with clashing courses
+def algorithm_checker(instance, allocations, courses_conflicts):
+    fairpyx = timed_import("fairpyx")
+
+    result_vector = []
+    for algo_name, (bundles, _) in allocations.items():
+        matrix = fairpyx.AgentBundleValueMatrix(instance, to_allocation(bundles))
+        values = np.round([matrix.utilitarian_value(),
+                           matrix.egalitarian_value(),
+                           matrix.max_envy(),
+                           matrix.mean_envy()])
+        clashes = sum(conflicts.has_clash(courses_conflicts, bundle.tolist()) for bundle in bundles)
+        result_vector.append([algo_name] + list(values) + [clashes])
+    return result_vector
+
+
+# Summary for large instances - vectorized, and without the n*n envy matrix of AgentBundleValueMatrix:
+# mean / smallest value as a percentage of the student's best possible value, fully served students,
+# mean courses per student and students with clashing courses
+def large_algorithm_checker(allocations, preferences, students_capacities, courses_conflicts):
+    n, m = preferences.shape
+    capacities = students_capacities[:, 0].astype(np.int64)
+    # The maximum possible value of a student is the sum of its top-capacity values
+    top_values = np.cumsum(-np.sort(-preferences, axis=1), axis=1, dtype=np.int64)
+    maximum_values = top_values[np.arange(n), np.clip(capacities, 1, m) - 1]
+    result_vector = []
+    for algo_name, (bundles, _) in allocations.items():
+        sizes = np.array([len(bundle) for bundle in bundles])
+        rows = np.repeat(np.arange(n), sizes)
+        cols = np.concatenate(bundles) if bundles else np.empty(0, dtype=np.int64)
+        values = np.bincount(rows, weights=preferences[rows, cols], minlength=n)
+        normalized = np.divide(values * 100, maximum_values, out=np.zeros(n), where=maximum_values > 0)
+        clashes = sum(conflicts.has_clash(courses_conflicts, bundle.tolist()) for bundle in bundles)
+        result_vector.append([algo_name, np.round(normalized.mean()), np.round(normalized.min()),
+                              int((sizes >= capacities).sum()), round(float(sizes.mean()), 2), clashes])
+    return result_vector
@@ -0,0 +1,43 @@
+"""
+Weighted picking sequence for WEF(x, 1-x) goods allocation (page 1).
+
+Chakraborty, Segal-Halevi and Suksompong, "Weighted Fairness Notions for
+Indivisible Items Revisited", AAAI 2022.
+"""
+import numpy as np
+
+
+# Agents pick in turn: the next picker minimizes (t_i + 1 - x) / w_i, and takes its most valued remaining item.
+# `weights` has one entry per agent, `preferences` is agents x items; returns the bundles in picking order.
+def wef1x_algorithm(x, weights, preferences):
+    preferences = np.asarray(preferences)
+    weights = np.asarray(weights, dtype=np.float64)
+    n, m = preferences.shape
+    # taken items are masked out, so argmax finds the first most valued remaining item
+    values = preferences.astype(np.float64)
+    times = np.zeros(n)
+    picks = [[] for _ in range(n)]
+    for _ in range(m):
+        i = np.argmin((times + (1 - x)) / weights)
+        o = np.argmax(values[i])
+        picks[i].append(o)
+        values[:, o] = -np.inf
+        times[i] += 1
+    return [np.array(bundle, dtype=np.int64) for bundle in picks]
+
+
+# Whether the bundles satisfy WEF(x, 1-x) for every pair of agents
+def wef1x_checker(bundles, x, weights, preferences):
+    preferences = np.asarray(preferences)
+    weights = np.asarray(weights, dtype=np.float64)
+    y = 1 - x
+    n = len(bundles)
+    for i in range(n):
+        own = preferences[i, bundles[i]].sum() / weights[i]
+        for j in range(n):
+            if i == j or len(bundles[j]) == 0:
+                continue
+            values = preferences[i, bundles[j]]
+            if values.sum() / weights[j] - own > (y / weights[i] + x / weights[j]) * values.max():
+                return False
+    return True
@@ -0,0 +1,87 @@
+"""
+Envy-free house assignment (page 3).
+
+Each round matches every agent to one of its top houses among those left; when
+no agent-saturating matching exists, the houses reachable from an unmatched
+agent are discarded and the round is repeated.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+
+# `orderings` is agents x houses (1 = best). Returns the house of every agent (-1: none)
+# and whether the assignment is envy-free (otherwise it is the last partial matching).
+def compute_envyfree_assignment(orderings):
+    orderings = np.asarray(orderings)
+    n, m = orderings.shape
+    M = list(range(m))
+    matching = {}
+    while n <= len(M):
+        # top houses of every agent among the houses left
+        left = orderings[:, M]
+        top = left == left.min(axis=1, keepdims=True)
+        edges_nm = defaultdict(list)
+        edges_mn = defaultdict(list)
+        for k, m_ in enumerate(M):
+            for i in np.flatnonzero(top[:, k]).tolist():
+                edges_nm[i].append(m_)
+                edges_mn[m_].append(i)
+
+        # Check if n-saturating matching exists
+        matching = dict()
+        houses_left = set(range(m))
+        for house, agents in edges_mn.items():
+            if len(agents) == 1 and agents[0] not in matching:
+                matching[agents[0]] = house
+                houses_left.remove(house)
+            else:
+                for agent in agents:
+                    if agent not in matching and len(edges_nm[agent]) == 1:
+                        matching[agent] = house
+                        houses_left.remove(house)
+                        break
+
+        for agent, houses in edges_nm.items():
+            if agent in matching:
+                continue
+            for house in houses:
+                if house in houses_left:
+                    matching[agent] = house
+                    houses_left.remove(house)
+                    break
+
+        if len(matching) == n:
+            return _houses(matching, n), True
+
+        # No n-saturating match exists
+        X_u = set(range(n)) - set(matching.keys())
+        assert len(X_u) > 0, "Unmatched vertices in X should not be empty"
+
+        edges = defaultdict(list)
+        for agent, houses in edges_nm.items():
+            for house in houses:
+                edges[agent].append(house + n)
+        for agent, house in matching.items():
+            edges[house + n].append(agent)
+
+        # vertices reachable from an unmatched agent (iterative DFS)
+        Z = set()
+        stack = [next(iter(X_u))]
+        while stack:
+            vert = stack.pop()
+            if vert in Z:
+                continue
+            Z.add(vert)
+            stack.extend(nbr for nbr in edges[vert] if nbr not in Z)
+        removed = {house for z in Z if z < n for house in edges_nm.get(z, [])}
+        M = [house for house in M if house not in removed]
+
+    return _houses(matching, n), False
+
+
+def _houses(matching, n):
+    houses = np.full(n, -1, dtype=np.int64)
+    for agent, house in matching.items():
+        houses[agent] = house
+    return houses
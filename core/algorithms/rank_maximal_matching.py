@@ -0,0 +1,35 @@
+"""
+Rank-maximal matching of agents to items (page 4), computed with networkz.
+
+A rank-maximal matching maximizes the number of agents matched to their
+1st-ranked item, then to their 2nd-ranked item, and so on.
+"""
+import numpy as np
+
+from core.imports import timed_import
+
+
+# `preferences` is agents x items, holding the rank of every item (1 = best).
+# Returns the item of every agent (-1: unmatched).
+def algorithm(preferences):
+    nx = timed_import("networkz")
+
+    preferences = np.asarray(preferences)
+    n, m = preferences.shape
+    # agents are the nodes 0..n-1 and items the nodes n..n+m-1
+    G = nx.Graph()
+    G.add_edges_from((i, n + j, {"rank": int(preferences[i, j])}) for i in range(n) for j in range(m))
+    M = nx.rank_maximal_matching(G=G, top_nodes=range(n), rank="rank")
+    items = np.full(n, -1, dtype=np.int64)
+    for i in range(n):
+        if i in M:
+            items[i] = M[i] - n
+    return items
+
+
+# Rank signature of the matching: how many agents got an item of each rank
+def algorithm_checker(items, preferences):
+    items = np.asarray(items)
+    agents = np.flatnonzero(items >= 0)
+    ranks, counts = np.unique(np.asarray(preferences)[agents, items[agents]], return_counts=True)
+    return dict(zip(ranks.tolist(), counts.tolist()))
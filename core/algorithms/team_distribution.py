@@ -0,0 +1,41 @@
+"""
+EF[1,1] and swap-stable balanced team formation (page 2).
+
+Teams pick players in round-robin order; a player tied between several teams
+goes to the team it ranks best.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+
+# `preferences` is teams x players (the teams' values), `ranks` is players x teams (1 = favourite team).
+# Returns the players of every team.
+def compute_EF11_ssba(preferences, ranks):
+    preferences, ranks = np.asarray(preferences), np.asarray(ranks)
+    n, m = preferences.shape
+    Q = list(range(n)) * (m // n) + list(range(n))[:(m % n)]
+    P = np.arange(m)
+    available = np.ones(m, dtype=bool)
+    match = {}
+    for turn in range(m):
+        values = preferences[Q[turn], P[available]]
+        players = P[available][values == values.max()]
+        match[turn] = players
+        available[players[0]] = False
+
+    rev_match = defaultdict(list)
+    for turn, players in match.items():
+        for player in players.tolist():
+            rev_match[player].append(turn)
+
+    final_match = [[] for _ in range(n)]
+    for player, turns in rev_match.items():
+        if len(turns) == 1:
+            final_match[Q[turns[0]]].append(player)
+    for player, turns in rev_match.items():
+        if len(turns) > 1:
+            real_teams = [Q[turn] for turn in turns]
+            final_match[real_teams[np.argmin(ranks[player][real_teams])]].append(player)
+
+    return [np.array(players, dtype=np.int64) for players in final_match]
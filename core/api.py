@@ -0,0 +1,174 @@
+"""
+A local HTTP service running the allocation algorithms, next to the app.
+
+Every task of core.tasks has its endpoint, POST /<task>: picking, teams,
+houses, rmm and the fairpyx course allocation algorithms (e.g. /round_robin).
+GET /tasks lists the tasks with the arrays their instances need.
+
+The request body is one instance, or a batch of instances, either as JSON
+
+    {"preferences": [[5, 1], [2, 7]], "weights": [1, 2]}
+    {"instances": [{...}, {...}]}
+
+or as a NumPy .npz file (Content-Type: application/x-npz) holding the arrays
+of one instance, or of a batch with array names "<index>/<name>". Add
+?metrics=0 to skip the fairness metrics. The response is JSON: the outcome,
+metrics and run time of the instance, or {"results": [...]} for a batch.
+
+The instances are solved by a pool of worker processes; every connection is
+served by its own thread, which waits for the pool.
+
+    python -m core.api --port 8502 --workers 4
+"""
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from core import imports, tasks
+
+DEFAULT_PORT = 8502
+# Largest request body accepted
+MAX_BODY_BYTES = 64 * 2**20
+NPZ_TYPE = "application/x-npz"
+
+
+# Run the task on one instance (in a worker process); failures are reported in the result
+def solve(task, instance, metrics=True):
+    try:
+        start = time.perf_counter()
+        outcome, summary = tasks.run(task, instance, metrics)
+        result = {"seconds": time.perf_counter() - start}
+        if isinstance(outcome, np.ndarray):
+            result["matching"] = outcome.tolist()
+        else:
+            result["bundles"] = [bundle.tolist() for bundle in outcome]
+        # NaN (an unmeasured metric) is not valid JSON
+        result["metrics"] = {name: None if isinstance(value, float) and math.isnan(value) else value
+                             for name, value in summary.items()}
+        return result
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+# Instances of a request body: a list, and whether the body was a batch
+def parse_instances(body, content_type):
+    if content_type == NPZ_TYPE:
+        with np.load(io.BytesIO(body), allow_pickle=False) as arrays:
+            named = {name: arrays[name] for name in arrays.files}
+        if not all("/" in name for name in named):
+            return [named], False
+        batch = {}
+        for name, array in named.items():
+            index, _, array_name = name.partition("/")
+            batch.setdefault(int(index), {})[array_name] = array
+        return [batch[index] for index in sorted(batch)], True
+
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError("the body must be a JSON object")
+    batch = "instances" in payload
+    instances = payload["instances"] if batch else [payload]
+    if not isinstance(instances, list) or not all(isinstance(instance, dict) for instance in instances):
+        raise ValueError('"instances" must be a list of JSON objects')
+    return [{name: np.asarray(value) for name, value in instance.items()} for instance in instances], batch
+
+
+# JSON value of the NumPy scalars the metrics may hold
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# Import every solver library in the worker processes before the first request
+def _init_worker():
+    for name in imports.HEAVY_MODULES:
+        imports.timed_import(name)
+
+
+class Handler(BaseHTTPRequestHandler):
+    # set by serve()
+    pool = None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, default=_json_default).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.strip("/")
+        if path == "tasks":
+            self.send_json(200, {task: list(inputs) for task, inputs in tasks.INPUTS.items()})
+        elif path == "health":
+            self.send_json(200, {"status": "ok"})
+        else:
+            self.send_json(404, {"error": f"unknown path /{path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        task = url.path.strip("/")
+        if task not in tasks.TASKS:
+            self.send_json(404, {"error": f"unknown task {task!r}, see GET /tasks"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.send_json(413, {"error": f"the body is larger than {MAX_BODY_BYTES // 2**20} MB"})
+            return
+        metrics = parse_qs(url.query).get("metrics", ["1"])[0] not in ("0", "false")
+        content_type = (self.headers.get("Content-Type") or "application/json").split(";")[0].strip()
+        try:
+            instances, batch = parse_instances(self.rfile.read(length), content_type)
+        except Exception as e:
+            self.send_json(400, {"error": f"invalid body: {type(e).__name__}: {e}"})
+            return
+
+        n = len(instances)
+        results = list(self.pool.map(solve, [task] * n, instances, [metrics] * n))
+        if batch:
+            self.send_json(200, {"results": results})
+        else:
+            self.send_json(200 if "error" not in results[0] else 422, results[0])
+
+    # requests are not logged one by one (the load generator sends thousands)
+    def log_message(self, format, *args):
+        pass
+
+
+# Serve until interrupted
+def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=None):
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        Handler.pool = pool
+        with ThreadingHTTPServer((host, port), Handler) as server:
+            print(f"Serving {len(tasks.TASKS)} tasks at http://{host}:{server.server_port} "
+                  f"with {workers} worker processes.")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.api", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Offline batch runs of an algorithm over stored instances.
+
+Every instance is a NumPy .npz file holding the arrays listed in core.tasks.
+The instances are spread over a pool of worker processes in chunks, and one
+row per instance - its size, outcome, metrics and run time - is written to a
+columnar results file (Parquet or Arrow IPC, after its extension).
+
+    python -m core.batch instances/ round_robin -o results.parquet
+    python -m core.batch "instances/*.npz" picking --workers 8 --chunk-size 16
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core import tasks
+from core.formats import format_of, write_table
+
+# result file formats that keep the outcome columns as typed (nested) lists
+RESULT_FORMATS = ("Parquet", "Arrow IPC")
+
+
+# Instance files of a directory (all .npz files in it) or of a glob pattern, in a stable order
+def instance_files(source):
+    if os.path.isdir(source):
+        source = os.path.join(source, "*.npz")
+    return sorted(glob.glob(source))
+
+
+# Run the task on one instance file; failures are recorded in the row instead of stopping the batch
+def run_file(task, path):
+    row = {"instance": os.path.basename(path)}
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            instance = {name: arrays[name] for name in arrays.files}
+        first = instance.get("preferences", instance.get("orderings"))
+        row |= {"agents": first.shape[0], "items": first.shape[1]} if first is not None else {}
+        start = time.perf_counter()
+        outcome, metrics = tasks.run(task, instance)
+        row["seconds"] = time.perf_counter() - start
+        if isinstance(outcome, np.ndarray):
+            row["matching"] = outcome.tolist()
+        else:
+            row["bundles"] = [bundle.tolist() for bundle in outcome]
+        row |= metrics
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+# Run the task on every file with `workers` processes, sending the files in chunks of `chunk_size`
+# (default: about four chunks per worker). Returns the results table, in the order of the files.
+def run_batch(task, files, workers=None, chunk_size=None):
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, len(files) // (workers * 4))
+    if workers == 1:
+        tasks.import_solver(task)
+        rows = [run_file(task, path) for path in files]
+    else:
+        with ProcessPoolExecutor(workers, initializer=tasks.import_solver, initargs=(task,)) as pool:
+            rows = list(pool.map(run_file, [task] * len(files), files, chunksize=chunk_size))
+    results = pd.DataFrame(rows)
+    if "error" not in results:
+        results["error"] = None
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.batch", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="directory of .npz instances, or a glob pattern of instance files")
+    parser.add_argument("task", choices=list(tasks.TASKS), help="algorithm to run on every instance")
+    parser.add_argument("-o", "--output", default="results.parquet",
+                        help="results file, .parquet or .arrow (default: results.parquet)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("-c", "--chunk-size", type=int, default=None,
+                        help="instances sent to a worker at a time (default: about 4 chunks per worker)")
+    args = parser.parse_args(argv)
+
+    try:
+        fmt = format_of(args.output)
+    except ValueError as e:
+        parser.error(str(e))
+    if fmt not in RESULT_FORMATS:
+        parser.error(f"results are written as {' or '.join(RESULT_FORMATS)}, not {fmt}")
+    files = instance_files(args.source)
+    if not files:
+        parser.error(f"no instance files found at {args.source}")
+
+    start = time.perf_counter()
+    results = run_batch(args.task, files, args.workers, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    with open(args.output, "wb") as f:
+        f.write(write_table(results.set_index("instance"), fmt))
+
+    failed = int(results["error"].notna().sum())
+    print(f"{len(files)} instances ({failed} failed) in {elapsed:.2f} s: "
+          f"{len(files) / elapsed:.1f} instances/s. Results written to {args.output}.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Benchmarks of every allocation algorithm across instance size tiers.
+
+Each task of core.tasks is run on seeded random instances at four tiers -
+small, medium, the largest instance its page accepts, and twice that size -
+timing the algorithm alone (best of a few runs) and measuring its peak traced
+memory in a separate run. Every benchmark run is appended to a JSON history,
+and compared with a stored baseline run: results slower or larger than the
+baseline by more than the tolerances are flagged as regressions.
+
+    python -m core.benchmark                          # all tasks and tiers
+    python -m core.benchmark --tasks picking rmm --tiers small medium
+    python -m core.benchmark --save-baseline          # make this run the baseline
+
+Everything runs locally; the history and the baseline are kept in benchmarks/.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from core import tasks
+
+TIERS = ("small", "medium", "page-max", "beyond-page-max")
+
+# the largest instance (agents, items) of every task that its page accepts
+PAGE_MAX = {
+    "picking": (100, 1000),
+    "teams": (100, 1000),
+    "houses": (100, 1000),
+    "rmm": (500, 1000),
+} | {function: (500, 100) for function in tasks.FAIRPYX_TASKS}
+
+# timing runs of an instance: at most `repeat`, and no more once they took MIN_SECONDS together
+REPEAT = 5
+MIN_SECONDS = 1.0
+
+# a result is a regression when it exceeds the baseline by these fractions, and by more than the noise floors
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.10
+TIME_FLOOR = 0.005
+MEMORY_FLOOR = 2**20
+
+DIRECTORY = "benchmarks"
+
+
+# (agents, items) of a task at a tier
+def tier_size(task, tier):
+    n, m = PAGE_MAX[task]
+    return {
+        "small": (max(2, n // 20), max(3, m // 20)),
+        "medium": (n // 4, m // 4),
+        "page-max": (n, m),
+        "beyond-page-max": (2 * n, 2 * m),
+    }[tier]
+
+
+# Best time of the algorithm over a few runs, and its peak traced memory (NumPy buffers included) in one more run
+def measure(task, instance, repeat=REPEAT, min_seconds=MIN_SECONDS):
+    times = []
+    while len(times) < repeat and sum(times) < min_seconds:
+        start = time.perf_counter()
+        tasks.run(task, instance, metrics=False)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        tasks.run(task, instance, metrics=False)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+# Benchmark the tasks at the tiers; returns one record per (task, tier)
+def run_benchmarks(task_names, tiers, seed=0, repeat=REPEAT, log=print):
+    records = []
+    for task in task_names:
+        tasks.import_solver(task)
+        for tier in tiers:
+            n, m = tier_size(task, tier)
+            instance = tasks.random_instance(task, n, m, seed)
+            seconds, peak = measure(task, instance, repeat)
+            records.append({"task": task, "tier": tier, "agents": n, "items": m,
+                            "seconds": seconds, "peak_bytes": peak})
+            log(f"{task:40} {tier:16} {n:5} x {m:<5} {seconds:10.4f} s {peak / 2**20:10.2f} MB")
+    return records
+
+
+# Flag the records that regressed against the baseline records (matched by task and tier)
+def compare(records, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    base = {(record["task"], record["tier"]): record for record in baseline}
+    rows = []
+    for record in records:
+        before = base.get((record["task"], record["tier"]))
+        row = dict(record, time_ratio=np.nan, memory_ratio=np.nan, regression="")
+        if before is not None:
+            row["time_ratio"] = record["seconds"] / before["seconds"] if before["seconds"] else np.nan
+            row["memory_ratio"] = record["peak_bytes"] / before["peak_bytes"] if before["peak_bytes"] else np.nan
+            flags = []
+            if record["seconds"] > before["seconds"] * (1 + time_tolerance) \
+                    and record["seconds"] - before["seconds"] > TIME_FLOOR:
+                flags.append("time")
+            if record["peak_bytes"] > before["peak_bytes"] * (1 + memory_tolerance) \
+                    and record["peak_bytes"] - before["peak_bytes"] > MEMORY_FLOOR:
+                flags.append("memory")
+            row["regression"] = ", ".join(flags)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+# Where and on what the benchmarks ran
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_json(path, value):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(value, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.benchmark", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", nargs="+", choices=list(tasks.TASKS), default=list(tasks.TASKS),
+                        help="tasks to benchmark (default: all)")
+    parser.add_argument("--tiers", nargs="+", choices=TIERS, default=list(TIERS), help="size tiers (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random instances (default: 0)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help=f"timing runs per instance (default: {REPEAT})")
+    parser.add_argument("--history", default=os.path.join(DIRECTORY, "history.json"),
+                        help="JSON file the run is appended to")
+    parser.add_argument("--baseline", default=os.path.join(DIRECTORY, "baseline.json"),
+                        help="JSON file of the run to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE,
+                        help=f"allowed slowdown against the baseline (default: {TIME_TOLERANCE})")
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE,
+                        help=f"allowed memory growth against the baseline (default: {MEMORY_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    run = environment() | {"seed": args.seed}
+    run["results"] = run_benchmarks(args.tasks, args.tiers, args.seed, args.repeat)
+    save_json(args.history, load_json(args.history, []) + [run])
+
+    baseline = load_json(args.baseline, None)
+    if args.save_baseline or baseline is None:
+        save_json(args.baseline, run)
+        print(f"Baseline saved to {args.baseline}.")
+        return 0
+
+    report = compare(run["results"], baseline["results"], args.time_tolerance, args.memory_tolerance)
+    print(f"\nCompared with the baseline of {baseline['time']} (commit {baseline['commit']}):")
+    print(report[["task", "tier", "seconds", "time_ratio", "memory_ratio", "regression"]]
+          .to_string(index=False, float_format="{:.3f}".format))
+    regressions = report[report["regression"] != ""]
+    if len(regressions):
+        print(f"\n{len(regressions)} regression(s) against the baseline.")
+        return 1
+    print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
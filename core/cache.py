@@ -0,0 +1,132 @@
+"""
+A least-recently-used cache of computed values with a total byte budget.
+
+Values are stored under content hashes of their inputs (see content_hash), so
+identical inputs coming from different sessions share one entry. The size of
+every value is estimated when it is stored (see deep_sizeof); once the total
+exceeds the budget, the least recently used entries are evicted. Lookups,
+hits, misses and evictions are counted.
+"""
+import hashlib
+import sys
+import threading
+import types
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Hex digest identifying `parts` by content: arrays by dtype, shape and data, containers by their items
+def content_hash(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+
+    def update(part):
+        if isinstance(part, np.ndarray):
+            digest.update(f"ndarray{part.dtype.str}{part.shape}".encode())
+            digest.update(np.ascontiguousarray(part).data)
+        elif isinstance(part, (bytes, bytearray)):
+            digest.update(b"bytes%d:" % len(part) + part)
+        elif isinstance(part, (list, tuple)):
+            digest.update(b"%s%d:" % (type(part).__name__.encode(), len(part)))
+            for item in part:
+                update(item)
+        elif isinstance(part, dict):
+            digest.update(b"dict%d:" % len(part))
+            for key, value in part.items():
+                update(key)
+                update(value)
+        elif part is None or isinstance(part, (bool, int, float, str, np.generic)):
+            text = repr(part).encode()
+            digest.update(b"%s%d:" % (type(part).__name__.encode(), len(text)) + text)
+        else:
+            raise TypeError(f"cannot hash {type(part).__name__} by content")
+
+    update(parts)
+    return digest.hexdigest()
+
+
+# Approximate memory held by a value: arrays by their buffers, containers and objects by their contents
+def deep_sizeof(value):
+    seen = set()
+
+    def size(item):
+        if id(item) in seen:
+            return 0
+        seen.add(id(item))
+        if isinstance(item, np.ndarray):
+            return sys.getsizeof(item) + (item.nbytes if item.base is None else 0)
+        total = sys.getsizeof(item)
+        if isinstance(item, dict):
+            total += sum(size(key) + size(val) for key, val in item.items())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            total += sum(size(element) for element in item)
+        elif isinstance(item, types.FunctionType):
+            # a closure keeps the values it refers to alive
+            total += sum(size(cell.cell_contents) for cell in item.__closure__ or ())
+        elif hasattr(item, "__dict__") and not isinstance(item, type):
+            total += size(vars(item))
+        return total
+
+    return size(value)
+
+
+class LRUCache:
+    """Values by key, evicted least recently used first once they hold more than `max_bytes`."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    # The value under `key` (now the most recently used), or `default`
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    # Store a value; values larger than the whole budget are not stored
+    def put(self, key, value):
+        nbytes = deep_sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    # The value under `key`, computing and storing function(*args, **kwargs) on a miss
+    def get_or_compute(self, key, function, *args, **kwargs):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = function(*args, **kwargs)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    # Counters of the cache
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,68 @@
+"""
+Course conflicts stored as per-course bitsets.
+
+Bit j of masks[i] is set when courses i and j clash (0-based indices), and a
+bundle is itself a bitset of its courses, so a course fits a bundle exactly when
+`masks[i] & bundle == 0`. Python ints are used as the bitsets, which keeps the
+check a single AND for any number of courses.
+
+The bitsets are used when conflicts are ingested (pairs or time slots) and to
+count the clashing bundles of an outcome. The allocation algorithms themselves
+run in fairpyx, which checks feasibility with its own set-based
+`item_conflicts`; core.algorithms.course_allocation converts the bitsets to
+those sets when it builds the instance.
+"""
+import numpy as np
+
+
+def masks_from_pairs(pairs, m):
+    masks = [0] * m
+    for a, b in pairs:
+        if a == b:
+            continue
+        masks[a] |= 1 << b
+        masks[b] |= 1 << a
+    return masks
+
+
+def masks_from_slots(slots):
+    # Courses sharing a time slot clash with each other; negative slots mean "no slot"
+    slots = np.asarray(slots)
+    slot_masks = {}
+    for course in np.flatnonzero(slots >= 0):
+        slot_masks[slots[course]] = slot_masks.get(slots[course], 0) | (1 << int(course))
+    return [slot_masks[slot] & ~(1 << course) if slot >= 0 else 0
+            for course, slot in enumerate(slots)]
+
+
+def bundle_mask(courses):
+    mask = 0
+    for course in courses:
+        mask |= 1 << course
+    return mask
+
+
+def fits(masks, course, bundle):
+    return masks[course] & bundle == 0
+
+
+def has_clash(masks, courses):
+    bundle = 0
+    for course in courses:
+        if not fits(masks, course, bundle):
+            return True
+        bundle |= 1 << course
+    return False
+
+
+def conflicting_courses(mask):
+    courses = []
+    while mask:
+        low = mask & -mask
+        courses.append(low.bit_length() - 1)
+        mask ^= low
+    return courses
+
+
+def count_pairs(masks):
+    return sum(mask.bit_count() for mask in masks) // 2
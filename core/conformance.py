@@ -0,0 +1,303 @@
+"""
+Performance conformance check of a contributed page, for its pull request.
+
+A contributed page (see contribution/template.py) implements
+
+    algorithm(x, m, n, weights, preferences)
+    algorithm_checker(outcomes, x, m, n, weights, preferences)
+
+The page's imports, functions, classes and constants are loaded without its
+Streamlit interface, and both functions are run on seeded random instances of
+a growing size up to the page's declared caps: its MAX_AGENTS / MAX_ITEMS
+constants, or else the max_value of its "(n)" / "(m)" number inputs. Every
+size runs in its own worker process: both calls are timed first, then run
+again under tracemalloc for their peak memory, and the worker is killed when a
+call overruns the time budget (or a traced run takes far longer than its timed
+run, which leaves the memory unmeasured but does not fail the size). The
+algorithm and the checker must each stay within the time and (peak traced)
+memory budgets at every size; the Markdown report lists the measurements and
+the verdict, and can be attached to the pull request.
+
+    python -m core.conformance pages/8_📊_My_Algorithm.py
+    python -m core.conformance pages/8_📊_My_Algorithm.py --time-budget 2 --memory-budget 256 -o report.md
+"""
+import argparse
+import ast
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from core import generators
+from core.benchmark import environment
+from core.scaling import fit_power_law
+
+# Budgets of one call of the algorithm or of the checker, at any size
+TIME_BUDGET = 5.0
+MEMORY_BUDGET_MB = 512
+# Sizes are these fractions of the caps
+FRACTIONS = (1 / 16, 1 / 8, 1 / 4, 1 / 2, 1)
+# The value of x in WEF(x, 1-x) the instances use
+X = 0.5
+# Tracing memory slows allocation-heavy Python down several times: the traced run of a call may take
+# this many times its timed run
+MEMORY_SLOWDOWN = 10
+
+
+#--- Loading a page headlessly ---#
+
+# The statements of a page that define things without drawing anything: imports, functions, classes and
+# assignments of literal constants
+def _definitions(tree):
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            yield node
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None:
+            try:
+                ast.literal_eval(node.value)
+            except ValueError:
+                continue
+            yield node
+
+
+# Namespace of the page's definitions
+def load_page(path):
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    module = ast.Module(body=list(_definitions(tree)), type_ignores=[])
+    namespace = {"__name__": "contributed_page", "__file__": os.path.abspath(path)}
+    exec(compile(module, path, "exec"), namespace)
+    return namespace
+
+
+# max_value of the page's number input whose label contains `marker`, e.g. "(n)"
+def _input_cap(tree, marker):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, "attr", None) == "number_input" and node.args \
+                and isinstance(node.args[0], ast.Constant) and marker in str(node.args[0].value):
+            for keyword in node.keywords:
+                if keyword.arg == "max_value":
+                    try:
+                        return int(ast.literal_eval(keyword.value))
+                    except ValueError:
+                        return None
+    return None
+
+
+# The (n, m) caps the page declares; None where it declares none
+def declared_caps(path):
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            try:
+                constants[node.targets[0].id] = int(ast.literal_eval(node.value))
+            except (ValueError, TypeError):
+                continue
+    n_cap = constants.get("MAX_AGENTS") or _input_cap(tree, "(n)")
+    m_cap = constants.get("MAX_ITEMS") or _input_cap(tree, "(m)")
+    return n_cap, m_cap
+
+
+#--- Running ---#
+
+# Sizes (n, m) from a small fraction of the caps up to the caps
+def sizes(n_cap, m_cap, fractions=FRACTIONS):
+    return list(dict.fromkeys((max(2, round(n_cap * f)), max(2, round(m_cap * f))) for f in fractions))
+
+
+# Seeded random instance of the template's arguments (x, m, n, weights, preferences)
+def random_instance(n, m, seed):
+    weights = generators.random_capacities(n, 1, 100, [seed, 1])
+    preferences = generators.random_valuations(n, m, 1, 100, [seed, 0])
+    return X, m, n, weights, preferences
+
+
+# Run time of function(*args), and its result
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+# Peak traced memory of function(*args)
+def _traced(function, *args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+# Run the page's algorithm and checker on one instance (in a worker process). Both calls are timed first,
+# then traced for their memory, and every result is sent into `connection` as soon as it is known.
+def _run_size(path, n, m, seed, connection):
+    try:
+        page = load_page(path)
+        instance = random_instance(n, m, seed)
+        seconds, outcomes = _timed(page["algorithm"], *instance)
+        connection.send({"algorithm_seconds": seconds,
+                         "outcomes": None if outcomes is None else type(outcomes).__name__})
+        seconds, verdict = _timed(page["algorithm_checker"], outcomes, *instance)
+        connection.send({"checker_seconds": seconds, "checker": None if verdict is None else bool(verdict)})
+        connection.send({"algorithm_peak": _traced(page["algorithm"], *instance)})
+        connection.send({"checker_peak": _traced(page["algorithm_checker"], outcomes, *instance)})
+    except Exception as e:
+        connection.send({"error": f"{type(e).__name__}: {e}"})
+    connection.close()
+
+
+# Measure one size in a worker process. Each timed call is killed once it overruns twice the time budget
+# (with some slack), which fails the size; each traced call gets MEMORY_SLOWDOWN times its measured time,
+# and when it is killed the memory is only reported as not measured.
+def measure_size(path, n, m, seed, time_budget):
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    worker = context.Process(target=_run_size, args=(path, n, m, seed, sender), daemon=True)
+    worker.start()
+    sender.close()
+    record = {"agents": n, "items": m, "notes": []}
+    # the messages of the worker, in order, and how long the step that produces each may take
+    steps = [("algorithm_seconds", lambda: 2 * time_budget + 10),
+             ("checker_seconds", lambda: 2 * time_budget + 10),
+             ("algorithm_peak", lambda: MEMORY_SLOWDOWN * record["algorithm_seconds"] + 10),
+             ("checker_peak", lambda: MEMORY_SLOWDOWN * record["checker_seconds"] + 10)]
+    try:
+        for key, timeout in steps:
+            limit = timeout()
+            if not receiver.poll(limit):
+                if key.endswith("_peak"):
+                    call = key.split("_")[0]
+                    record["notes"].append(f"{call} memory not measured (traced run killed after {limit:.0f} s)")
+                else:
+                    record["error"] = f"{key.split('_')[0]} killed after {limit:.0f} seconds"
+                break
+            message = receiver.recv()
+            record.update(message)
+            if "error" in message:
+                break
+    except EOFError:
+        if "error" not in record:
+            record["error"] = f"the worker process died (exit code {worker.exitcode})"
+    finally:
+        worker.kill()
+        worker.join()
+    return record
+
+
+# Problems of a size against the budgets (an empty list when it conforms)
+def problems(record, time_budget, memory_budget):
+    found = [record["error"]] if "error" in record else []
+    if record.get("outcomes", "") is None:
+        found.append("algorithm returned None")
+    if record.get("checker", True) is None:
+        found.append("checker returned None")
+    elif record.get("checker") is False:
+        found.append("checker rejected the outcome")
+    for call in ("algorithm", "checker"):
+        if record.get(f"{call}_seconds", 0) > time_budget:
+            found.append(f"{call} over the time budget")
+        if record.get(f"{call}_peak", 0) > memory_budget:
+            found.append(f"{call} over the memory budget")
+    return found
+
+
+# Measure every size, up to the first one that does not conform; returns the records with their problems
+def check_page(path, n_cap, m_cap, time_budget=TIME_BUDGET, memory_budget_mb=MEMORY_BUDGET_MB, seed=0,
+               log=print):
+    records = []
+    for n, m in sizes(n_cap, m_cap):
+        record = measure_size(path, n, m, seed, time_budget)
+        record["problems"] = problems(record, time_budget, memory_budget_mb * 2**20)
+        records.append(record)
+        log(f"n = {n}, m = {m}: " + ("; ".join(record["problems"] + record["notes"]) or "ok"))
+        if record["problems"]:
+            break
+    return records
+
+
+#--- Report ---#
+
+def _cell(value, unit):
+    if value is None:
+        return "-"
+    return f"{value:.3f}" if unit == "s" else f"{value / 2**20:.1f}"
+
+
+# Growth exponent of a call's run time over the sizes, e.g. "size^1.93"
+def _growth(records, call):
+    measured = [record for record in records if f"{call}_seconds" in record]
+    if len(measured) < 2:
+        return "-"
+    fit = fit_power_law([record["agents"] for record in measured], np.ones(len(measured)),
+                        [record[f"{call}_seconds"] for record in measured])
+    return "-" if fit is None or fit.a is None else f"size^{fit.a:.2f}"
+
+
+# Markdown report of a check, to attach to the pull request
+def report(path, records, n_cap, m_cap, time_budget, memory_budget_mb, seed):
+    conforms = all(not record["problems"] for record in records) and records \
+        and (records[-1]["agents"], records[-1]["items"]) == sizes(n_cap, m_cap)[-1]
+    env = environment()
+    lines = [
+        f"## Performance conformance: `{os.path.basename(path)}`",
+        "",
+        f"**{'PASS' if conforms else 'FAIL'}** - budgets of {time_budget:g} s and {memory_budget_mb} MB "
+        f"per call, up to the caps n = {n_cap}, m = {m_cap} (seed {seed}).",
+        "",
+        "| n | m | algorithm (s) | algorithm peak (MB) | checker (s) | checker peak (MB) | checker | problems |",
+        "|---:|---:|---:|---:|---:|---:|:---:|---|",
+    ]
+    for record in records:
+        verdict = {True: "✅", False: "❌"}.get(record.get("checker"), "-")
+        lines.append(f"| {record['agents']} | {record['items']} "
+                     f"| {_cell(record.get('algorithm_seconds'), 's')} | {_cell(record.get('algorithm_peak'), 'MB')} "
+                     f"| {_cell(record.get('checker_seconds'), 's')} | {_cell(record.get('checker_peak'), 'MB')} "
+                     f"| {verdict} | {'; '.join(record['problems'] + record['notes']) or 'ok'} |")
+    lines += [
+        "",
+        f"Run time growth (n and m grow together): algorithm ∝ {_growth(records, 'algorithm')}, "
+        f"checker ∝ {_growth(records, 'checker')}.",
+        "",
+        f"Commit {env['commit']}, Python {env['python']}, NumPy {env['numpy']}, {env['machine']}, {env['time']}.",
+    ]
+    return "\n".join(lines) + "\n", bool(conforms)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.conformance", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("page", help="the contributed page file")
+    parser.add_argument("--n-cap", type=int, default=None, help="largest number of agents (default: the page's)")
+    parser.add_argument("--m-cap", type=int, default=None, help="largest number of items (default: the page's)")
+    parser.add_argument("--time-budget", type=float, default=TIME_BUDGET,
+                        help=f"seconds a call may take (default: {TIME_BUDGET:g})")
+    parser.add_argument("--memory-budget", type=int, default=MEMORY_BUDGET_MB,
+                        help=f"MB of peak traced memory a call may take (default: {MEMORY_BUDGET_MB})")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random instances (default: 0)")
+    parser.add_argument("-o", "--output", default=None, help="Markdown file of the report (default: print it)")
+    args = parser.parse_args(argv)
+
+    page_n_cap, page_m_cap = declared_caps(args.page)
+    n_cap, m_cap = args.n_cap or page_n_cap, args.m_cap or page_m_cap
+    if n_cap is None or m_cap is None:
+        parser.error("the page declares no MAX_AGENTS / MAX_ITEMS caps; pass --n-cap and --m-cap")
+
+    records = check_page(args.page, n_cap, m_cap, args.time_budget, args.memory_budget, args.seed)
+    text, conforms = report(args.page, records, n_cap, m_cap, args.time_budget, args.memory_budget, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Report written to {args.output}.")
+    else:
+        print("\n" + text)
+    return 0 if conforms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Explanations of the outcomes of pages 1-3, as records built on demand.
+
+An explanation is a sequence of lines, one per agent pair (or player pair),
+so it grows quadratically with the instance. Instead of a text, every page
+gets an Explanation: the number of its lines, and a function building the
+record of any line - a %-format template and its arguments, like the
+records of core.explanations. Only the lines that are shown (or downloaded)
+are ever built and formatted.
+"""
+import functools
+from collections.abc import Mapping
+
+import numpy as np
+
+HEADER = '<h3 class="information-card-header">%s</h3>'
+
+
+# Text of a (template, args) record - same %-formatting rules as logging.LogRecord.getMessage
+def render_record(message, args):
+    if len(args) == 1 and isinstance(args[0], Mapping) and args[0]:
+        args = args[0]
+    return message % args if args else message
+
+
+# English ordinal suffix of a number: 1 -> "st", 2 -> "nd", 11 -> "th", ...
+def ordinal(n):
+    return "tsnrhtdd"[(n // 10 % 10 != 1) * (n % 10 < 4) * n % 10::4]
+
+
+class Section:
+    """`count` lines, the k-th given by record(k) as (template, args), or None when it has no line."""
+
+    def __init__(self, count, record, title=None):
+        self.count = count
+        self.record = record
+        self.title = title
+
+    def __len__(self):
+        return self.count + (self.title is not None)
+
+    def records(self, start, stop):
+        for k in range(start, stop):
+            if self.title is None:
+                yield self.record(k)
+            else:
+                yield (HEADER, (self.title,)) if k == 0 else self.record(k - 1)
+
+
+class Explanation:
+    """Sections of lines, numbered across the sections."""
+
+    def __init__(self, *sections):
+        self.sections = sections
+
+    def __len__(self):
+        return sum(len(section) for section in self.sections)
+
+    # Records of the lines [start, stop)
+    def records(self, start=0, stop=None):
+        stop = len(self) if stop is None else stop
+        offset = 0
+        for section in self.sections:
+            first, last = max(start - offset, 0), min(stop - offset, len(section))
+            if first < last:
+                yield from (record for record in section.records(first, last) if record is not None)
+            offset += len(section)
+
+    # Text of the lines [start, stop)
+    def lines(self, start=0, stop=None):
+        return [render_record(*record) for record in self.records(start, stop)]
+
+    # The whole explanation as text, built when it is called
+    def text(self):
+        return "".join(render_record(*record) + "\n\n" for record in self.records())
+
+
+# Line t of the row of agent i: the agent itself first, then every other agent in order
+def _row_agent(i, t):
+    return None if t == 0 else (t - 1 if t - 1 < i else t)
+
+
+# Zero-argument function computing `function(*args)` on its first call only
+def _once(function, *args):
+    return functools.cache(lambda: function(*args))
+
+
+class BundleValues:
+    """
+    The values of every agent i for every bundle B_j, as n x len(bundles) arrays: their sum v_i(B_j),
+    largest and smallest value (0 for empty bundles, see `sizes`). Computed in one vectorized pass over
+    the preferences, bundle by bundle with reduceat, instead of once per pair.
+    """
+
+    def __init__(self, preferences, bundles):
+        self.sizes = np.array([len(bundle) for bundle in bundles], dtype=np.int64)
+        shape = (preferences.shape[0], len(bundles))
+        self.sums, self.maxima, self.minima = (np.zeros(shape, dtype=np.int64) for _ in range(3))
+        nonempty = self.sizes > 0
+        if nonempty.any():
+            # the items of the bundles side by side; every non-empty bundle starts a segment
+            values = preferences[:, np.concatenate(bundles)].astype(np.int64)
+            starts = (np.cumsum(self.sizes) - self.sizes)[nonempty]
+            self.sums[:, nonempty] = np.add.reduceat(values, starts, axis=1)
+            self.maxima[:, nonempty] = np.maximum.reduceat(values, starts, axis=1)
+            self.minima[:, nonempty] = np.minimum.reduceat(values, starts, axis=1)
+
+
+# WEF(x, 1-x) of the weighted picking sequence (page 1): every agent, then why it does not envy each other agent
+def goods_allocation_explanation(bundles, x, weights, preferences):
+    n = len(bundles)
+    matrices = _once(BundleValues, preferences, bundles)
+
+    def record(k):
+        i, j = divmod(k, n)
+        j = _row_agent(i, j)
+        values = matrices()
+        own = values.sums[i, i]
+        if j is None:
+            return "**Agent %d** has weight %s and receives value %s.", (i + 1, weights[i], own)
+        value = values.sums[i, j]
+        if value == 0:
+            return ("Agent %d has value 0 for the bundle of Agent %d, so Agent %d does not envy Agent %d.",
+                    (i + 1, j + 1, i + 1, j + 1))
+        top = values.maxima[i, j]
+        return ("Agent %d has value %s for the bundle of Agent %d, who has weight %s. Agent %d's maximum value "
+                "for an item in Agent %d's bundle is %s. Agent %d does not envy Agent %d according to "
+                "WEF(%.2f, %.2f) because (%s + %.2f * %s) / %s = %.2f ≥ %.2f = (%s - %.2f * %s) / %s.",
+                (i + 1, value, j + 1, weights[j], i + 1, j + 1, top, i + 1, j + 1, x, 1 - x,
+                 own, 1 - x, top, weights[i], (own + (1 - x) * top) / weights[i],
+                 (value - x * top) / weights[j], value, x, top, weights[j]))
+
+    return Explanation(Section(n * n, record))
+
+
+# EF[1,1] and swap stability of the team distribution (page 2); `preferences` is teams x players,
+# `rankings` players x teams
+def team_distribution_explanation(bundles, preferences, rankings):
+    n, m = len(bundles), preferences.shape[1]
+    matrices = _once(BundleValues, preferences, bundles)
+
+    def balance(k):
+        sizes = matrices().sizes
+        return ("The teams have a **balanced** number of players (with a maximum difference of **%d**).",
+                (sizes.max() - sizes.min(),))
+
+    def envy(k):
+        i, j = divmod(k, n)
+        j = _row_agent(i, j)
+        values = matrices()
+        own = values.sums[i, i]
+        if j is None:
+            return "**Team %d** is allocated with players valued at %s in total.", (i + 1, own)
+        value = values.sums[i, j]
+        own_min = values.minima[i, i] if values.sizes[i] else None
+        top = values.maxima[i, j] if values.sizes[j] else None
+        if value <= own:
+            return ("Team %d values Team %d's allocation at %s, and it does not envy Team %d because %s ≥ %s.",
+                    (i + 1, j + 1, value, j + 1, own, value))
+        if own_min is not None and own_min < 0 and top is not None and top >= 0:
+            return ("Team %d values Team %d's allocation at %s, but its own player has a minimum value of %s. "
+                    "Team %d's maximum value for a player in Team %d is %s. Team %d does not envy Team %d under "
+                    "EF[1,1] because the difference between %s and %s equals %s, which is ≥ %s = %s - %s.",
+                    (i + 1, j + 1, value, own_min, i + 1, j + 1, top, i + 1, j + 1,
+                     own, own_min, own - own_min, value - top, value, top))
+        if (own_min is None or own_min >= 0) and top is not None and top >= 0:
+            return ("Team %d values Team %d's allocation at %s. Team %d's maximum value for a player in Team %d's "
+                    "allocation is %s. Despite this, Team %d does not envy Team %d under EF[1,1] because "
+                    "%s ≥ %s = %s - %s.",
+                    (i + 1, j + 1, value, i + 1, j + 1, top, i + 1, j + 1, own, value - top, value, top))
+        if own_min is not None and own_min < 0 and (top is None or top < 0):
+            return ("Team %d values Team %d's allocation at %s, but its own player has a minimum value of %s. "
+                    "Despite this, Team %d does not envy Team %d under EF[1,1] because the difference between "
+                    "%s and %s is %s, which is ≥ %s.",
+                    (i + 1, j + 1, value, own_min, i + 1, j + 1, own, own_min, own - own_min, value))
+        return None
+
+    # The team of every player, and the first pair of every row of the pairs (p, q), p < q, numbered row by row
+    def player_teams():
+        teams = np.empty(m, dtype=np.int64)
+        for team, bundle in enumerate(bundles):
+            teams[bundle] = team
+        return teams, np.cumsum([0] + [m - 1 - p for p in range(m - 1)])
+
+    pairs = _once(player_teams)
+
+    def swap(k):
+        teams, row_starts = pairs()
+        p = int(np.searchsorted(row_starts, k, side="right")) - 1
+        q = p + 1 + k - row_starts[p]
+        tp, tq = teams[p], teams[q]
+        if tp == tq:
+            return None
+        template = "**If we swap Player %d (Team %d) with Player %d (Team %d)**, "
+        args = (p + 1, tp + 1, q + 1, tq + 1)
+        if preferences[tp, p] >= preferences[tp, q]:
+            template += "the values for Team %d will decrease from %s to %s, "
+            args += (tp + 1, preferences[tp, p], preferences[tp, q])
+        if preferences[tq, q] >= preferences[tq, p]:
+            template += "the values for Team %d will decrease from %s to %s, "
+            args += (tq + 1, preferences[tq, q], preferences[tq, p])
+        for player, own, other in ((p, tp, tq), (q, tq, tp)):
+            if rankings[player, own] < rankings[player, other]:
+                template += "Player %d's rank will drop from %s<sup>%s</sup> to %s<sup>%s</sup>, "
+                args += (player + 1, rankings[player, own], ordinal(rankings[player, own]),
+                         rankings[player, other], ordinal(rankings[player, other]))
+        template += "and hence swapping Player %d with Player %d is **not beneficial.**"
+        return template, args + (p + 1, q + 1)
+
+    return Explanation(Section(1, balance),
+                       Section(n * n, envy, title="Fulfilling EF[1,1]"),
+                       Section(m * (m - 1) // 2, swap, title="Fulfilling Swap Stability"))
+
+
+# Envy-freeness of the house assignment (page 3); `houses` holds the house of every agent
+def house_assignment_explanation(houses, orderings):
+    n = len(houses)
+    # rank of every agent i for the house of every agent j
+    ranks = _once(lambda: orderings[:, houses])
+
+    def record(k):
+        i, j = divmod(k, n)
+        j = _row_agent(i, j)
+        rank = ranks()
+        if j is None:
+            return ("**Agent %d** has received House %d ranked at %s<sup>%s</sup>.",
+                    (i + 1, houses[i] + 1, rank[i, i], ordinal(rank[i, i])))
+        return ("Agent %d ranks Agent %d's House %d at %s<sup>%s</sup>, so it does not envy Agent %d as rank "
+                "%s<sup>%s</sup> is lower than or equal to rank %s<sup>%s</sup>.",
+                (i + 1, j + 1, houses[j] + 1, rank[i, j], ordinal(rank[i, j]), j + 1,
+                 rank[i, j], ordinal(rank[i, j]), rank[i, i], ordinal(rank[i, i])))
+
+    return Explanation(Section(n * n, record, title="Envy-Freeness"))
+
+
+# Why no envy-free assignment exists (page 3): giving any unallocated house to an unallocated agent
+# of the partial matching `houses` (-1: none) creates envy
+def house_failure_explanation(houses, orderings):
+    m = orderings.shape[1]
+    agents = np.flatnonzero(houses >= 0)
+    free_agents = np.flatnonzero(houses < 0)
+    free_houses = np.setdiff1d(np.arange(m), houses[agents])
+    row = 1 + len(free_houses)
+
+    # The rank lookups of the explanation: of the matched agents for their own and for the free houses,
+    # and of the free agents for the matched and the free houses
+    def lookups():
+        matched = houses[agents]
+        return (orderings[agents, matched], orderings[np.ix_(agents, free_houses)],
+                orderings[np.ix_(free_agents, matched)], orderings[np.ix_(free_agents, free_houses)])
+
+    rank_tables = _once(lookups)
+
+    def record(k):
+        u, t = divmod(k, row)
+        if t == 0:
+            return "Agent %d gets unallocated.", (free_agents[u] + 1,)
+        current, for_free, free_for_matched, free_for_free = rank_tables()
+        rank = free_for_free[u, t - 1]
+        template = "**If it gets allocated House %d ranked at %s<sup>%s</sup>**, "
+        args = (free_houses[t - 1] + 1, rank, ordinal(rank))
+        for a, (agent, house) in enumerate(zip(agents, houses[agents])):
+            if current[a] > for_free[a, t - 1]:
+                template += ("Agent %d will envy it as Agent %d ranks House %d at %s<sup>%s</sup> "
+                             "and its current house at %s<sup>%s</sup>, ")
+                args += (agent + 1, agent + 1, free_houses[t - 1] + 1, for_free[a, t - 1],
+                         ordinal(for_free[a, t - 1]), current[a], ordinal(current[a]))
+            if free_for_matched[u, a] < rank:
+                template += "it will envy Agent %d as it ranks House %d at %s<sup>%s</sup>, "
+                args += (agent + 1, house + 1, free_for_matched[u, a], ordinal(free_for_matched[u, a]))
+        template += "and hence, it does not constitute any envy-free allocation."
+        return template, args
+
+    return Explanation(Section(len(free_agents) * row, record, title="Not Fulfilling Envy-Freeness"))
@@ -0,0 +1,53 @@
+"""
+Compact, structured explanation logging for the fairpyx course allocation algorithms.
+
+Messages are kept as (template, args) records during the run and are only turned
+into text when a particular agent's explanation is requested.
+"""
+import fairpyx
+
+from core.explain import render_record
+
+
+class RecordingExplanationLogger(fairpyx.ExplanationLogger):
+    """
+    An explanation logger that records messages instead of formatting them.
+
+    Every message is stored once; each agent keeps only the indices of the
+    messages addressed to it, so messages sent to all (or many) agents do not
+    get copied per agent.
+    """
+
+    def __init__(self, agents, language="en"):
+        super().__init__(language)
+        self.records = []
+        self.map_agent_to_records = {agent: [] for agent in agents}
+
+    def _record(self, message, args, agents):
+        # Snapshot mutable containers - the algorithm keeps changing them after logging.
+        args = tuple(arg.copy() if isinstance(arg, (dict, list, set)) else arg
+                     for arg in args)
+        index = len(self.records)
+        self.records.append((message, args))
+        if agents is None:
+            targets = self.map_agent_to_records.keys()
+        elif isinstance(agents, (int, str)):
+            targets = [agents]
+        else:
+            targets = agents
+        for agent in targets:
+            if agent in self.map_agent_to_records:
+                self.map_agent_to_records[agent].append(index)
+
+    def debug(self, message: str, *args, agents=None):
+        self._record(message, args, agents)
+
+    def info(self, message: str, *args, agents=None):
+        self._record(message, args, agents)
+
+    def warning(self, message: str, *args, agents=None):
+        self._record(message, args, agents)
+
+    def agent_string(self, agent):
+        return "".join(render_record(*self.records[index]) + "\n"
+                       for index in self.map_agent_to_records[agent])
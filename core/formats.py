@@ -0,0 +1,109 @@
+"""
+Reading and writing instance / outcome tables in CSV, Parquet, Arrow IPC and NumPy .npz.
+
+The binary formats keep the column types (and the row labels), so a table
+comes back exactly as it was written without re-parsing its numbers.
+Any of them may also be gzip-compressed (`<name>.<ext>.gz`).
+"""
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+
+# format name -> (file extension, MIME type)
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file"),
+    "NumPy": ("npz", "application/octet-stream"),
+}
+
+# file extensions accepted for uploads
+UPLOAD_TYPES = [extension for extension, _ in FORMATS.values()] + ["gz"]
+
+
+# Format name of a file name such as "preferences.parquet" or "preferences.csv.gz"
+def format_of(file_name):
+    name = file_name.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for fmt, (extension, _) in FORMATS.items():
+        if name.endswith("." + extension):
+            return fmt
+    raise ValueError(f"Unsupported file type: {file_name}")
+
+
+# Serialize a table to bytes in the given format
+def write_table(table, fmt="CSV"):
+    if fmt == "CSV":
+        return table.to_csv().encode()
+    buffer = io.BytesIO()
+    if fmt == "Parquet":
+        table.to_parquet(buffer)
+    elif fmt == "Arrow IPC":
+        import pyarrow as pa
+
+        arrow_table = pa.Table.from_pandas(table)
+        with pa.ipc.new_file(buffer, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+    elif fmt == "NumPy":
+        np.savez_compressed(buffer, **_to_arrays(table))
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+    return buffer.getvalue()
+
+
+# Read a table from an uploaded file (or any binary file-like object with a `name`).
+# `index_col` and `header` only apply to CSV files; the binary formats store their row labels and column names.
+def read_table(file, index_col=None, header="infer"):
+    name = getattr(file, "name", "")
+    fmt = format_of(name)
+    data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+    if name.lower().endswith(".gz"):
+        data = gzip.decompress(data)
+
+    if fmt == "CSV":
+        return pd.read_csv(io.BytesIO(data), index_col=index_col, header=header)
+    if fmt == "Parquet":
+        return pd.read_parquet(io.BytesIO(data))
+    if fmt == "Arrow IPC":
+        import pyarrow as pa
+
+        return pa.ipc.open_file(pa.py_buffer(data)).read_all().to_pandas()
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+        return _from_arrays(arrays)
+
+
+# NumPy layout: a numeric table is one 2-D "values" array; otherwise each column is stored
+# on its own, and list-valued columns (e.g. bundles) as flat values plus row offsets
+def _to_arrays(table):
+    arrays = {
+        "index": np.array(table.index.astype(str).tolist(), dtype=str),
+        "columns": np.array(table.columns.astype(str).tolist(), dtype=str),
+    }
+    if all(pd.api.types.is_numeric_dtype(dtype) for dtype in table.dtypes):
+        arrays["values"] = table.to_numpy()
+        return arrays
+    for j, column in enumerate(table.columns):
+        values = table[column].tolist()
+        if values and all(isinstance(value, (list, tuple, np.ndarray)) for value in values):
+            arrays[f"column_{j}"] = np.asarray([item for value in values for item in value])
+            arrays[f"column_{j}_offsets"] = np.cumsum([0] + [len(value) for value in values])
+        else:
+            arrays[f"column_{j}"] = np.asarray(values)
+    return arrays
+
+
+def _from_arrays(arrays):
+    index, columns = arrays["index"], arrays["columns"]
+    if "values" in arrays:
+        return pd.DataFrame(arrays["values"], index=index, columns=columns)
+    data = {}
+    for j, column in enumerate(columns):
+        values = arrays[f"column_{j}"]
+        if f"column_{j}_offsets" in arrays:
+            offsets = arrays[f"column_{j}_offsets"]
+            values = [values[start:end].tolist() for start, end in zip(offsets[:-1], offsets[1:])]
+        data[column] = values
+    return pd.DataFrame(data, index=index)
@@ -0,0 +1,46 @@
+"""
+Seeded random instance generators shared by all pages.
+
+Every generator draws a whole matrix from a numpy Generator in one call, so the
+same seed (and shape) always regenerates exactly the same data. `seed` may be
+an int or a sequence of ints, e.g. `[seed, 1]` to draw an independent table
+from the same user-visible seed. A resized table is regenerated whole at its
+new shape (see `resized`), so it does not depend on the sizes it had before.
+"""
+import numpy as np
+
+
+# Integer valuations drawn uniformly from [low, high)
+def random_valuations(n, m, low, high, seed):
+    return np.random.default_rng(seed).integers(low, high, (n, m))
+
+
+# Each row is a uniformly random permutation of the ranks 1..m
+def random_strict_rankings(n, m, seed):
+    ranks = np.broadcast_to(np.arange(1, m + 1), (n, m))
+    return np.random.default_rng(seed).permuted(ranks, axis=1)
+
+
+# Each entry is a rank drawn uniformly from 1..m, so rows may contain ties
+def random_tied_rankings(n, m, seed):
+    return np.random.default_rng(seed).integers(1, m + 1, (n, m))
+
+
+# Integer capacities drawn uniformly from [low, high)
+def random_capacities(size, low, high, seed):
+    return np.random.default_rng(seed).integers(low, high, size)
+
+
+# The seeded table of shape (n, m) drawn by `generate(n, m)`, keeping the cells of `previous` (the table
+# shown before, of any shape) that were edited away from the seeded table of its own shape. The result
+# depends only on the shape, the seed and the edits - not on the order in which the table was resized.
+def resized(generate, n, m, previous=None):
+    values = np.array(generate(n, m))
+    if previous is not None:
+        previous = np.asarray(previous)
+        seeded = np.asarray(generate(*previous.shape))
+        rows, columns = min(n, previous.shape[0]), min(m, previous.shape[1])
+        previous, seeded = previous[:rows, :columns], seeded[:rows, :columns]
+        edited = previous != seeded
+        values[:rows, :columns][edited] = previous[edited]
+    return values
@@ -0,0 +1,62 @@
+"""
+Deferred imports of the heavy solver libraries, with their import times.
+
+networkz and fairpyx take from a fraction of a second to several seconds to
+import, so they are only imported on first use (see the algorithms), or ahead
+of it by a background warm-up thread. Either way the first import of every
+module is timed, so that cold-start latency can be tracked.
+"""
+import importlib
+import logging
+import sys
+import threading
+import time
+
+# Libraries imported by the warm-up, in order (fairpyx imports networkz, which is timed first)
+HEAVY_MODULES = ("networkz", "fairpyx")
+
+logger = logging.getLogger(__name__)
+
+# module name -> (seconds its first import took, the thread that imported it)
+_import_seconds = {}
+_lock = threading.Lock()
+
+
+# Import a module by name, timing it when this is its first import in the process
+def timed_import(name):
+    if name in sys.modules and name in _import_seconds:
+        return sys.modules[name]
+    first = name not in sys.modules
+    start = time.perf_counter()
+    # waits for the import to finish when another thread is importing the module
+    module = importlib.import_module(name)
+    if first:
+        seconds = time.perf_counter() - start
+        with _lock:
+            _import_seconds.setdefault(name, (seconds, threading.current_thread().name))
+        logger.info("imported %s in %.2f s (%s)", name, seconds, threading.current_thread().name)
+    return module
+
+
+# Start importing the modules in a background thread; returns the thread
+def warm_up(names=HEAVY_MODULES):
+    def run():
+        for name in names:
+            try:
+                timed_import(name)
+            except ImportError as e:
+                logger.warning("warm-up could not import %s: %s", name, e)
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+# Seconds the first import of a module took and the thread that did it, or None while it is not imported
+def import_time(name):
+    return _import_seconds.get(name)
+
+
+def import_times():
+    with _lock:
+        return dict(_import_seconds)
@@ -0,0 +1,164 @@
+"""
+Validated ingestion of uploaded integer tables.
+
+CSV uploads are parsed in chunks of rows with declared integer dtypes, and
+every chunk is checked (column count, row count, value range) as soon as it
+is read, so a bad file is rejected at the first offending cell and memory
+stays bounded by the chunk size plus the typed result. The binary formats of
+core.formats are read whole and checked the same way.
+"""
+import gzip
+import io
+import re
+
+import numpy as np
+import pandas as pd
+
+from core.formats import format_of, read_table
+
+# Rows parsed per CSV chunk
+CHUNK_ROWS = 10000
+# CSV cells are parsed as int64 and range-checked before they are cast to the requested dtype,
+# which would otherwise wrap out-of-range values silently
+PARSE_DTYPE = np.int64
+
+
+class TableError(ValueError):
+    """An uploaded table has the wrong shape or an invalid value; the message names the offending row/column."""
+
+
+# Read an uploaded integer table (first column holds the row labels).
+# `shape` entries fix the number of rows / columns, `max_shape` entries bound them (None: any).
+def read_int_table(file, shape=(None, None), max_shape=(None, None), min_value=None, max_value=None,
+                   dtype=np.int64, chunk_rows=CHUNK_ROWS):
+    name = getattr(file, "name", "")
+    if format_of(name) != "CSV":
+        try:
+            table = read_table(file)
+        except Exception as e:
+            raise TableError(f"the file could not be read ({e})")
+        _check_columns(len(table.columns), shape[1], max_shape[1])
+        _check_rows(len(table), shape[0], max_shape[0], done=True)
+        return pd.DataFrame(_check_values(table, 0, min_value, max_value, dtype),
+                            index=table.index, columns=table.columns)
+
+    data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+    compression = "gzip" if name.lower().endswith(".gz") else None
+
+    def source():
+        return io.BytesIO(data)
+
+    try:
+        columns = pd.read_csv(source(), index_col=0, nrows=0, compression=compression).columns
+    except (ValueError, UnicodeDecodeError, gzip.BadGzipFile) as e:
+        raise TableError(f"the file could not be read as CSV ({e})")
+    _check_columns(len(columns), shape[1], max_shape[1])
+
+    reader = pd.read_csv(source(), index_col=0, dtype={column: PARSE_DTYPE for column in columns},
+                         chunksize=chunk_rows, compression=compression)
+    values, index = [], []
+    start = 0
+    while True:
+        try:
+            chunk = next(reader)
+        except StopIteration:
+            break
+        except pd.errors.ParserError as e:
+            raise _parse_error(e)
+        except (ValueError, OverflowError) as e:
+            # the cells did not parse as int64: re-read this chunk as text to point at the offending cell
+            try:
+                chunk = pd.read_csv(source(), index_col=0, dtype=str, skiprows=range(1, start + 1),
+                                    nrows=chunk_rows, compression=compression)
+            except pd.errors.ParserError as parse_error:
+                raise _parse_error(parse_error, start)
+            _check_values(chunk, start, min_value, max_value, dtype)
+            raise TableError(f"row {start + 1} onwards could not be read ({type(e).__name__}: {e})")
+        _check_rows(start + len(chunk), shape[0], max_shape[0], done=False)
+        values.append(_check_values(chunk, start, min_value, max_value, dtype))
+        index.extend(chunk.index)
+        start += len(chunk)
+    _check_rows(start, shape[0], max_shape[0], done=True)
+
+    values = np.concatenate(values) if values else np.empty((0, len(columns)), dtype=dtype)
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+def _check_columns(found, expected, maximum):
+    if expected is not None and found != expected:
+        raise TableError(f"expected {expected} value columns (after the label column), found {found}")
+    if maximum is not None and found > maximum:
+        raise TableError(f"at most {maximum} value columns are allowed, found {found}")
+
+
+# `done` is False while streaming, so only "too many rows" can be reported before the end of the file
+def _check_rows(found, expected, maximum, done):
+    limits = [limit for limit in (expected, maximum) if limit is not None]
+    if limits and found > min(limits):
+        raise TableError(f"expected {'at most ' if expected is None else ''}{min(limits)} rows, "
+                         f"but row {min(limits) + 1} is present")
+    if done and expected is not None and found != expected:
+        raise TableError(f"expected {expected} rows, found {found}")
+
+
+# TableError of a CSV row with the wrong number of cells; `start` is the first data row of a re-read chunk
+def _parse_error(error, start=0):
+    match = re.search(r"Expected (\d+) fields in line (\d+), saw (\d+)", str(error))
+    if match is None:
+        return TableError(f"the file could not be parsed as CSV ({error})")
+    expected, line, found = (int(group) for group in match.groups())
+    # the line counts the header, and the fields the label column
+    return TableError(f"row {start + line - 1} has {found - 1} value columns (after the label column), "
+                      f"expected {expected - 1}")
+
+
+# Typed values of a block of rows starting at data row `start`; raises at the first invalid cell
+def _check_values(block, start, min_value, max_value, dtype):
+    if all(pd.api.types.is_integer_dtype(column_dtype) for column_dtype in block.dtypes):
+        values = block.to_numpy()
+    else:
+        numeric = block.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        bad = np.isnan(numeric) | (numeric != np.round(numeric))
+        if bad.any():
+            row, col = np.argwhere(bad)[0]
+            if pd.isna(block.iat[row, col]):
+                raise TableError(f"{_cell(block, start, row, col)}: the cell is empty")
+            raise TableError(f"{_cell(block, start, row, col)}: {block.iat[row, col]!r} is not a whole number")
+        values = numeric
+
+    bad = np.zeros(values.shape, dtype=bool)
+    if min_value is not None:
+        bad |= values < min_value
+    if max_value is not None:
+        bad |= values > max_value
+    if bad.any():
+        row, col = np.argwhere(bad)[0]
+        raise TableError(f"{_cell(block, start, row, col)}: {_number(values[row, col])} is outside "
+                         f"the allowed range {_range(min_value, max_value)}")
+    # values the bounds allow may still not fit the dtype (no bounds, or bounds wider than the dtype)
+    if np.issubdtype(dtype, np.integer):
+        limits = np.iinfo(dtype)
+        bad = (values < limits.min) | (values > limits.max)
+        if bad.any():
+            row, col = np.argwhere(bad)[0]
+            raise TableError(f"{_cell(block, start, row, col)}: {_number(values[row, col])} does not fit "
+                             f"the range {limits.min}-{limits.max} of {np.dtype(dtype).name}")
+    return values.astype(dtype, copy=False)
+
+
+# A cell value for messages: whole numbers in full, others in short form
+def _number(value):
+    return f"{int(value)}" if float(value).is_integer() and abs(value) < 2**63 else f"{value:g}"
+
+
+# The allowed range for messages, e.g. "0-1000", or "≥ 0" / "≤ 1000" when only one bound is set
+def _range(min_value, max_value):
+    if min_value is None:
+        return f"≤ {max_value}"
+    if max_value is None:
+        return f"≥ {min_value}"
+    return f"{min_value}-{max_value}"
+
+
+def _cell(block, start, row, col):
+    return f"row {start + row + 1} ({block.index[row]}), column '{block.columns[col]}'"
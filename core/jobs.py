@@ -0,0 +1,106 @@
+"""
+A process-wide queue of background jobs with bounded concurrency.
+
+Jobs are function calls run by a fixed pool of worker threads, so no more
+than `max_workers` of them run at once however many sessions submit them;
+the rest wait in submission order. Every job gets an id under which its
+status, timing and result can be polled. Finished jobs are forgotten once
+they are older than the queue's time-to-live.
+"""
+import itertools
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Finished jobs are kept this many seconds for their submitters to collect
+JOB_TTL = 3600
+
+
+class Job:
+    """One submitted call: status is "queued", "running", "done", "failed" or "cancelled"."""
+
+    def __init__(self, job_id, label, order):
+        self.id = job_id
+        self.label = label
+        self.order = order
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    # Seconds the job has been running (or ran, once finished)
+    @property
+    def seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobQueue:
+    def __init__(self, max_workers, ttl=JOB_TTL):
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._futures = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    # Queue function(*args, **kwargs); returns the job id
+    def submit(self, function, *args, label="", **kwargs):
+        job = Job(uuid.uuid4().hex[:12], label, next(self._order))
+
+        def run():
+            job.status, job.started = "running", time.time()
+            # `finished` is set before the terminal status, so a done() job always has it
+            try:
+                result = function(*args, **kwargs)
+                job.result, job.finished, job.status = result, time.time(), "done"
+            except Exception as e:
+                job.error, job.finished, job.status = e, time.time(), "failed"
+
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            self._futures[job.id] = self._executor.submit(run)
+        return job.id
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    # Cancel a job that has not started yet; running jobs cannot be interrupted
+    def cancel(self, job_id):
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is None or not future.cancel():
+                return False
+            job = self._jobs[job_id]
+            job.finished, job.status = time.time(), "cancelled"
+            return True
+
+    # Number of queued jobs ahead of the job (0 once it runs)
+    def position(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None or job.status != "queued":
+            return 0
+        return sum(other.status == "queued" and other.order < job.order for other in list(self._jobs.values()))
+
+    # Jobs of the queue by status
+    def counts(self):
+        counts = {}
+        for job in list(self._jobs.values()):
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _prune(self):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.done() and job.finished is not None and time.time() - job.finished > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+            del self._futures[job_id]
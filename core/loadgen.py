@@ -0,0 +1,96 @@
+"""
+Load generator for the HTTP service of core.api.
+
+Sends random instances of a task from a number of concurrent clients and
+reports the throughput (requests and instances per second) and the latency
+percentiles of the requests.
+
+    python -m core.api --workers 4 &
+    python -m core.loadgen picking -n 20 -m 40 --requests 500 --concurrency 8
+    python -m core.loadgen rmm --batch 16 --binary
+"""
+import argparse
+import io
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core import tasks
+from core.api import DEFAULT_PORT, NPZ_TYPE
+
+PERCENTILES = (50, 90, 99)
+
+
+# Request body of a batch of instances (a single instance when the batch has one), as JSON or .npz
+def encode(instances, binary):
+    if binary:
+        if len(instances) == 1:
+            arrays = {name: np.asarray(value) for name, value in instances[0].items()}
+        else:
+            arrays = {f"{i}/{name}": np.asarray(value)
+                      for i, instance in enumerate(instances) for name, value in instance.items()}
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue(), NPZ_TYPE
+    as_json = [{name: np.asarray(value).tolist() for name, value in instance.items()} for instance in instances]
+    payload = as_json[0] if len(as_json) == 1 else {"instances": as_json}
+    return json.dumps(payload).encode(), "application/json"
+
+
+# Send one request; returns its latency in seconds and the number of failed instances
+def send(url, body, content_type, size):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            payload = json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return time.perf_counter() - start, size if e.code != 422 else 1
+    latency = time.perf_counter() - start
+    results = payload["results"] if "results" in payload else [payload]
+    return latency, sum("error" in result for result in results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.loadgen", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("task", choices=list(tasks.TASKS), help="algorithm to call")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}", help="address of the service")
+    parser.add_argument("-n", "--agents", type=int, default=10, help="agents per instance (default: 10)")
+    parser.add_argument("-m", "--items", type=int, default=20, help="items per instance (default: 20)")
+    parser.add_argument("-r", "--requests", type=int, default=200, help="requests to send (default: 200)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="concurrent clients (default: 4)")
+    parser.add_argument("-b", "--batch", type=int, default=1, help="instances per request (default: 1)")
+    parser.add_argument("--binary", action="store_true", help="send .npz bodies instead of JSON")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first random instance")
+    args = parser.parse_args(argv)
+
+    # a few distinct bodies, prepared ahead so that only the service is measured
+    bodies = [encode([tasks.random_instance(args.task, args.agents, args.items, args.seed + k * args.batch + i)
+                      for i in range(args.batch)], args.binary)
+              for k in range(min(args.requests, 16))]
+    url = f"{args.url.rstrip('/')}/{args.task}"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as clients:
+        replies = list(clients.map(lambda k: send(url, *bodies[k % len(bodies)], args.batch),
+                                   range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _ in replies]) * 1000
+    failed = sum(errors for _, errors in replies)
+    instances = args.requests * args.batch
+    print(f"{args.requests} requests ({instances} instances of {args.agents} x {args.items}, "
+          f"{failed} failed) in {elapsed:.2f} s from {args.concurrency} clients:")
+    print(f"  throughput: {args.requests / elapsed:.1f} requests/s, {instances / elapsed:.1f} instances/s")
+    print("  latency: " + ", ".join(f"p{p} {value:.1f} ms" for p, value in zip(PERCENTILES, np.percentile(
+        latencies, PERCENTILES))) + f", max {latencies.max():.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
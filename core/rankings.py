@@ -0,0 +1,59 @@
+"""
+Tie-aware rank normalization shared by the ranking pages.
+
+Users may type arbitrary numbers into the ranking tables; before running an
+algorithm each ranking is normalized to competition ("min") ranks, i.e. the
+smallest value gets rank 1 and tied values share the lowest rank of their
+group: [5, 2, 2, 9] -> [3, 1, 1, 4].
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+# Competition ("min") ranks of every line of `values` along `axis`, computed for the whole matrix at once
+def min_ranks(values, axis=0):
+    values = np.moveaxis(np.asarray(values), axis, -1)
+    if values.shape[-1] == 0:
+        return np.moveaxis(np.zeros(values.shape, dtype=np.int64), -1, axis)
+
+    order = np.argsort(values, axis=-1, kind="stable")
+    sorted_values = np.take_along_axis(values, order, axis=-1)
+
+    # a new rank starts wherever the sorted value differs from its predecessor;
+    # ties carry the position of the first element of their group forward
+    starts = np.ones(sorted_values.shape, dtype=bool)
+    starts[..., 1:] = sorted_values[..., 1:] != sorted_values[..., :-1]
+    positions = np.broadcast_to(np.arange(1, values.shape[-1] + 1), values.shape)
+    sorted_ranks = np.maximum.accumulate(np.where(starts, positions, 0), axis=-1)
+
+    ranks = np.empty(values.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=-1)
+    return np.moveaxis(ranks, -1, axis)
+
+
+# Content hash of a matrix (shape and dtype included)
+def matrix_hash(values):
+    values = np.ascontiguousarray(values)
+    digest = hashlib.blake2b(values.tobytes(), digest_size=16)
+    digest.update(repr((values.shape, values.dtype.str)).encode())
+    return digest.hexdigest()
+
+
+# Normalize a rankings table along `axis` (0: each column is a ranking, 1: each row is a ranking).
+# `memo` is an optional dict (e.g. a slot in st.session_state) holding the last result;
+# when the table's hash has not changed the stored ranks are reused.
+def normalize_rankings(table, axis=0, memo=None):
+    values = table.to_numpy(dtype=np.int64)
+    key = (axis, matrix_hash(values))
+
+    if memo is not None and memo.get("key") == key:
+        ranks = memo["ranks"]
+    else:
+        ranks = min_ranks(values, axis=axis)
+        if memo is not None:
+            memo["key"] = key
+            memo["ranks"] = ranks
+
+    return pd.DataFrame(ranks.copy(), index=table.index, columns=table.columns)
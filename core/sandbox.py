@@ -0,0 +1,217 @@
+"""
+Test runs of a contributed algorithm, in a separate process with resource limits.
+
+The algorithm is the source code pasted in the "Create Your Own App" page: a
+function taking the `input_data` dict of the generated app. It is called on
+generated inputs of a growing size - tables of random values (like the tables
+of the generated app), and the number of rows for number inputs - timing each
+call and measuring its peak traced memory. The largest size that finished is
+run once more under cProfile, for the functions the time is spent in.
+
+The calls run in a fresh, isolated Python interpreter (this file run as a
+script), in a temporary directory and with an empty environment. Its CPU time,
+address space and file sizes are limited with `resource` where the platform
+supports it, and it is killed after a wall-clock timeout. This keeps a slow or
+runaway algorithm from taking down the app; it is not a security boundary.
+"""
+import contextlib
+import cProfile
+import io
+import json
+import math
+import os
+import pstats
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+
+# Default limits of a test run (all sizes together)
+CPU_SECONDS = 10
+MEMORY_MB = 512
+# Hotspots reported from the profile
+TOP = 15
+# Captured output of the algorithm kept in the report
+MAX_OUTPUT_CHARS = 4000
+
+# File name of the algorithm's code in tracebacks and profiles
+SOURCE_NAME = "<algorithm>"
+
+
+# Test-run `function_name` of `source` on generated inputs of the widgets {name: widget type} at the sizes
+# [(rows, columns), ...]. Returns {"runs": [...], "profile": [...], "output": str, "error": str or None},
+# with one run {"rows", "columns", "seconds", "peak_bytes"} per size that finished, and "limited" telling
+# whether the platform let the limits be set.
+def test_run(source, function_name, widgets, sizes, cpu_seconds=CPU_SECONDS, memory_mb=MEMORY_MB, top=TOP,
+             seed=0):
+    payload = {"source": source, "function": function_name, "widgets": widgets, "sizes": [list(size) for size in sizes],
+               "cpu_seconds": cpu_seconds, "memory_bytes": memory_mb * 2**20, "top": top, "seed": seed}
+    # one thread for the numerical libraries, so that the CPU limit means the same everywhere
+    env = {"PATH": os.environ.get("PATH", ""), "OPENBLAS_NUM_THREADS": "1", "OMP_NUM_THREADS": "1",
+           "MKL_NUM_THREADS": "1"}
+    report = {"runs": [], "profile": [], "output": "", "error": None, "limited": None}
+    with tempfile.TemporaryDirectory(prefix="test_run_") as directory:
+        try:
+            child = subprocess.run([sys.executable, "-I", os.path.abspath(__file__)], input=json.dumps(payload),
+                                   capture_output=True, text=True, cwd=directory, env=env,
+                                   timeout=2 * cpu_seconds + 10)
+        except subprocess.TimeoutExpired as e:
+            stdout = e.stdout.decode() if isinstance(e.stdout, bytes) else e.stdout or ""
+            _read_messages(stdout, report)
+            report["error"] = report["error"] or f"the test run took longer than {e.timeout:.0f} seconds"
+            return report
+
+    _read_messages(child.stdout, report)
+    if child.returncode != 0 and report["error"] is None:
+        report["error"] = _exit_reason(child.returncode, cpu_seconds, memory_mb, child.stderr)
+    return report
+
+
+# Collect the messages the test process wrote so far (one JSON object per line)
+def _read_messages(stdout, report):
+    for line in stdout.splitlines():
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if "run" in message:
+            report["runs"].append(message["run"])
+        elif "profile" in message:
+            report["profile"] = message["profile"]
+        elif "error" in message:
+            report["error"] = message["error"]
+        if "output" in message:
+            report["output"] = message["output"]
+        if "limited" in message:
+            report["limited"] = message["limited"]
+
+
+# Why the test process ended without reporting an error itself
+def _exit_reason(returncode, cpu_seconds, memory_mb, stderr):
+    if returncode in (-24, 152):  # SIGXCPU
+        return f"the algorithm exceeded the CPU-time limit of {cpu_seconds} seconds"
+    if returncode in (-25, 153):  # SIGXFSZ
+        return "the algorithm tried to write a file, which test runs do not allow"
+    if returncode in (-9, 137):
+        return f"the test process was killed, likely for exceeding the memory limit of {memory_mb} MB"
+    last_line = stderr.strip().splitlines()[-1] if stderr.strip() else ""
+    return f"the test process exited with code {returncode}" + (f": {last_line}" if last_line else "")
+
+
+#--- Test process ---#
+
+# Limit the CPU time and address space of this process to its current usage plus the budgets;
+# returns whether the limits could be set
+def _limit_resources(cpu_seconds, memory_bytes):
+    try:
+        import resource
+    except ImportError:
+        return False
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds)
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    # Python ignores SIGXFSZ, which would turn a write into an OSError the algorithm may swallow
+    signal.signal(signal.SIGXFSZ, signal.SIG_DFL)
+    try:
+        with open("/proc/self/statm") as statm:
+            address_space = int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        resource.setrlimit(resource.RLIMIT_AS, (address_space + memory_bytes, address_space + memory_bytes))
+    except (OSError, ValueError):
+        pass
+    return True
+
+
+# `input_data` of the generated app at a size: random tables, the number of rows for number inputs
+# and the example values of the other widgets
+def _input_data(widgets, rows, columns, rng):
+    values = {"Text Input": "Type some text here", "Slider": (-10, 10), "Checkbox": True}
+    data = {}
+    for name, widget_type in widgets.items():
+        if widget_type == "Table Input":
+            data[name] = rng.integers(1, 100, (rows, columns))
+        elif widget_type == "Number Input":
+            data[name] = rows
+        else:
+            data[name] = values.get(widget_type)
+    return data
+
+
+# Name of a profiled function, with the algorithm's own functions marked
+def _function_label(file_name, line, name):
+    if file_name == "~":
+        return name
+    if file_name == SOURCE_NAME:
+        return f"{name} (your code, line {line})"
+    return f"{name} ({os.path.basename(file_name)}:{line})"
+
+
+# The `top` functions with the most time spent in their own code
+def hotspots(profile, top):
+    stats = pstats.Stats(profile).stats
+    rows = [{"function": _function_label(*function), "calls": calls, "own_seconds": own, "total_seconds": total}
+            for function, (_, calls, own, total, _) in stats.items()]
+    return sorted(rows, key=lambda row: row["own_seconds"], reverse=True)[:top]
+
+
+# Traceback of an exception, from the algorithm's frames on
+def _error_text(e):
+    frames = [frame for frame in traceback.extract_tb(e.__traceback__) if frame.filename == SOURCE_NAME]
+    lines = traceback.format_list(frames) + traceback.format_exception_only(type(e), e)
+    return "".join(lines).strip()
+
+
+def _send(message):
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def main():
+    payload = json.loads(sys.stdin.read())
+    import numpy as np
+
+    output = io.StringIO()
+    rng_seed = payload["seed"]
+    limited = _limit_resources(payload["cpu_seconds"], payload["memory_bytes"])
+    try:
+        namespace = {"__name__": "algorithm"}
+        with contextlib.redirect_stdout(output):
+            exec(compile(payload["source"], SOURCE_NAME, "exec"), namespace)
+        function = namespace.get(payload["function"])
+        if not callable(function):
+            raise NameError(f"the code does not define a function {payload['function']}()")
+
+        finished = None
+        for rows, columns in payload["sizes"]:
+            input_data = _input_data(payload["widgets"], rows, columns, np.random.default_rng(rng_seed))
+            with contextlib.redirect_stdout(output):
+                start = time.perf_counter()
+                function(input_data)
+                seconds = time.perf_counter() - start
+                tracemalloc.start()
+                try:
+                    function(input_data)
+                    _, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+            _send({"run": {"rows": rows, "columns": columns, "seconds": seconds, "peak_bytes": peak}})
+            finished = input_data
+
+        profile = cProfile.Profile()
+        with contextlib.redirect_stdout(output):
+            profile.runcall(function, finished)
+        _send({"profile": hotspots(profile, payload["top"]), "output": output.getvalue()[-MAX_OUTPUT_CHARS:],
+               "limited": limited})
+    except MemoryError:
+        _send({"error": f"the algorithm exceeded the memory limit of {payload['memory_bytes'] // 2**20} MB",
+               "output": output.getvalue()[-MAX_OUTPUT_CHARS:]})
+    except Exception as e:
+        _send({"error": _error_text(e), "output": output.getvalue()[-MAX_OUTPUT_CHARS:]})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
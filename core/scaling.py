@@ -0,0 +1,163 @@
+"""
+Scaling curves: how the run time and memory of a task grow with n and m.
+
+A task is measured on random instances over a grid of sizes (see
+core.benchmark.measure), and a power law
+
+    cost(n, m) = c * n^a * m^b
+
+is fitted to the measurements by least squares on log-log scale. The fit
+gives the complexity exponents a and b, and inverts to the largest n (or m)
+whose predicted cost stays within a budget.
+
+A Measurement measures the sizes one at a time in a background thread, each in
+its own worker process, which is terminated when the size overruns its time
+limit or the measurement is stopped. Measurements given the same `slots`
+semaphore wait for a free slot, which caps how many run at the same time.
+"""
+import multiprocessing
+import threading
+
+import numpy as np
+
+from core import tasks
+from core.benchmark import measure
+
+
+# Geometric grid of `points` distinct integer sizes from low to high
+def size_grid(low, high, points):
+    return sorted({int(round(size)) for size in np.geomspace(low, high, points)})
+
+
+# Time and peak memory of a task on a random instance of size n x m (run in a worker process)
+def measure_size(task, n, m, seed=0, repeat=3):
+    tasks.import_solver(task)
+    seconds, peak = measure(task, tasks.random_instance(task, n, m, seed), repeat)
+    return {"agents": n, "items": m, "seconds": seconds, "peak_bytes": peak}
+
+
+# Seconds a size may take (all its runs together) before its worker process is terminated
+SIZE_TIME_LIMIT = 60
+
+
+def _measure_into(connection, task, n, m, seed):
+    try:
+        connection.send(measure_size(task, n, m, seed))
+    except Exception as e:
+        connection.send({"error": f"{type(e).__name__}: {e}"})
+    connection.close()
+
+
+class Measurement:
+    """Sizes of a task measured one after another, each in a worker process that is terminated after
+    `size_time_limit` seconds or by stop(). Sizes at least as large as one that overran are skipped.
+    With `slots` (a semaphore), the sizes are only measured while holding one of its slots."""
+
+    def __init__(self, task, sizes, seed=0, size_time_limit=SIZE_TIME_LIMIT, slots=None):
+        self.task = task
+        self.sizes = list(sizes)
+        self.seed = seed
+        self.size_time_limit = size_time_limit
+        self.records = []
+        self.errors = []
+        # sizes done: measured, failed or skipped
+        self.finished = 0
+        self.waiting = slots is not None
+        self._slots = slots
+        self._stopped = threading.Event()
+        self._worker = None
+        self._thread = threading.Thread(target=self._run, name="scaling", daemon=True)
+        self._thread.start()
+
+    def pending(self):
+        return self._thread.is_alive()
+
+    # Stop measuring: the size being measured is terminated, the sizes already measured are kept
+    def stop(self):
+        self._stopped.set()
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            worker.terminate()
+
+    def _run(self):
+        if self._slots is None:
+            self._measure()
+            return
+        while not self._slots.acquire(timeout=0.5):
+            if self._stopped.is_set():
+                return
+        self.waiting = False
+        try:
+            self._measure()
+        finally:
+            self._slots.release()
+
+    def _measure(self):
+        context = multiprocessing.get_context("spawn")
+        overran = []
+        for n, m in self.sizes:
+            if self._stopped.is_set():
+                break
+            if any(n >= n0 and m >= m0 for n0, m0 in overran):
+                self.errors.append(f"n = {n}, m = {m}: skipped, as a smaller size overran the time limit")
+                self.finished += 1
+                continue
+            receiver, sender = context.Pipe(duplex=False)
+            self._worker = context.Process(target=_measure_into, args=(sender, self.task, n, m, self.seed),
+                                           daemon=True)
+            self._worker.start()
+            sender.close()
+            try:
+                result = receiver.recv() if receiver.poll(self.size_time_limit) else None
+            except EOFError:
+                result = {"error": "the worker process stopped"}
+            finally:
+                self._worker.terminate()
+                self._worker.join()
+            if self._stopped.is_set():
+                break
+            if result is None:
+                overran.append((n, m))
+                self.errors.append(f"n = {n}, m = {m}: stopped after the time limit of {self.size_time_limit} s")
+            elif "error" in result:
+                self.errors.append(f"n = {n}, m = {m}: {result['error']}")
+            else:
+                self.records.append(result)
+            self.finished += 1
+
+
+class PowerLaw:
+    """Fitted cost(n, m) = exp(log_c) * n^a * m^b; an exponent is None when its size did not vary."""
+
+    def __init__(self, log_c, a, b):
+        self.log_c, self.a, self.b = log_c, a, b
+
+    def predict(self, n, m):
+        return np.exp(self.log_c + (self.a or 0) * np.log(n) + (self.b or 0) * np.log(m))
+
+    # Largest n (at the given m), or m (at the given n), whose predicted cost is at most `budget`;
+    # None when the cost does not grow with that size
+    def limit(self, budget, n=None, m=None):
+        if n is None:
+            exponent, fixed = self.a, (self.b or 0) * np.log(m)
+        else:
+            exponent, fixed = self.b, (self.a or 0) * np.log(n)
+        if not exponent or exponent <= 0:
+            return None
+        return max(int(np.exp((np.log(budget) - self.log_c - fixed) / exponent)), 0)
+
+
+# Fit a power law to the measured `costs` at the sizes (ns, ms); sizes that did not vary get no exponent
+def fit_power_law(ns, ms, costs):
+    ns, ms, costs = (np.asarray(values, dtype=np.float64) for values in (ns, ms, costs))
+    keep = costs > 0
+    ns, ms, costs = ns[keep], ms[keep], costs[keep]
+    varies = [len(np.unique(ns)) > 1, len(np.unique(ms)) > 1]
+    columns = [np.ones_like(ns)] + [np.log(values) for values, vary in zip((ns, ms), varies) if vary]
+    if len(costs) < len(columns):
+        return None
+    solution, *_ = np.linalg.lstsq(np.column_stack(columns), np.log(costs), rcond=None)
+    exponents = iter(solution[1:])
+    a = float(next(exponents)) if varies[0] else None
+    b = float(next(exponents)) if varies[1] else None
+    return PowerLaw(float(solution[0]), a, b)
@@ -0,0 +1,186 @@
+"""
+The algorithms of core.algorithms by name, run on an instance given as named arrays.
+
+This is the entry point of the offline tools (batch runs, benchmarks): an
+instance is a mapping of array names to arrays - e.g. the arrays of an .npz
+file - and every task returns its outcome together with fairness metrics.
+
+Arrays of an instance, by task:
+
+    picking      preferences (agents x items), weights (agents), x (optional, default 0.5)
+    teams        preferences (teams x players), ranks (players x teams, 1 = favourite team)
+    houses       orderings (agents x houses, 1 = best)
+    rmm          preferences (agents x items, the rank of every item)
+    <fairpyx>    preferences (students x courses), courses_capacities (courses),
+                 students_capacities (students), and optionally conflict_pairs
+                 (pairs x 2) or time_slots (courses, -1 for none)
+
+where <fairpyx> is any function name of core.algorithms.course_allocation.ALGORITHMS,
+e.g. round_robin.
+"""
+import numpy as np
+
+from core import conflicts, generators
+from core.algorithms import course_allocation, goods_allocation, house_assignment, rank_maximal_matching, \
+    team_distribution
+from core.imports import timed_import
+
+# fairpyx task name -> algorithm name of the course allocation page
+FAIRPYX_TASKS = {function: name for name, function in course_allocation.ALGORITHMS.items()}
+
+# Envy between students is only measured up to this many students (it compares every pair)
+ENVY_MAX_AGENTS = 500
+
+
+# Values v_i(B_j) of every agent i for every bundle j, and the usual summary of them
+def bundle_metrics(preferences, bundles):
+    n, m = preferences.shape
+    incidence = np.zeros((m, len(bundles)), dtype=np.int64)
+    for j, bundle in enumerate(bundles):
+        incidence[bundle, j] = 1
+    values = preferences.astype(np.int64) @ incidence
+    own = np.diag(values)
+    return {
+        "utilitarian_value": int(own.sum()),
+        "egalitarian_value": int(own.min()),
+        "max_envy": int(max((values - own[:, None]).max(), 0)),
+    }
+
+
+def run_picking(instance, metrics=True):
+    preferences, weights = instance["preferences"], instance["weights"]
+    x = float(instance["x"]) if "x" in instance else 0.5
+    bundles = goods_allocation.wef1x_algorithm(x, weights, preferences)
+    if not metrics:
+        return bundles, {}
+    return bundles, bundle_metrics(preferences, bundles) | {
+        "wef_x": goods_allocation.wef1x_checker(bundles, x, weights, preferences),
+    }
+
+
+def run_teams(instance, metrics=True):
+    preferences = instance["preferences"]
+    bundles = team_distribution.compute_EF11_ssba(preferences, instance["ranks"])
+    if not metrics:
+        return bundles, {}
+    sizes = [len(bundle) for bundle in bundles]
+    return bundles, bundle_metrics(preferences, bundles) | {"balance": max(sizes) - min(sizes)}
+
+
+# Matched agents and the ranks (1 = best) of their items
+def matching_metrics(ranks, items):
+    agents = np.flatnonzero(items >= 0)
+    matched = ranks[agents, items[agents]]
+    return {
+        "matched": len(agents),
+        "mean_rank": float(matched.mean()) if len(agents) else float("nan"),
+        "max_rank": int(matched.max()) if len(agents) else 0,
+    }
+
+
+def run_houses(instance, metrics=True):
+    orderings = instance["orderings"]
+    houses, envy_free = house_assignment.compute_envyfree_assignment(orderings)
+    if not metrics:
+        return houses, {}
+    return houses, matching_metrics(orderings, houses) | {"envy_free": envy_free}
+
+
+def run_rmm(instance, metrics=True):
+    preferences = instance["preferences"]
+    items = rank_maximal_matching.algorithm(preferences)
+    if not metrics:
+        return items, {}
+    return items, matching_metrics(preferences, items)
+
+
+# Clash bitsets of a course allocation instance (no conflicts when neither array is given)
+def course_conflicts(instance, m):
+    if "conflict_pairs" in instance:
+        return conflicts.masks_from_pairs(np.asarray(instance["conflict_pairs"]).tolist(), m)
+    if "time_slots" in instance:
+        return conflicts.masks_from_slots(instance["time_slots"])
+    return [0] * m
+
+
+def run_fairpyx(function, instance, metrics=True):
+    preferences = instance["preferences"]
+    n, m = preferences.shape
+    courses_capacities = np.asarray(instance["courses_capacities"]).reshape(m, 1)
+    students_capacities = np.asarray(instance["students_capacities"]).reshape(n, 1)
+    courses_conflicts = course_conflicts(instance, m)
+    name = FAIRPYX_TASKS[function]
+    allocations, fairpyx_instance = course_allocation.algorithm(
+        courses_capacities, students_capacities, preferences, [name], courses_conflicts, explain=False)
+    bundles = allocations[name][0]
+    if not metrics:
+        return bundles, {}
+
+    _, mean_value, min_value, served, mean_courses, clashes = course_allocation.large_algorithm_checker(
+        allocations, preferences, students_capacities, courses_conflicts)[0]
+    summary = {
+        "mean_value_percent": float(mean_value),
+        "min_value_percent": float(min_value),
+        "fully_served": served,
+        "mean_courses": mean_courses,
+        "clashes": clashes,
+        "max_envy": float("nan"),
+        "mean_envy": float("nan"),
+    }
+    if n <= ENVY_MAX_AGENTS:
+        _, _, _, max_envy, mean_envy, _ = course_allocation.algorithm_checker(
+            fairpyx_instance, allocations, courses_conflicts)[0]
+        summary |= {"max_envy": float(max_envy), "mean_envy": float(mean_envy)}
+    return bundles, summary
+
+
+# task name -> function(instance, metrics) returning (outcome, metrics)
+TASKS = {
+    "picking": run_picking,
+    "teams": run_teams,
+    "houses": run_houses,
+    "rmm": run_rmm,
+} | {function: (lambda instance, metrics=True, function=function: run_fairpyx(function, instance, metrics))
+     for function in FAIRPYX_TASKS}
+
+# arrays every instance of a task must have
+INPUTS = {
+    "picking": ("preferences", "weights"),
+    "teams": ("preferences", "ranks"),
+    "houses": ("orderings",),
+    "rmm": ("preferences",),
+} | {function: ("preferences", "courses_capacities", "students_capacities") for function in FAIRPYX_TASKS}
+
+
+# Run a task on an instance; returns the outcome - bundles (a list of item index arrays, one per agent)
+# or a matching (the item of every agent, -1 when unmatched) - and a dict of metrics (empty without `metrics`)
+def run(task, instance, metrics=True):
+    missing = [name for name in INPUTS[task] if name not in instance]
+    if missing:
+        raise ValueError(f"the instance has no {', '.join(missing)} array for the {task} task")
+    return TASKS[task](instance, metrics)
+
+
+# Import the solver library of a task ahead of its first run (the algorithms import it lazily)
+def import_solver(task):
+    if task in FAIRPYX_TASKS:
+        timed_import("fairpyx")
+    elif task == "rmm":
+        timed_import("networkz")
+
+
+# Random instance of a task with n agents and m items, drawn like the pages' random tables
+def random_instance(task, n, m, seed=0):
+    if task == "picking":
+        return {"preferences": generators.random_valuations(n, m, 1, 100, [seed, 0]),
+                "weights": generators.random_capacities(n, 1, 10, [seed, 1]), "x": 0.5}
+    if task == "teams":
+        return {"preferences": generators.random_valuations(n, m, -100, 100, [seed, 0]),
+                "ranks": generators.random_strict_rankings(m, n, [seed, 1])}
+    if task == "houses":
+        return {"orderings": generators.random_tied_rankings(n, m, seed)}
+    if task == "rmm":
+        return {"preferences": generators.random_strict_rankings(n, m, seed)}
+    return {"preferences": generators.random_valuations(n, m, 0, 100, [seed, 0]),
+            "courses_capacities": generators.random_capacities(m, 10, 101, [seed, 1]),
+            "students_capacities": generators.random_capacities(n, 1, 11, [seed, 2])}
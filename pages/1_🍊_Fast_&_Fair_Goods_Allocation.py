@@ -1,13 +1,23 @@
-from collections import defaultdict
-import base64
-from functools import partial
-import json
-import time
 
 import numpy as np
 import pandas as pd
 import streamlit as st
 
+from core import generators
+from core.algorithms.goods_allocation import wef1x_algorithm, wef1x_checker
+from core.cache import content_hash
+from core.explain import goods_allocation_explanation
+from core.formats import UPLOAD_TYPES
+from ui.downloads import download_options, download_table
+from ui.cache import cache_report, cached
+from ui.explanations import explanation_expander
+from ui.imports import warm_up
+from ui.jobs import job_result, submit_job
+from ui.outcomes import download_outcomes, outcome_viewer, show_outcomes_json
+from ui.tables import int_table_editor, read_upload
+from ui.state import PageState, memory_report
+from ui.widgets import seed_input
+
 
 # Set page configuration
 st.set_page_config(
@@ -16,6 +26,12 @@ st.set_page_config(
     layout="wide",
 )
 
+# Tables of this page live in their own namespace of the session state
+state = PageState("goods_allocation", tables=["weights", "preferences"])
+
+# The solver libraries are imported in the background while the page renders
+warm_up()
+
 # Custom CSS styles
 st.markdown(
     """
@@ -85,84 +101,41 @@ st.markdown(
 )
 
 
-def load_preferences(m, n, upload_preferences):
-    if hasattr(st.session_state, "preferences"):
-        if upload_preferences:
-            preferences_default = None
-            # Load the user-uploaded preferences file
-            try:
-                preferences_default = pd.read_csv(
-                    upload_preferences, index_col=0)
-                if preferences_default.shape != (n, m):
-                    x, y = preferences_default.shape
-                    st.session_state.preferences.iloc[:x,
-                                                      :y] = preferences_default
-                else:
-                    st.session_state.preferences = pd.DataFrame(preferences_default,
-                                                                columns=st.session_state.preferences.columns,
-                                                                index=st.session_state.preferences.index)
-                return st.session_state.preferences
-            except Exception as e:
-                st.error(f"An error occurred while loading the preferences file.")
-                st.stop()
-        old_n = st.session_state.preferences.shape[0]
-        old_m = st.session_state.preferences.shape[1]
-        if n <= old_n and m <= old_m:
-            st.session_state.preferences = st.session_state.preferences.iloc[:n, :m]
-            return st.session_state.preferences
-        elif n > old_n:
-            st.session_state.preferences = pd.concat([st.session_state.preferences,
-                                                      pd.DataFrame(np.random.randint(1, 100, (n - old_n, m)),
-                                                                   columns=[
-                                                          f"Item {i+1}" for i in range(m)],
-                                                          index=[f"Agent {i+1}" for i in range(old_n, n)])],
-                                                     axis=0)
-            return st.session_state.preferences
-        elif m > old_m:
-            st.session_state.preferences = pd.concat([st.session_state.preferences,
-                                                      pd.DataFrame(np.random.randint(1, 100, (n, m - old_m)),
-                                                                   columns=[
-                                                          f"Item {i+1}" for i in range(old_m, m)],
-                                                          index=[f"Agent {i+1}" for i in range(n)])],
-                                                     axis=1)
-            return st.session_state.preferences
-        else:
-            st.session_state.preferences = pd.DataFrame(np.random.randint(1, 100, (n, m)), columns=[f"Item {i+1}" for i in range(m)],
-                                                        index=[f"Agent {i+1}" for i in range(n)])
-            return st.session_state.preferences
-
+def load_preferences(m, n, upload_preferences, seed):
     if upload_preferences:
-        preferences_default = None
         # Load the user-uploaded preferences file
-        try:
-            preferences_default = pd.read_csv(upload_preferences)
-            if preferences_default.shape != (n, m):
-                st.error(
-                    f"The uploaded preferences file should have a shape of ({n}, {m}).")
-                st.stop()
-        except Exception as e:
-            st.error("An error occurred while loading the preferences file.")
-            st.stop()
-    else:
-        preferences_default = pd.DataFrame(np.random.randint(1, 100, (n, m)), columns=[f"Item {i+1}" for i in range(m)],
-                                           index=[f"Agent {i+1}" for i in range(n)])
-    st.session_state.preferences = preferences_default
-    return st.session_state.preferences
-
-
-def load_weights(n, unweighted=False):
-    if hasattr(st.session_state, "weights"):
+        state.preferences = read_upload(upload_preferences, "preferences", (n, m), 0, 1000,
+                                        index=[f"Agent {i+1}" for i in range(n)],
+                                        columns=[f"Item {j+1}" for j in range(m)])
+        return state.preferences
+
+    # The seeded table of this size, keeping the values edited by hand (until the seed changes)
+    previous = state.get("preferences") if state.get("preferences_seed") == seed else None
+    random_preferences = generators.resized(
+        lambda rows, columns: generators.random_valuations(rows, columns, 1, 100, seed), n, m, previous)
+    state.preferences = pd.DataFrame(random_preferences, columns=[f"Item {i+1}" for i in range(m)],
+                                     index=[f"Agent {i+1}" for i in range(n)])
+    state.preferences_seed = seed
+    return state.preferences
+
+
+def load_weights(n, unweighted=False, upload_weights=None):
+    if upload_weights and not unweighted:
+        # Load the user-uploaded weights file, one row of n weights (as downloaded)
+        return read_upload(upload_weights, "weights", (1, n), 1, 1000,
+                           index=["Weights"], columns=[f"Agent {i+1}" for i in range(n)]).T
+    if hasattr(state, "weights"):
         if unweighted:
             weights = np.ones(n)
             weights = pd.DataFrame(weights, index=[
                                    f'Agent {i+1}' for i in range(n)], columns=['Weights'], dtype=int)
             return weights
-        if n < st.session_state.weights.shape[0]:
-            weights = st.session_state.weights.iloc[:n, :]
+        if n < state.weights.shape[0]:
+            weights = state.weights.iloc[:n, :]
             return weights
         else:
-            old_n = st.session_state.weights.shape[0]
-            weights = pd.concat([st.session_state.weights,
+            old_n = state.weights.shape[0]
+            weights = pd.concat([state.weights,
                                  pd.DataFrame(
                                      np.arange(
                                          old_n+1, n+1),
@@ -179,57 +152,8 @@ def load_weights(n, unweighted=False):
     return weights
 
 
-def wchange_callback(weights):
+def wchange_callback():
     st.session_state.weight_checkbox = False
-    for col in weights.columns:
-        weights[col] = weights[col].map(lambda x: int(float(x)))
-    st.session_state.weights = weights
-
-
-def pchange_callback(preferences):
-    for col in preferences.columns:
-        preferences[col] = preferences[col].apply(
-            lambda x: int(float(x)))
-    st.session_state.preferences = preferences
-
-
-def wef1x_algorithm(x, m, n, weights, preferences):
-    # Implementation of WEF1 algorithm
-    # Add your code here
-    bundles = defaultdict(list)
-    times = np.zeros(n)
-    remaining_items = list(range(m))
-    # print(bundles, times, remaining_items)
-    while remaining_items:
-        i = np.argmin((times + (1 - x)) / weights)
-        o = remaining_items[np.argmax(preferences[i][remaining_items])]
-        # Add o to bundle A_i
-        bundles[i].append(o)
-        # Remove o from items
-        remaining_items.remove(o)
-        times[i] += 1
-    return bundles
-
-
-def wef1x_checker(outcomes, x, m, n, weights, preferences):
-    # Implementation of WEF1 checker
-    # Add your code here
-    y = 1 - x
-
-    def is_single_wef1x(i, j, bundle_i, bundle_j):
-        left = sum(preferences[i][bundle_j]) / weights[j] - \
-            sum(preferences[i][bundle_i]) / weights[i]
-        right = (y / weights[i] + x / weights[j]) * \
-            max(preferences[i][bundle_j])
-        return left <= right
-    for i in range(n):
-        for j in range(i, n):
-            bi, bj = outcomes[i][1], outcomes[j][1]
-            if not is_single_wef1x(i, j, bi, bj):
-                st.write(f"Not fulfiling WEF({x}, {1-x}).")
-                return
-    st.write(f"Fulfiled WEF({x}, {1-x}).")
-    return
 
 
 # Set the title and layout of the web application
@@ -237,7 +161,8 @@ st.markdown('<h1 class="header">Fast & Fair Goods Allocation</h1>',
             unsafe_allow_html=True)
 
 # Insert header image
-st.sidebar.image("./resource/pick.png", use_column_width=True,)
+st.sidebar.image("./resource/pick.png", width="stretch")
+download_options()
 
 st.sidebar.title("User Guide")
 
@@ -270,7 +195,7 @@ st.sidebar.markdown(
 
     <ol>
         <li>Specify the number of agents (n) and items (m) using the number input boxes.</li>
-        <li>Choose to either upload a preferences file or edit the  preferences.</li>
+        <li>Choose to either upload preferences and weights files or edit the preferences and weights.</li>
         <li>Click the 'Run Algorithm' button to start the algorithm.</li>
         <li>You can download the outcomes as a JSON file or the preferences as a CSV file using the provided links.</li>
     </ol>
@@ -291,9 +216,10 @@ x = col3.slider("Choose a value for x in WEF(x, 1-x)",
                 min_value=0.0, max_value=1.0, value=0.5, step=0.01, help="💡 Large x favors low-weight agents")
 
 upload_preferences = None
+upload_weights = None
 unweighted = False
 
-col1, col2 = st.columns([0.5, 0.5])
+col1, col2, col3 = st.columns([0.4, 0.4, 0.2])
 with col1:
     unweighted = st.checkbox("⭐ Symmetric Agents (Unweighted Settings)",
                              key='weight_checkbox',
@@ -302,95 +228,43 @@ with col1:
 with col2:
     if st.checkbox("⭐ Upload Local Preferences CSV"):
         upload_preferences = st.file_uploader(
-            f"Upload Preferences of shape ({n}, {m})", type=['csv'])
+            f"Upload Preferences of shape ({n}, {m})", type=UPLOAD_TYPES)
+    if st.checkbox("⭐ Upload Local Weights CSV"):
+        upload_weights = st.file_uploader(
+            f"Upload Weights of shape (1, {n})", type=UPLOAD_TYPES)
+with col3:
+    seed = seed_input()
 
 st.write("🌟 Agent Weights (1-1000):")
 
 with st.spinner("Loading..."):
-    weights = load_weights(n, unweighted)
-    st.session_state.weights = weights
-    for col in weights.columns:
-        weights[col] = weights[col].map(str)
-
-edited_ws = st.data_editor(weights.T,
-                           key="weight_editor",
-                           column_config={
-                               f"Agent {i}": st.column_config.TextColumn(
-                                   f"Agent {i}",
-                                   help=f"Agent {i}'s Weight",
-                                   required=True,
-                                   max_chars=4,
-                                   validate=r"^(?:[1-9]\d{0,2}|1000)$",
-                               )
-                               for i in range(1, n+1)
-                           }
-                           |
-                           {
-                               "_index": st.column_config.Column(
-                                   "💡 Hint",
-                                   help="Support copy-paste from Excel sheets and bulk edits",
-                                   disabled=True,
-                               ),
-                           },
-                           on_change=partial(wchange_callback, weights),
-                           )
-with st.spinner("Updating..."):
-    for col in edited_ws.columns:
-        edited_ws[col] = edited_ws[col].map(lambda x: int(round(float(x))))
-    st.session_state.weights = edited_ws.T
+    weights = load_weights(n, unweighted, upload_weights)
+    state.weights = weights
+
+edited_ws = int_table_editor(weights.T, "weight_editor", 1, 1000,
+                             help="{column}'s Weight",
+                             on_change=wchange_callback)
+state.weights = edited_ws.T
 
 
 weights = edited_ws.values[0]
 
 # Download weights as CSV
-weights_csv = edited_ws.to_csv()
-b64 = base64.b64encode(weights_csv.encode()).decode()
-href = f'<a href="data:file/csv;base64,{b64}" download="weights.csv">Download Weights CSV</a>'
-st.markdown(href, unsafe_allow_html=True)
+download_table("Download Weights", edited_ws, "weights")
 
 # Agent Preferences
 st.write("📊 Agent Preferences (0-1000, copyable from local sheets):")
 
-preferences = load_preferences(m, n, upload_preferences)
-for col in preferences.columns:
-    preferences[col] = preferences[col].map(str)
-
-edited_prefs = st.data_editor(preferences,
-                              key="pref_editor",
-                              column_config={
-                                  f"Item {j}": st.column_config.TextColumn(
-                                      f"Item {j}",
-                                      help=f"Agents' Preferences towards Item {j}",
-                                      max_chars=4,
-                                      validate=r"^(?:1000|[1-9]\d{0,2}|0)$",
-                                      required=True,
-                                  )
-                                  for j in range(1, m+1)
-                              }
-                              |
-                              {
-                                  "_index": st.column_config.Column(
-                                      "💡 Hint",
-                                      help="Support copy-paste from Excel sheets and bulk edits",
-                                      disabled=True,
-                                  ),
-                              },
-                              on_change=partial(
-                                  pchange_callback, preferences),
-                              )
-with st.spinner('Updating...'):
-    for col in edited_prefs.columns:
-        edited_prefs[col] = edited_prefs[col].apply(
-            lambda x: int(float(x)))
-    st.session_state.preferences = edited_prefs
+preferences = load_preferences(m, n, upload_preferences, seed)
+
+edited_prefs = int_table_editor(preferences, "pref_editor", 0, 1000,
+                                help="Agents' Preferences towards {column}")
+state.preferences = edited_prefs
 
 preferences = edited_prefs.values
 
 # Download preferences as CSV
-preferences_csv = edited_prefs.to_csv()
-b64 = base64.b64encode(preferences_csv.encode()).decode()
-href = f'<a href="data:file/csv;base64,{b64}" download="preferences.csv">Download Preferences CSV</a>'
-st.markdown(href, unsafe_allow_html=True)
+download_table("Download Preferences", edited_prefs, "preferences")
 
 # Add expandable information card
 with st.expander("ℹ️ Information", expanded=False):
@@ -475,17 +349,14 @@ with st.expander("ℹ️ Information", expanded=False):
     )
 
 start_algo = st.button("⏳ Run Weighted Picking Sequence Algorithm ")
+# The algorithm runs as a background job; its outcome is kept for these inputs, so the page stays usable meanwhile
+run_key = content_hash(x, weights, preferences)
 if start_algo:
-    with st.spinner('Executing...'):
-        if n * m * 0.01 > 3:
-            time.sleep(2)
-        else:
-            time.sleep(n * m * 0.01)
-
-    start_time = time.time()
-    outcomes = wef1x_algorithm(x, m, n, weights, preferences)
-    end_time = time.time()
-    elapsed_time = end_time - start_time
+    submit_job(state, "run", run_key, wef1x_algorithm, x, weights, preferences, label="The picking sequence")
+run = job_result(state, "run", run_key)
+if run is not None:
+    outcomes = dict(enumerate(run.result))
+    elapsed_time = run.seconds
 
     st.write("🎉 Outcomes:")
     outcomes_list = [[key, sorted(value)] for key, value in outcomes.items()]
@@ -496,65 +367,48 @@ if start_algo:
         lambda x: [_x + 1 for _x in x])
     outcomes_df['Items'] = outcomes_df['Items'].apply(
         lambda x: ', '.join(map(str, x)))
+    outcomes_df['Item count'] = [len(value) for value in outcomes.values()]
+    outcomes_df['Value'] = [int(preferences[key, value].sum()) for key, value in outcomes.items()]
 
     # Sort the table
     outcomes_df = outcomes_df.sort_values(['Agent'],
                                           key=lambda col: col.astype(int))
 
-    st.data_editor(outcomes_df,
+    # Only a page of the outcomes is sent to the browser; search and sort run here
+    outcome_viewer(outcomes_df, "goods_outcomes", ["Item count", "Value"],
                    column_config={
-                       "Agents": st.column_config.NumberColumn(
+                       "Agent": st.column_config.TextColumn(
                            "Agent",
                            help="The list of agents that get allocated",
-                           step=1,
                        ),
-                       "Items": st.column_config.ListColumn(
+                       "Items": st.column_config.TextColumn(
                            "Items",
                            help="The list of items allocated to agents",
                        ),
-                   },
-                   hide_index=True,
-                   disabled=True,
-                   )
+                       "Value": st.column_config.NumberColumn(
+                           "Value",
+                           help="The agent's value for its items",
+                       ),
+                   })
 
     # Print timing results
     st.write(f"⏱️ Timing Results:")
     st.write(f"Elapsed Time: {elapsed_time:.4f} seconds")
 
-    output_str = ""
-    has_lead_str = False
-
-    for i in range(n):
-        if not has_lead_str:
-            b = outcomes[i]
-            output_str += f"**Agent {i+1}** has weight {weights[i]} and receives value {sum(preferences[i][b])}.\n\n"
-            has_lead_str = True
-        for j in range(n):
-            if i == j:
-                continue
-            else:
-                bi, bj = outcomes[i], outcomes[j]
-                if sum(preferences[i][bj]) == 0:
-                    output_str += f"Agent {i+1} has value 0 for the bundle of Agent {j+1}, so Agent {i+1} does not envy Agent {j+1}.\n\n"
-                else:
-                    output_str += f"Agent {i+1} has value {sum(preferences[i][bj])} for the bundle of Agent {j+1}, who has weight {weights[j]}. Agent {i+1}'s maximum value for an item in Agent {j+1}'s bundle is {max(preferences[i][bj])}. Agent {i+1} does not envy Agent {j+1} according to WEF({x:.2f}, {1-x:.2f}) because ({sum(preferences[i][bi])} + {1-x:.2f} * {max(preferences[i][bj])}) / {weights[i]} = {(sum(preferences[i][bi]) + (1-x)*max(preferences[i][bj])) / weights[i]:.2f} ≥ {(sum(preferences[i][bj]) - x*max(preferences[i][bj])) / weights[j]:.2f} = ({sum(preferences[i][bj])} - {x:.2f} * {max(preferences[i][bj])}) / {weights[j]}.\n\n"
-        has_lead_str = False
-
-    with st.expander("Explanation of the outcomes", expanded=False):
-        st.download_button('Download Full Explanations', output_str,
-                           file_name=f"{n}_agents_{m}_items_alloc_expl.txt")
-        st.markdown(output_str)
-
-    # print({otc[0]: otc[1] for otc in outcomes_df.to_numpy()})
+    # The fairness certificate is computed once per inputs, like the outcome
+    if cached(run_key, wef1x_checker, run.result, x, weights, preferences):
+        st.success(f"✅ Verified: the outcome satisfies WEF({x:.2f}, {1-x:.2f}) for every pair of agents.")
+    else:
+        st.error(f"The outcome does not satisfy WEF({x:.2f}, {1-x:.2f}).")
+
+    # The explanation is built line by line, only for the lines shown (or downloaded)
+    explanation_expander("Explanation of the outcomes",
+                         goods_allocation_explanation(run.result, x, weights, preferences),
+                         f"{n}_agents_{m}_items_alloc_expl.txt", key="goods_explanation")
 
     # Download outcomes in JSON format
-    outcomes_json = json.dumps({otc[0]: otc[1]
-                               for otc in outcomes_df.to_numpy()}, indent=4)
-    st.markdown("### Download Outcomes as JSON")
-    b64 = base64.b64encode(outcomes_json.encode()).decode()
-    href = f'<a href="data:application/json;base64,{b64}" download="outcomes.json">Download Outcomes JSON</a>'
-    st.markdown(href, unsafe_allow_html=True)
-    st.json(outcomes_json)
+    show_outcomes_json(outcomes_df)
+    download_outcomes(outcomes, "Agent", "Item")
 
 hide_streamlit_style = """
     <style>
@@ -564,6 +418,9 @@ hide_streamlit_style = """
 """
 st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
+memory_report(state)
+cache_report()
+
 st.markdown(
     """
     <div class="footer" style="padding-top: 200px; margin-top: auto; text-align: left; font-size: 10px; color: #777777;">
@@ -1,14 +1,24 @@
-from collections import defaultdict
-import base64
-from functools import partial
-import json
-import random
-import time
-
-import numpy as np
+
 import pandas as pd
 import streamlit as st
 
+from core import generators
+from core.algorithms.team_distribution import compute_EF11_ssba
+from core.cache import content_hash
+from core.explain import team_distribution_explanation
+from core.formats import UPLOAD_TYPES
+from core.rankings import normalize_rankings
+from ui.downloads import download_options, download_table
+from ui.heatmap import show_ranking_preview
+from ui.cache import cache_report
+from ui.explanations import explanation_expander
+from ui.imports import warm_up
+from ui.jobs import job_result, submit_job
+from ui.outcomes import download_outcomes, outcome_viewer, show_outcomes_json
+from ui.tables import int_table_editor, read_upload
+from ui.state import PageState, memory_report
+from ui.widgets import next_seed, seed_input
+
 
 # Set page configuration
 st.set_page_config(
@@ -17,6 +27,12 @@ st.set_page_config(
     layout="wide",
 )
 
+# Tables of this page live in their own namespace of the session state
+state = PageState("team_distribution", tables=["prefs", "rankings"])
+
+# The solver libraries are imported in the background while the page renders
+warm_up()
+
 # Custom CSS styles
 st.markdown(
     """
@@ -86,165 +102,53 @@ st.markdown(
 )
 
 
-def compute_EF11_ssba(n, m, preferences, ranks):
-    Q = list(range(n)) * (m // n) + list(range(n))[:(m % n)]
-    assert len(Q) == m
-    P = list(range(m))
-    match = defaultdict(list)
-    for team in range(m):
-        players = np.asarray(P)[np.argwhere(preferences[Q[team]][P]
-                                            == np.amax(preferences[Q[team]][P])).flatten().tolist()]
-        match[team].extend(players.tolist())
-        P.remove(players[0])
-
-    rev_match = defaultdict(list)
-    for (team, players) in match.items():
-        for player in players:
-            rev_match[player].append(team)
-
-    final_match = defaultdict(list)
-    T = list(range(m))
-    for player in rev_match.keys():
-        if len(rev_match[player]) == 1:
-            team = rev_match[player][0]
-            real_team = Q[team]
-            final_match[real_team].append(player)
-            T.remove(team)
-        else:
-            continue
-
-    for player in rev_match.keys():
-        if len(rev_match[player]) == 1:
-            continue
-        else:
-            teams = rev_match[player]
-            real_teams = list(map(lambda x: Q[x], teams))
-            real_team = real_teams[np.argmin(ranks[player][real_teams])]
-            final_match[real_team].append(player)
-            team = teams[np.argmin(ranks[player][real_teams])]
-            try:
-                T.remove(team)
-            except:
-                continue
-
-    return final_match
-
-
-def load_preferences(m, n):
+def load_preferences(m, n, seed, upload_preferences=None):
     low = -100
     high = 100
 
-    if hasattr(st.session_state, "prefs"):         
-        old_n = st.session_state.prefs.shape[0]
-        old_m = st.session_state.prefs.shape[1]
-        if n <= old_n and m <= old_m:
-            st.session_state.prefs = st.session_state.prefs.iloc[:n, :m]
-            return st.session_state.prefs
-        elif n > old_n:
-            st.session_state.prefs = pd.concat([st.session_state.prefs,
-                                                      pd.DataFrame(np.random.randint(low, high, (n - old_n, m)),
-                                                                   columns=[
-                                                          f"Player {i+1}" for i in range(m)],
-                                                          index=[f"Team {i+1}" for i in range(old_n, n)],
-                                                          dtype=int)],
-                                                     axis=0)
-            return st.session_state.prefs
-        else:
-            st.session_state.prefs = pd.concat([st.session_state.prefs,
-                                                      pd.DataFrame(np.random.randint(low, high,(n, m - old_m)),
-                                                                   columns=[
-                                                          f"Player {i+1}" for i in range(old_m, m)],
-                                                          index=[f"Team {i+1}" for i in range(n)],
-                                                          dtype=int)],
-                                                     axis=1)
-            return st.session_state.prefs
-
-    preferences_default = pd.DataFrame(np.random.randint(low, high, (n, m)), columns=[f"Player {i+1}" for i in range(m)],
-                                       index=[f"Team {i+1}" for i in range(n)],
-                                       dtype=int)
-    st.session_state.prefs = preferences_default
-    return st.session_state.prefs
-
-
+    if upload_preferences:
+        # Load the user-uploaded preferences file
+        state.prefs = read_upload(upload_preferences, "preferences", (n, m), -1000, 1000,
+                                  index=[f"Team {i+1}" for i in range(n)],
+                                  columns=[f"Player {j+1}" for j in range(m)])
+        return state.prefs
+
+    # The seeded table of this size, keeping the values edited by hand (until the seed changes)
+    previous = state.get("prefs") if state.get("prefs_seed") == seed else None
+    random_preferences = generators.resized(
+        lambda rows, columns: generators.random_valuations(rows, columns, low, high, [seed, 0]), n, m, previous)
+    state.prefs = pd.DataFrame(random_preferences, columns=[f"Player {i+1}" for i in range(m)],
+                               index=[f"Team {i+1}" for i in range(n)],
+                               dtype=int)
+    state.prefs_seed = seed
+    return state.prefs
+
+
+# Normalize each player's rankings (a column) to competition ranks; reused while the table is unchanged
 def restore_rankings(rankings):
-    def apply_list(arr: list):
-        indices = sorted(range(len(arr)), key=lambda i: (arr[i], i))
-        new_ranks = arr.copy()
-        cur_rank = 1
-        for ind in indices:
-            new_ranks[ind] = cur_rank
-            cur_rank += 1
-        for i in range(1, len(arr)):
-            if arr[indices[i]] == arr[indices[i - 1]]:
-                new_ranks[indices[i]] = new_ranks[indices[i - 1]]
-        return new_ranks
-    for col in rankings.columns:
-        rankings[col] = apply_list(rankings[col].tolist())
-    return rankings
-
-
-def load_rankings(n, m, shuffle=False):
-    if shuffle:
-        rankings = pd.DataFrame(np.asarray([sorted(np.arange(1, n+1, dtype=int), key=lambda _:random.random()) for _ in range(m)]),
-                                index=[
-                                    f"Player {i+1}" for i in range(m)],
-                                columns=[f"Team {i+1}" for i in range(n)],
-                                dtype=int).T
-        return rankings
-    if hasattr(st.session_state, "rankings"):
-        old_n = st.session_state.rankings.shape[0]
-        old_m = st.session_state.rankings.shape[1]
-        if n <= old_n and m <= old_m:
-            rankings = st.session_state.rankings.iloc[:n, :m]
-            return restore_rankings(rankings)
-        elif n > old_n:
-            rankings = pd.concat([st.session_state.rankings,
-                                  pd.DataFrame(np.tile(
-                                      np.arange(old_n+1, n+1, dtype=int), (m, 1)),
-                                      index=[
-                                      f"Player {i+1}" for i in range(m)],
-                                      columns=[
-                                          f"Team {i+1}" for i in range(old_n, n)],
-                                      dtype=int).T],
-                                 axis=0)
-            return restore_rankings(rankings)
-        elif m > old_m:
-            rankings = pd.concat([st.session_state.rankings,
-                                  pd.DataFrame(
-                                      np.asarray([sorted(np.arange(1, n+1, dtype=int), key=lambda _:random.random()) for _ in range(m - old_m)]),
-                                      index=[
-                                      f"Player {i+1}" for i in range(old_m, m)],
-                                      columns=[
-                                          f"Team {i+1}" for i in range(n)],
-                                      dtype=int).T],
-                                 axis=1)
-            return restore_rankings(rankings)
-        else:
-            rankings = pd.DataFrame(np.asarray([sorted(np.arange(1, n+1, dtype=int), key=lambda _:random.random()) for _ in range(m)]),
-                                    index=[
-                                        f"Player {i+1}" for i in range(m)],
-                                    columns=[f"Team {i+1}" for i in range(n)],
-                                    dtype=int).T
-            return rankings
-    rankings = pd.DataFrame(np.asarray([sorted(np.arange(1, n+1, dtype=int), key=lambda _:random.random()) for _ in range(m)]),
-                            index=[
+    return normalize_rankings(rankings, axis=0, memo=state.setdefault("rankings_memo", {}))
+
+
+def load_rankings(n, m, seed, upload_rankings=None):
+    if upload_rankings:
+        # Load the user-uploaded rankings file, one row per player (as downloaded)
+        rankings = read_upload(upload_rankings, "rankings", (m, n), 0, 100,
+                               index=[f"Player {j+1}" for j in range(m)],
+                               columns=[f"Team {i+1}" for i in range(n)])
+        return restore_rankings(rankings.T)
+
+    # Each player ranks the teams 1..n; players are the columns
+    def generate_random_rankings(rows, columns):
+        return generators.random_strict_rankings(columns, rows, [seed, 1]).T
+
+    previous = state.get("rankings") if state.get("rankings_seed") == seed else None
+    state.rankings_seed = seed
+    rankings = pd.DataFrame(generators.resized(generate_random_rankings, n, m, previous),
+                            index=[f"Team {i+1}" for i in range(n)],
+                            columns=[
                                 f"Player {i+1}" for i in range(m)],
-                            columns=[f"Team {i+1}" for i in range(n)],
-                            dtype=int).T
-    return rankings
-
-
-def wchange_callback(rankings):
-    for col in rankings.columns:
-        rankings[col] = rankings[col].map(lambda x: int(float(x)))
-    st.session_state.rankings = restore_rankings(rankings)
-
-
-def pchange_callback2(preferences):
-    for col in preferences.columns:
-        preferences[col] = preferences[col].apply(
-            lambda x: int(float(x)))
-    st.session_state.prefs = preferences
+                            dtype=int)
+    return restore_rankings(rankings)
 
 
 # Set the title and layout of the web application
@@ -252,7 +156,8 @@ st.markdown('<h1 class="header">Fast & Fair Team Distribution</h1>',
             unsafe_allow_html=True)
 
 # Insert header image
-st.sidebar.image("./resource/football.jpg", use_column_width=True)
+st.sidebar.image("./resource/football.jpg", width="stretch")
+download_options()
 st.sidebar.title("User Guide")
 
 # Define theme colors based on light and dark mode
@@ -284,7 +189,7 @@ st.sidebar.markdown(
 
     <ol>
         <li>Specify the number of teams (n) and players (m) using the number input boxes.</li>
-        <li>Enter the team and player preferences in the table.</li>
+        <li>Upload the team preferences and player rankings, or enter them in the tables.</li>
         <li>Click the "Run Algorithm" button to get the matching outcome.</li>
     </ol>
 
@@ -300,6 +205,8 @@ n = col1.number_input("Number of Teams (n)",
                       min_value=2, max_value=100, step=1)
 m = col3.number_input("Number of Players (m)", min_value=2,
                       max_value=1000, value=6, step=1)
+with col4:
+    seed = seed_input()
 
 tab1, tab2 = st.tabs(["Team Preferences", "Player Preferences"])
 
@@ -308,111 +215,55 @@ with tab1:
     st.markdown("📊 Team Preferences towards Players (-1000 to 1000):",
                 unsafe_allow_html=True)
 
-    preferences = load_preferences(m, n)
-    for col in preferences.columns:
-        preferences[col] = preferences[col].map(str)
-
-    edited_prefs = st.data_editor(preferences,
-                                key="pref_editor2",
-                                column_config={
-                                    f"Player {j}": st.column_config.TextColumn(
-                                        f"Player {j}",
-                                        help=f"Teams' Preferences towards Player {j}",
-                                        max_chars=5,
-                                        validate=r'^-?[1-9][0-9]{0,2}$|^-?1000$|^0$',
-                                        required=True,
-                                    )
-                                    for j in range(1, m+1)
-                                }
-                                |
-                                {
-                                    "_index": st.column_config.Column(
-                                        "💡 Hint",
-                                        help="Support copy-paste from Excel sheets and bulk edits",
-                                        disabled=True,
-                                    ),
-                                },
-                                on_change=partial(
-                                    pchange_callback2, preferences),
-                                )
-    with st.spinner('Updating...'):
-        for col in edited_prefs.columns:
-            edited_prefs[col] = edited_prefs[col].apply(
-                lambda x: int(float(x)))
-        st.session_state.prefs = edited_prefs
+    upload_preferences = None
+    if st.checkbox("⭐ Upload Local Preferences CSV"):
+        upload_preferences = st.file_uploader(
+            f"Upload Preferences of shape ({n}, {m})", type=UPLOAD_TYPES)
+
+    preferences = load_preferences(m, n, seed, upload_preferences)
+
+    edited_prefs = int_table_editor(preferences, "pref_editor2", -1000, 1000,
+                                    help="Teams' Preferences towards {column}")
+    state.prefs = edited_prefs
 
     preferences = edited_prefs.values
 
     # Download preferences as CSV
-    preferences_csv = edited_prefs.to_csv()
-    b64 = base64.b64encode(preferences_csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="preferences.csv">Download Preferences CSV</a>'
-    st.markdown(href, unsafe_allow_html=True)
+    download_table("Download Preferences", edited_prefs, "preferences")
 
 with tab2:
     st.markdown(
         f"🌟 Player Rankings of Teams ({1} - {n}, Permitting Ties, {1} means the highest rank):", unsafe_allow_html=True)
 
-    shuffle = st.button('Shuffle Rankings')
+    st.button('Shuffle Rankings', on_click=next_seed,
+              help="Moves on to the next random seed, which regenerates the random tables.")
+
+    upload_rankings = None
+    if st.checkbox("⭐ Upload Local Rankings CSV"):
+        upload_rankings = st.file_uploader(
+            f"Upload Rankings of shape ({m}, {n})", type=UPLOAD_TYPES)
 
     with st.spinner("Loading..."):
-        rankings = load_rankings(n, m, shuffle)
-        st.session_state.rankings = rankings
-        for col in rankings.columns:
-            rankings[col] = rankings[col].map(str)
-
-    edited_ws = st.data_editor(rankings.T,
-                            key="ranking_editor",
-                            column_config={
-                                f"Team {i}": st.column_config.TextColumn(
-                                    f"Team {i}",
-                                    help=f"Player's Rankings for Team {i}",
-                                    max_chars=4,
-                                    validate=r'^(?:100|[1-9]\d?|0)$',
-                                    required=True,
-                                )
-                                for i in range(1, n+1)
-                            }
-                            |
-                            {
-                                "_index": st.column_config.Column(
-                                    "💡 Hint",
-                                    help="You may set arbitrary values. We will reconcile the ranks upon algorithmic runs.",
-                                    disabled=True,
-                                ),
-                            },
-                            on_change=partial(wchange_callback, rankings),
-                            )
+        rankings = load_rankings(n, m, seed, upload_rankings)
+        state.rankings = rankings
+
+    edited_ws = int_table_editor(rankings.T, "ranking_editor", 0, 100,
+                                 help="Player's Rankings for {column}",
+                                 hint="You may set arbitrary values. We will reconcile the ranks upon algorithmic runs.")
     with st.spinner("Updating..."):
-        for col in edited_ws.columns:
-            edited_ws[col] = edited_ws[col].map(lambda x: int(float(x)))
-        st.session_state.rankings = restore_rankings(edited_ws.T)
+        state.rankings = restore_rankings(edited_ws.T)
     
     st.markdown(
             f"Colored Ranking Table (Preview):", unsafe_allow_html=True)
         
-    rankings = st.session_state.rankings
-    # Define formatter function
-    def format_cell_color(val):
-        max_val = rankings.values.astype(np.int32).max()
-        min_val = rankings.values.astype(np.int32).min()
-        span = max_val - min_val + 1
-        cell_val = (max_val - int(float(val))) / span  # Normalize value between 0 and 1
-        thickness = int(10 * cell_val)  # Adjust thickness as per preference
-        color = f'rgba(67, 147, 195, {cell_val})'  # Blue color with alpha value based on normalized value
-        style = f'background-color: {color}; border-bottom: {thickness}px solid {color}'
-        return style
-    
+    rankings = state.rankings
     with st.spinner("Loading Table..."):
-        st.dataframe(rankings.T.style.applymap(format_cell_color))
+        show_ranking_preview(rankings.T)
     
     rankings = rankings.T.to_numpy()
 
     # Download rankings as CSV
-    rankings_csv = edited_ws.to_csv()
-    b64 = base64.b64encode(rankings_csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="rankings.csv">Download Rankings CSV</a>'
-    st.markdown(href, unsafe_allow_html=True)
+    download_table("Download Rankings", edited_ws, "rankings")
 
 # Add expandable information card
 with st.expander("ℹ️ Information", expanded=False):
@@ -521,17 +372,14 @@ with st.expander("ℹ️ Information", expanded=False):
     
 
 start_algo = st.button("⏳ Run Matching Algorithm")
+# The algorithm runs as a background job; its outcome is kept for these inputs, so the page stays usable meanwhile
+run_key = content_hash(preferences, rankings)
 if start_algo:
-    with st.spinner('Executing...'):
-        if n * m * 0.01 > 3:
-            time.sleep(2)
-        else:
-            time.sleep(n * m * 0.01)
-
-    start_time = time.time()
-    outcomes = compute_EF11_ssba(n, m, preferences, rankings)
-    end_time = time.time()
-    elapsed_time = end_time - start_time
+    submit_job(state, "run", run_key, compute_EF11_ssba, preferences, rankings, label="The matching")
+run = job_result(state, "run", run_key)
+if run is not None:
+    outcomes = dict(enumerate(run.result))
+    elapsed_time = run.seconds
 
     st.write("🎉 Outcomes:")
     outcomes_list = [[key, sorted(value)] for key, value in outcomes.items()]
@@ -542,107 +390,43 @@ if start_algo:
         lambda x: [_x + 1 for _x in x])
     outcomes_df['Players'] = outcomes_df['Players'].apply(
         lambda x: ', '.join(map(str, x)))
+    outcomes_df['Player count'] = [len(value) for value in outcomes.values()]
+    outcomes_df['Value'] = [int(preferences[key, value].sum()) for key, value in outcomes.items()]
 
     # Sort the table
     outcomes_df = outcomes_df.sort_values(['Team'],
                                           key=lambda col: col.astype(int))
 
-    st.data_editor(outcomes_df,
+    # Only a page of the outcomes is sent to the browser; search and sort run here
+    outcome_viewer(outcomes_df, "teams_outcomes", ["Player count", "Value"],
                    column_config={
-                       "Teams": st.column_config.NumberColumn(
+                       "Team": st.column_config.TextColumn(
                            "Team",
                            help="The list of team that get matched",
-                           step=1,
                        ),
-                       "Players": st.column_config.ListColumn(
+                       "Players": st.column_config.TextColumn(
                            "Players",
                            help="The list of players allocated to teams",
                        ),
-                   },
-                   hide_index=True,
-                   disabled=True,
-                   )
+                       "Value": st.column_config.NumberColumn(
+                           "Value",
+                           help="The team's value for its players",
+                       ),
+                   })
 
     # Print timing results
     st.write(f"⏱️ Timing Results:")
     st.write(f"Elapsed Time: {elapsed_time:.4f} seconds")
     
-    # EF[1,1] for every pair of teams.
-    # Swap-stable for every pair of players.
-    balancedness = max(map(lambda x:len(x), outcomes.values())) - min(map(lambda x:len(x), outcomes.values()))
-    ordinal = lambda n: "%s" % ("tsnrhtdd"[(n//10%10!=1)*(n%10<4)*n%10::4])    
-    
-    output_str = f"The teams have a **balanced** number of players (with a maximum difference of **{int(balancedness)}**). \n\n"
-
-    output_str += '<h3 class="information-card-header">Fulfilling EF[1,1]</h3>\n\n'
-    has_lead_str = False
-
-    for i in range(n):
-        if not has_lead_str:
-            b = outcomes[i]
-            output_str += f"**Team {i+1}** is allocated with players valued at {sum(preferences[i][b])} in total.\n\n"
-            has_lead_str = True
-        for j in range(n):
-            if i == j:
-                continue
-            else:
-                bi, bj = outcomes[i], outcomes[j]
-                if sum(preferences[i][bj]) <= sum(preferences[i][bi]):
-                    output_str += f"Team {i+1} values Team {j+1}'s allocation at {sum(preferences[i][bj])}, and it does not envy Team {j+1} because {sum(preferences[i][bi])} ≥ {sum(preferences[i][bj])}.\n\n"
-                elif (preferences[i][bi].size > 0 and min(preferences[i][bi]) < 0) and (preferences[i][bj].size > 0 and max(preferences[i][bj]) >= 0):
-                    output_str += f"Team {i+1} values Team {j+1}'s allocation at {sum(preferences[i][bj])}, but its own player has a minimum value of {min(preferences[i][bi])}. Team {i+1}'s maximum value for a player in Team {j+1} is {max(preferences[i][bj])}. Team {i+1} does not envy Team {j+1} under EF[1,1] because the difference between {sum(preferences[i][bi])} and {min(preferences[i][bi])} equals {sum(preferences[i][bi]) - min(preferences[i][bi])}, which is ≥ {sum(preferences[i][bj]) - max(preferences[i][bj])} = {sum(preferences[i][bj])} - {max(preferences[i][bj])}.\n\n"
-                elif (preferences[i][bi].size == 0 or min(preferences[i][bi]) >= 0) and (preferences[i][bj].size > 0 and max(preferences[i][bj]) >= 0):
-                    output_str += f"Team {i+1} values Team {j+1}'s allocation at {sum(preferences[i][bj])}. Team {i+1}'s maximum value for a player in Team {j+1}'s allocation is {max(preferences[i][bj])}. Despite this, Team {i+1} does not envy Team {j+1} under EF[1,1] because {sum(preferences[i][bi])} ≥ {sum(preferences[i][bj]) - max(preferences[i][bj])} = {sum(preferences[i][bj])} - {max(preferences[i][bj])}.\n\n"
-                elif (preferences[i][bi].size > 0 and min(preferences[i][bi]) < 0) and (preferences[i][bj].size == 0 or max(preferences[i][bj]) < 0):
-                    output_str += f"Team {i+1} values Team {j+1}'s allocation at {sum(preferences[i][bj])}, but its own player has a minimum value of {min(preferences[i][bi])}. Despite this, Team {i+1} does not envy Team {j+1} under EF[1,1] because the difference between {sum(preferences[i][bi])} and {min(preferences[i][bi])} is {sum(preferences[i][bi]) - min(preferences[i][bi])}, which is ≥ {sum(preferences[i][bj])}.\n\n"
-                else:
-                    pass
-                
-# Team 2 values Team 1's allocation at -34, but its own player has a minimum value of -54. Despite this, Team 2 does not envy Team 1 under EF[1,1] because the difference (-54 - -54) equals 0, which is ≥ -34.
-
-        has_lead_str = False
-        
-    def reverse_dict(outcome: dict):
-        pl2tm = {}
-        for tm, pls in outcome.items():
-            for pl in pls:
-                pl2tm[pl] = tm
-        return pl2tm    
-
-    output_str2 = '<h3 class="information-card-header">Fulfilling Swap Stability</h3>\n\n'
-    pl2tm = reverse_dict(outcomes)
-    for i in range(m):
-        for j in range(i+1, m):
-            ti = pl2tm[i]
-            tj = pl2tm[j]
-            if ti == tj:
-                continue
-            output_str2 += f"**If we swap Player {i+1} (Team {ti+1}) with Player {j+1} (Team {tj+1})**, "
-            if preferences[ti][i] >= preferences[ti][j]:
-                output_str2 += f"the values for Team {ti+1} will decrease from {preferences[ti][i]} to {preferences[ti][j]}, "
-            if preferences[tj][j] >= preferences[tj][i]:
-                output_str2 += f"the values for Team {tj+1} will decrease from {preferences[tj][j]} to {preferences[tj][i]}, "
-            if rankings[i][ti] < rankings[i][tj]:
-                output_str2 += f"Player {i+1}'s rank will drop from {rankings[i][ti]}<sup>{ordinal(rankings[i][ti])}</sup> to {rankings[i][tj]}<sup>{ordinal(rankings[i][tj])}</sup>, "
-            if rankings[j][tj] < rankings[j][ti]:
-                output_str2 += f"Player {j+1}'s rank will drop from {rankings[j][tj]}<sup>{ordinal(rankings[j][tj])}</sup> to {rankings[j][ti]}<sup>{ordinal(rankings[j][ti])}</sup>, "
-    
-            output_str2 += f"and hence swapping Player {i+1} with Player {j+1} is **not beneficial.**\n\n"
-
-    with st.expander(f"Explanations of Outcomes (**about {n**2 + int(m*(m-1)/2) * 2} lines**)", expanded=False):
-        st.download_button('Download Full Explanations', output_str + output_str2,
-                           file_name=f"{n}_teams_{m}_players_match_expl.txt")
-        st.markdown(output_str, unsafe_allow_html=True)
-        st.markdown(output_str2, unsafe_allow_html=True)
+    # EF[1,1] for every pair of teams, and swap stability for every pair of players: the explanation is
+    # built line by line, only for the lines shown (or downloaded)
+    explanation = team_distribution_explanation(run.result, preferences, rankings)
+    explanation_expander(f"Explanations of Outcomes (**about {len(explanation)} lines**)", explanation,
+                         f"{n}_teams_{m}_players_match_expl.txt", key="teams_explanation")
 
     # Download outcomes in JSON format
-    outcomes_json = json.dumps({otc[0]: otc[1]
-                               for otc in outcomes_df.to_numpy()}, indent=4)
-    st.markdown("### Download Outcomes as JSON")
-    b64 = base64.b64encode(outcomes_json.encode()).decode()
-    href = f'<a href="data:application/json;base64,{b64}" download="outcomes.json">Download Outcomes JSON</a>'
-    st.markdown(href, unsafe_allow_html=True)
-    st.json(outcomes_json)
+    show_outcomes_json(outcomes_df)
+    download_outcomes(outcomes, "Team", "Player")
 
 hide_streamlit_style = """
     <style>
@@ -652,6 +436,9 @@ hide_streamlit_style = """
 """
 st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
+memory_report(state)
+cache_report()
+
 st.markdown(
     """
     <div class="footer" style="padding-top: 200px; margin-top: auto; text-align: left; font-size: 10px; color: #777777;">
@@ -1,15 +1,25 @@
-from collections import defaultdict
-import base64
-from functools import partial
-import json
-import random
-import time
-
-import numpy as np
+
 import pandas as pd
 from pandas import Index
 import streamlit as st
 
+from core import generators
+from core.algorithms.house_assignment import compute_envyfree_assignment
+from core.cache import content_hash
+from core.explain import house_assignment_explanation, house_failure_explanation
+from core.formats import UPLOAD_TYPES
+from core.rankings import min_ranks, normalize_rankings
+from ui.downloads import download_options, download_table
+from ui.heatmap import show_ranking_preview
+from ui.cache import cache_report
+from ui.explanations import explanation_expander
+from ui.imports import warm_up
+from ui.jobs import job_result, submit_job
+from ui.outcomes import download_outcomes, outcome_viewer, show_outcomes_json
+from ui.tables import int_table_editor, read_upload
+from ui.state import PageState, memory_report
+from ui.widgets import next_seed, seed_input
+
 
 # Set page configuration
 st.set_page_config(
@@ -18,6 +28,12 @@ st.set_page_config(
     layout="wide",
 )
 
+# Tables of this page live in their own namespace of the session state
+state = PageState("house_assignment", tables=["orderings"])
+
+# The solver libraries are imported in the background while the page renders
+warm_up()
+
 # Custom CSS styles
 st.markdown(
     """
@@ -87,153 +103,39 @@ st.markdown(
 )
 
 
-def compute_envyfree_assignment(n, m, orderings):
-    M = list(range(m))
-    while n <= len(M):
-        edges_nm = defaultdict(list)
-        edges_mn = defaultdict(list)
-        for m_ in M:
-            for i in range(n):
-                if orderings[i][m_] == min(orderings[i][M]):
-                    print(orderings[i][M])
-                    edges_nm[i].append(m_)
-                    edges_mn[m_].append(i)
-        
-        # Check if n-saturating matching exists
-        matching = dict()
-        houses_left = set(range(m))
-        for house, agents in edges_mn.items():
-            if len(agents) == 1 and agents[0] not in matching:
-                matching[agents[0]] = house
-                houses_left.remove(house)
-            else:
-                for agent in agents:
-                    if agent not in matching and len(edges_nm[agent]) == 1:
-                        matching[agent] = house
-                        houses_left.remove(house)
-                        break
-
-        for agent, houses in edges_nm.items():
-            if agent in matching:
-                continue
-            for house in houses:
-                if house in houses_left:
-                    matching[agent] = house
-                    houses_left.remove(house)
-                    break
-
-        if len(matching.keys()) == n:
-            return matching, True
-
-        # No n-saturating match exists
-        X_u = set(range(n)) - set(matching.keys())
-        assert len(X_u) > 0, "Unmatched vertices in X should not be empty"
-
-        edges = defaultdict(list)
-        for agent, houses in edges_nm.items():
-            for house in houses:
-                edges[agent].append(house + n)
-            
-        for agent, house in matching.items():
-            edges[house + n].append(agent)
-            
-        Z = set()
-        rand_v = list(X_u)[0]
-        
-        def DFS(vert, Z):
-            Z.add(vert)
-            for nbr in edges[vert]:
-                if nbr not in Z:
-                    DFS(nbr, Z)
-        DFS(rand_v, Z)
-        for z in Z:
-            if z < n and z in edges_nm:
-                for house in edges_nm[z]:
-                    if house in M:
-                        M.remove(house)
-                        
-        print("M",M)
-
-    return matching, False
-
-
+# Normalize each agent's orderings (a row) to competition ranks; reused while the table is unchanged
 def restore_orderings(orderings):
-    orderings = orderings.T
-    def apply_list(arr: list):
-        indices = sorted(range(len(arr)), key=lambda i: (arr[i], i))
-        new_ranks = arr.copy()
-        cur_rank = 1
-        for ind in indices:
-            new_ranks[ind] = cur_rank
-            cur_rank += 1
-        for i in range(1, len(arr)):
-            if arr[indices[i]] == arr[indices[i - 1]]:
-                new_ranks[indices[i]] = new_ranks[indices[i - 1]]
-        return new_ranks
-    for col in orderings.columns:
-        orderings[col] = apply_list(orderings[col].tolist())
-    return orderings.T
-
-
-def load_orderings(n, m, shuffle=False):
-    def generate_random_orderings():
-        # n_fav = np.random.randint(0, m//2.5)
-        # return pd.DataFrame(np.asarray([sorted(np.concatenate([np.ones(n_fav),np.arange(n_fav+1, m+1, dtype=int)], axis=0), 
-        #                                        key=lambda _:random.random()) for _ in range(n)]),
-        rankings = pd.DataFrame(np.asarray([sorted(np.random.randint(1, m+1, size=(m,)), 
-                                               key=lambda _:random.random()) for _ in range(n)]),
-                                columns=[
-                                    f"House {i+1}" for i in range(m)],
-                                index=[f"Agent {i+1}" for i in range(n)],
-                                dtype=int)
-        return restore_orderings(rankings)
-    if shuffle:
-        return generate_random_orderings()
-    if hasattr(st.session_state, "orderings"):
-        old_n = st.session_state.orderings.shape[0]
-        old_m = st.session_state.orderings.shape[1]
-        if n <= old_n and m <= old_m:
-            orderings = st.session_state.orderings.iloc[:n, :m]
-            return restore_orderings(orderings)
-        elif n > old_n:
-            orderings = pd.concat([st.session_state.orderings,
-                                  pd.DataFrame(
-                                      np.asarray([sorted(np.arange(1, m+1, dtype=int), key=lambda _:random.random()) for _ in range(n - old_n)]),
-                                      columns=[
-                                      f"House {i+1}" for i in range(m)],
-                                      index=[
-                                          f"Agent {i+1}" for i in range(old_n, n)],
-                                      dtype=int)],
-                                 axis=0)
-            return restore_orderings(orderings)
-        elif m > old_m:
-            orderings = pd.concat([st.session_state.orderings,
-                                  pd.DataFrame(np.tile(
-                                      np.arange(old_m+1, m+1, dtype=int), (n, 1)),
-                                      columns=[
-                                      f"House {i+1}" for i in range(old_m, m)],
-                                      index=[
-                                          f"Agent {i+1}" for i in range(n)],
-                                      dtype=int)],
-                                 axis=1)
-            return restore_orderings(orderings)
-        else:
-            return generate_random_orderings()
-    return generate_random_orderings()
-
+    return normalize_rankings(orderings, axis=1, memo=state.setdefault("orderings_memo", {}))
 
-def ochange_callback(orderings):
-    for col in orderings.columns:
-        orderings[col] = orderings[col].map(lambda x: int(float(x)))
-    st.session_state.orderings = restore_orderings(orderings)
 
+def load_orderings(n, m, seed, upload_orderings=None):
+    if upload_orderings:
+        # Load the user-uploaded orderings file
+        orderings = read_upload(upload_orderings, "orderings", (n, m), 0, 100,
+                                index=[f"Agent {i+1}" for i in range(n)],
+                                columns=[f"House {j+1}" for j in range(m)])
+        return restore_orderings(orderings)
+
+    # Each agent ranks the houses 1..m, with ties
+    def generate_random_orderings(rows, columns):
+        return min_ranks(generators.random_tied_rankings(rows, columns, seed), axis=1)
+
+    previous = state.get("orderings") if state.get("orderings_seed") == seed else None
+    state.orderings_seed = seed
+    orderings = pd.DataFrame(generators.resized(generate_random_orderings, n, m, previous),
+                             columns=[
+                                 f"House {i+1}" for i in range(m)],
+                             index=[f"Agent {i+1}" for i in range(n)],
+                             dtype=int)
+    return restore_orderings(orderings)
 
 # Set the title and layout of the web application
 st.markdown('<h1 class="header">Fast & Fair House Assignment</h1>',
             unsafe_allow_html=True)
 
 # Insert header image
-st.sidebar.image("./resource/houses.png", use_column_width=True)
+st.sidebar.image("./resource/houses.png", width="stretch")
+download_options()
 
 st.sidebar.title("User Guide")
 
@@ -266,7 +168,7 @@ st.sidebar.markdown(
 
     <ol>
         <li>Specify the number of Agents (n) and Houses (m) using the number input boxes.</li>
-        <li>Enter the Agent preferences towards houses (as rankings) in the table.</li>
+        <li>Upload the Agent preferences towards houses (as rankings), or enter them in the table.</li>
         <li>Click the "Run Algorithm" button to get the assignment outcome.</li>
     </ol>
 
@@ -282,6 +184,8 @@ n = col1.number_input("Number of Agents (n)",
                       min_value=2, max_value=100, step=1)
 m = col3.number_input("Number of Houses (m)", min_value=2,
                       max_value=1000, value=n, step=1)
+with col4:
+    seed = seed_input()
 if m < n:
     st.error("Number of Houses (m) must be greater than or equal to Number of Agents (n). Please adjust the values.")
 
@@ -290,66 +194,35 @@ ordinal = lambda n: "%s" % ("tsnrhtdd"[(n//10%10!=1)*(n%10<4)*n%10::4])
 st.markdown(
     f"🌟 Agent Preferences towards Houses (ranks from {1}<sup>st</sup> to {m}<sup>{ordinal(m)}</sup> with ties permitted):", unsafe_allow_html=True)
 
-shuffle = st.button('Shuffle Rankings')
+st.button('Shuffle Rankings', on_click=next_seed,
+          help="Moves on to the next random seed, which regenerates the random rankings.")
+
+upload_orderings = None
+if st.checkbox("⭐ Upload Local Rankings CSV"):
+    upload_orderings = st.file_uploader(
+        f"Upload Rankings of shape ({n}, {m})", type=UPLOAD_TYPES)
 
 with st.spinner("Loading..."):
-    orderings = load_orderings(n, m, shuffle)
-    st.session_state.orderings = orderings
-    for col in orderings.columns:
-        orderings[col] = orderings[col].map(str)
-
-edited_ws = st.data_editor(orderings,
-                        key="ranking_editor",
-                        column_config={
-                            f"House {i}": st.column_config.TextColumn(
-                                f"House {i}",
-                                help=f"Agent's orderings for House {i}",
-                                max_chars=4,
-                                validate=r'^(?:100|[1-9]\d?|0)$',
-                                required=True,
-                            )
-                            for i in range(1, m+1)
-                        }
-                        |
-                        {
-                            "_index": st.column_config.Column(
-                                "💡 Hint",
-                                help="You may set arbitrary values. We will reconcile the ranks upon algorithmic runs.",
-                                disabled=True,
-                            ),
-                        },
-                        on_change=partial(ochange_callback, orderings),
-                        )
+    orderings = load_orderings(n, m, seed, upload_orderings)
+    state.orderings = orderings
+
+edited_ws = int_table_editor(orderings, "ranking_editor", 0, 100,
+                             help="Agent's orderings for {column}",
+                             hint="You may set arbitrary values. We will reconcile the ranks upon algorithmic runs.")
 with st.spinner("Updating..."):
-    for col in edited_ws.columns:
-        edited_ws[col] = edited_ws[col].map(lambda x: int(float(x)))
-    st.session_state.orderings = restore_orderings(edited_ws)
+    state.orderings = restore_orderings(edited_ws)
 
 st.markdown(
         f"Colored Ranking Table (Preview):", unsafe_allow_html=True)
     
-orderings = st.session_state.orderings
-# Define formatter function
-def format_cell_color(val):
-    max_val = orderings.values.astype(np.int32).max()
-    min_val = orderings.values.astype(np.int32).min()
-    span = max_val - min_val + 1
-    cell_val = (max_val - int(float(val))) / span  # Normalize value between 0 and 1
-    thickness = int(10 * cell_val)  # Adjust thickness as per preference
-    color = f'rgba(67, 147, 195, {cell_val})'  # Blue color with alpha value based on normalized value
-    style = f'background-color: {color}; border-bottom: {thickness}px solid {color}'
-    return style
-
+orderings = state.orderings
 with st.spinner("Loading Table..."):
-    st.dataframe(orderings.style.applymap(format_cell_color))
+    show_ranking_preview(orderings)
 
 orderings = orderings.to_numpy()
 
 # Download orderings as CSV
-orderings_csv = edited_ws.to_csv()
-b64 = base64.b64encode(orderings_csv.encode()).decode()
-href = f'<a href="data:file/csv;base64,{b64}" download="orderings.csv">Download Rankings CSV</a>'
-st.markdown(href, unsafe_allow_html=True)
+download_table("Download Rankings", edited_ws, "orderings")
 
 # Add expandable information card
 with st.expander("ℹ️ Information", expanded=False):
@@ -424,23 +297,22 @@ with st.expander("ℹ️ Information", expanded=False):
 
 
 start_algo = st.button("⏳ Run Assignment Algorithm")
+# The algorithm runs as a background job; its outcome is kept for these inputs, so the page stays usable meanwhile
+run_key = content_hash(orderings)
 if start_algo:
-    with st.spinner('Executing...'):
-        if n * m * 0.01 > 3:
-            time.sleep(2)
-        else:
-            time.sleep(n * m * 0.01)
-
-    start_time = time.time()
-    outcomes, flag = compute_envyfree_assignment(n, m, orderings)
-    end_time = time.time()
-    elapsed_time = end_time - start_time
+    submit_job(state, "run", run_key, compute_envyfree_assignment, orderings, label="The assignment")
+run = job_result(state, "run", run_key)
+if run is not None:
+    houses, flag = run.result
+    outcomes = {agent: house for agent, house in enumerate(houses.tolist()) if house >= 0}
+    elapsed_time = run.seconds
     
     outcomes_list = [[key, value] for key, value in outcomes.items()]
     outcomes_df = pd.DataFrame(outcomes_list, columns=['Agent', 'House'])
     outcomes_df += 1
     outcomes_df['Agent'] = outcomes_df['Agent'].apply(str)
     outcomes_df['House'] = outcomes_df['House'].apply(str)
+    outcomes_df['Rank'] = [int(orderings[key, value]) for key, value in outcomes.items()]
 
     # Sort the table
     outcomes_df = outcomes_df.sort_values(['Agent'],
@@ -456,101 +328,61 @@ if start_algo:
                 style = f'background-color: {color}; border-bottom: {1}px solid {color}'
                 return style
             
-            st.data_editor(outcomes_df.style.applymap(format_cell_color),
-                            column_config={
-                                "Agent": st.column_config.NumberColumn(
-                                    "Agent",
-                                    help="The list of Agent that get matched",
-                                    step=1,
-                                ),
-                                "House": st.column_config.ListColumn(
-                                    "House",
-                                    help="The House allocated to an Agent",
-                                ),
-                            },
-                            hide_index=True,
-                            disabled=True,
-                            )
+            outcome_viewer(outcomes_df, "houses_outcomes", ["Rank"], style=format_cell_color,
+                           column_config={
+                               "Agent": st.column_config.TextColumn(
+                                   "Agent",
+                                   help="The list of Agent that get matched",
+                               ),
+                               "House": st.column_config.TextColumn(
+                                   "House",
+                                   help="The House allocated to an Agent",
+                               ),
+                               "Rank": st.column_config.NumberColumn(
+                                   "Rank",
+                                   help="The agent's rank of its house",
+                               ),
+                           })
         else:
             st.write("No houses get allocated in the end.")
         
-        output_str = '<h3 class="information-card-header">Not Fulfilling Envy-Freeness</h3>\n\n'
-        
-        u_agents = sorted(list(set(range(n)) - set(outcomes.keys())))
-        u_houses = sorted(list(set(range(m)) - set(outcomes.values())))
-        
-        for ua in u_agents:
-            output_str += f"Agent {ua+1} gets unallocated.\n\n"
-            for uh in u_houses:
-                output_str += f"**If it gets allocated House {uh+1} ranked at {orderings[ua][uh]}<sup>{ordinal(orderings[ua][uh])}</sup>**, "
-                for (a, h) in outcomes.items():
-                    if orderings[a][h] > orderings[a][uh]:
-                        output_str += f"Agent {a+1} will envy it as Agent {a+1} ranks House {uh+1} \
-                            at {orderings[a][uh]}<sup>{ordinal(orderings[a][uh])}</sup> and its current house \
-                                at {orderings[a][h]}<sup>{ordinal(orderings[a][h])}</sup>, "
-                                
-                    if orderings[ua][h] < orderings[ua][uh]:
-                        output_str += f"it will envy Agent {a+1} as it ranks House {h+1} \
-                            at {orderings[ua][h]}<sup>{ordinal(orderings[ua][h])}</sup>, "
-                                
-                output_str += "and hence, it does not constitute any envy-free allocation.\n\n"
-        
-        with st.expander(f"Reasons for Failures", expanded=True):
-            st.markdown(output_str, unsafe_allow_html=True)
+        # The explanation is built line by line, only for the lines shown (or downloaded)
+        explanation_expander("Reasons for Failures", house_failure_explanation(houses, orderings),
+                             f"{n}_Agents_{m}_Houses_failure_expl.txt", key="houses_failure_explanation",
+                             expanded=True)
 
     else:
         st.write("🎉 Outcomes:")
 
-        st.data_editor(outcomes_df,
-                    column_config={
-                        "Agent": st.column_config.NumberColumn(
-                            "Agent",
-                            help="The list of Agent that get matched",
-                            step=1,
-                        ),
-                        "House": st.column_config.ListColumn(
-                            "House",
-                            help="The House allocated to an Agent",
-                        ),
-                    },
-                    hide_index=True,
-                    disabled=True,
-                    )
+        # Only a page of the outcomes is sent to the browser; search and sort run here
+        outcome_viewer(outcomes_df, "houses_outcomes", ["Rank"],
+                       column_config={
+                           "Agent": st.column_config.TextColumn(
+                               "Agent",
+                               help="The list of Agent that get matched",
+                           ),
+                           "House": st.column_config.TextColumn(
+                               "House",
+                               help="The House allocated to an Agent",
+                           ),
+                           "Rank": st.column_config.NumberColumn(
+                               "Rank",
+                               help="The agent's rank of its house",
+                           ),
+                       })
 
         # Print timing results
         st.write(f"⏱️ Timing Results:")
         st.write(f"Elapsed Time: {elapsed_time:.4f} seconds")
     
-        output_str = '<h3 class="information-card-header">Envy-Freeness</h3>\n\n'
-        has_lead_str = False
-        
-        for i in range(n):
-            if not has_lead_str:
-                b = outcomes[i]
-                output_str += f"**Agent {i+1}** has received House {outcomes[i]+1} ranked at {orderings[i][outcomes[i]]}<sup>{ordinal(orderings[i][outcomes[i]])}</sup>.\n\n"
-                has_lead_str = True
-            for j in range(n):
-                if i == j:
-                    continue
-                else:
-                    bi, bj = outcomes[i], outcomes[j]
-                    output_str += f"Agent {i+1} ranks Agent {j+1}'s House {bj+1} at {orderings[i][bj]}<sup>{ordinal(orderings[i][bj])}</sup>, so it does not envy Agent {j+1} as rank {orderings[i][bj]}<sup>{ordinal(orderings[i][bj])}</sup> is lower than or equal to rank {orderings[i][bi]}<sup>{ordinal(orderings[i][bi])}</sup>.\n\n"
-                    
-            has_lead_str = False
-            
-        with st.expander(f"Explanations of Outcomes (**about {n**2} lines**)", expanded=False):
-            st.download_button('Download Full Explanations', output_str,
-                               file_name=f"{n}_Agents_{m}_Houses_assign_expl.txt")
-            st.markdown(output_str, unsafe_allow_html=True)
+        # The explanation is built line by line, only for the lines shown (or downloaded)
+        explanation_expander(f"Explanations of Outcomes (**about {n**2} lines**)",
+                             house_assignment_explanation(houses, orderings),
+                             f"{n}_Agents_{m}_Houses_assign_expl.txt", key="houses_explanation")
 
         # Download outcomes in JSON format
-        outcomes_json = json.dumps({otc[0]: otc[1]
-                                for otc in outcomes_df.to_numpy()}, indent=4)
-        st.markdown("### Download Outcomes as JSON")
-        b64 = base64.b64encode(outcomes_json.encode()).decode()
-        href = f'<a href="data:application/json;base64,{b64}" download="outcomes.json">Download Outcomes JSON</a>'
-        st.markdown(href, unsafe_allow_html=True)
-        st.json(outcomes_json)
+        show_outcomes_json(outcomes_df)
+        download_outcomes({agent: [house] for agent, house in outcomes.items()}, "Agent", "House")
 
 hide_streamlit_style = """
     <style>
@@ -560,6 +392,9 @@ hide_streamlit_style = """
 """
 st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
+memory_report(state)
+cache_report()
+
 st.markdown(
     """
     <div class="footer" style="padding-top: 200px; margin-top: auto; text-align: left; font-size: 10px; color: #777777;">
@@ -1,16 +1,21 @@
-import logging
-
 # Required Libraries
-from collections import defaultdict
-import base64
-from functools import partial
-import json
-import time
-import random
-import numpy as np
 import pandas as pd
 import streamlit as st
-import networkz as nx
+
+from core import generators
+from core.algorithms import rank_maximal_matching
+from core.cache import content_hash
+from core.formats import UPLOAD_TYPES
+from core.rankings import normalize_rankings
+from ui.downloads import download_options, download_table
+from ui.heatmap import show_ranking_preview
+from ui.cache import cache_report, cached
+from ui.imports import import_report, warm_up
+from ui.jobs import job_result, submit_job
+from ui.outcomes import download_outcomes, outcome_viewer, show_outcomes_json
+from ui.tables import int_table_editor, read_upload
+from ui.state import PageState, memory_report
+from ui.widgets import next_seed, seed_input
 
 MIN_AGENTS = 2
 MAX_AGENTS = 500
@@ -18,143 +23,28 @@ MIN_ITEMS = 1
 MAX_ITEMS = 1000
 
 
-# Transform agent/item names into their corresponding index positions.
-def pindex(name: str) -> int:
-    return int(name.split()[1])-1
-
-def get_rank(preferences, agent, item):
-    return preferences[pindex(agent),pindex(item)]
-
-
 # Load Preferences
-def load_preferences(m, n, upload_preferences = False, shuffle = False):
-    if hasattr(st.session_state, "preferences"):
-        if upload_preferences:
-            preferences_default = None
-            # Load the user-uploaded preferences file
-            try:
-                preferences_default = pd.read_csv(
-                    upload_preferences, index_col=0)
-                if preferences_default.shape != (n, m):
-                    x, y = preferences_default.shape
-                    st.session_state.preferences.iloc[:x,
-                                                      :y] = preferences_default
-                else:
-                    st.session_state.preferences = pd.DataFrame(preferences_default,
-                                                                columns=st.session_state.preferences.columns,
-                                                                index=st.session_state.preferences.index)
-                return st.session_state.preferences
-            except Exception as e:
-                st.error(f"An error occurred while loading the preferences file.")
-                logging.debug("file uploding error: ", e)
-                st.stop()
-                
-        old_n = st.session_state.preferences.shape[0]
-        old_m = st.session_state.preferences.shape[1]     
-        max_rank = m+1
-   
-        if shuffle:
-            population = list(range(1, max_rank))
-            random_ranks =[random.sample(population,m) for _ in range(n)]
-            st.session_state.preferences = pd.DataFrame(random_ranks,
-                                                                   columns=[
-                                                          f"Item {i+1}" for i in range(0, m)],
-                                                          index=[f"Agent {i+1}" for i in range(n)])
-            print(st.session_state.preferences)
-            return st.session_state.preferences
-        
-        
-        if n <= old_n and m <= old_m:
-            st.session_state.preferences = st.session_state.preferences.iloc[:n, :m]
-            return st.session_state.preferences
-        elif n > old_n:
-            st.session_state.preferences = pd.concat([st.session_state.preferences,
-                                                      pd.DataFrame(np.random.randint(1, max_rank,(n - old_n,m) ),
-                                                                   columns=[
-                                                          f"Item {i+1}" for i in range(m)],
-                                                          index=[f"Agent {i+1}" for i in range(old_n, n)])],
-                                                     axis=0)
-            return st.session_state.preferences
-        elif m > old_m:
-            population = list(range(1, max_rank))
-            random_ranks =[random.sample(population,m) for _ in range(n)]
-            st.session_state.preferences = pd.DataFrame(random_ranks,
-                                                                   columns=[
-                                                          f"Item {i+1}" for i in range(0, m)],
-                                                          index=[f"Agent {i+1}" for i in range(n)])
-            return st.session_state.preferences
-        else:
-            st.session_state.preferences = pd.DataFrame(np.random.randint(1, max_rank, (n, m)), columns=[f"Item {i+1}" for i in range(m)],
-                                                        index=[f"Agent {i+1}" for i in range(n)])
-            return st.session_state.preferences
-
+def load_preferences(m, n, upload_preferences = False, seed = 0):
     if upload_preferences:
-        preferences_default = None
         # Load the user-uploaded preferences file
-        try:
-            preferences_default = pd.read_csv(upload_preferences)
-            if preferences_default.shape != (n, m):
-                st.error(
-                    f"The uploaded preferences file should have a shape of ({n}, {m}).")
-                st.stop()
-        except Exception as e:
-            st.error("An error occurred while loading the preferences file.")
-            st.stop()
-    else:
-        preferences_default = pd.DataFrame(np.random.randint(1, m+1, (n, m)), 
-                                           columns=[f"Item {i+1}" for i in range(m)],
-                                           index=[f"Agent {i+1}" for i in range(n)])
-    st.session_state.preferences = preferences_default
-    return st.session_state.preferences
-
-# Make orderings based on the cadinality of the preferences
+        state.preferences = read_upload(upload_preferences, "preferences", (n, m), 0, 999,
+                                        index=[f"Agent {i+1}" for i in range(n)],
+                                        columns=[f"Item {j+1}" for j in range(m)])
+        return state.preferences
+
+    # The seeded rankings of this size, keeping the values edited by hand (until the seed changes)
+    previous = state.get("preferences") if state.get("preferences_seed") == seed else None
+    random_ranks = generators.resized(
+        lambda rows, columns: generators.random_strict_rankings(rows, columns, seed), n, m, previous)
+    state.preferences = pd.DataFrame(random_ranks, columns=[f"Item {i+1}" for i in range(m)],
+                                     index=[f"Agent {i+1}" for i in range(n)])
+    state.preferences_seed = seed
+    return state.preferences
+
+# Make orderings based on the cadinality of the preferences; reused while the table is unchanged
 def restore_orderings(orderings):
-    orderings = orderings.T
-    def apply_list(arr: list):
-        indices = sorted(range(len(arr)), key=lambda i: (arr[i], i))
-        new_ranks = arr.copy()
-        cur_rank = 1
-        for ind in indices:
-            new_ranks[ind] = cur_rank
-            cur_rank += 1
-        for i in range(1, len(arr)):
-            if arr[indices[i]] == arr[indices[i - 1]]:
-                new_ranks[indices[i]] = new_ranks[indices[i - 1]]
-        return new_ranks
-    for col in orderings.columns:
-        orderings[col] = apply_list(orderings[col].tolist())
-    return orderings.T
-
-# Preference Change Callback: used in Streamlit widget on_click / on_change
-def preference_change_callback(preferences):
-    for col in preferences.columns:
-        preferences[col] = preferences[col].apply(
-            lambda x: int(float(x)))
-    st.session_state.preferences = preferences
-
-# Algorithm Implementation
-def algorithm(m, n, preferences):
-    ranker_list =[f"Agent {i+1}" for i in range(n)]
-    logging.debug('ranker list:', ranker_list)
-    G = nx.Graph()
-    for i in range(n):
-        for j in range(m):
-            rank = preferences[i,j]
-            print(rank)
-            G.add_edge(f"Agent {i+1}", f"Item {j+1}", rank=rank)
-    M = nx.rank_maximal_matching(G=G, top_nodes=ranker_list, rank='rank')
-    print("RMM Matching: ", M)
-    half_length = len(M) // 2
-    half_M = {k: M[k] for k in list(M)[:half_length]}
-    return half_M
-    
-   
-# Checker Function for Algorithm - 
-def algorithm_checker(outcomes, preferences):
-    from collections import Counter
-    result_vector = dict(Counter([get_rank(preferences, agent, item) for agent, item in outcomes.items()]))
-    logging.debug('Result Vector:', result_vector)
-    return result_vector
+    return normalize_rankings(orderings, axis=1, memo=state.setdefault("preferences_memo", {}))
+
 
 # Set page configuration
 st.set_page_config(
@@ -163,6 +53,12 @@ st.set_page_config(
     layout="wide",
 )
 
+# Tables of this page live in their own namespace of the session state
+state = PageState("rank_maximal_matching", tables=["preferences"])
+
+# The solver libraries are imported in the background while the page renders
+warm_up()
+
 st.markdown(
     """
     <style>
@@ -234,7 +130,8 @@ st.markdown('<h1 class="header">Rank Maximal Matching</h1>',
             unsafe_allow_html=True)
 
 # Insert header image
-st.sidebar.image("./resource/applicants.jpg", use_column_width=True,)
+st.sidebar.image("./resource/applicants.jpg", width="stretch")
+download_options()
 
 st.sidebar.title("User Guide")
 
@@ -281,11 +178,12 @@ st.sidebar.markdown(
 )
 
 # Add input components
-col1, col2, col3 = st.columns(3)
+col1, col2, col3, col4 = st.columns([0.3, 0.3, 0.25, 0.15])
 n = col1.number_input("Number of Agents (n)",
                       min_value=MIN_AGENTS, max_value=MAX_AGENTS, step=1)
 m = col2.number_input("Number of Items (m)", min_value=MIN_ITEMS,
                       max_value=MAX_ITEMS, value=3, step=1)
+seed = seed_input(col4)
 
 upload_preferences = None
 with col3:
@@ -293,7 +191,7 @@ with col3:
     st.markdown("\n\n\t\n")
     if st.checkbox("⭐ Upload Local Preferences CSV"):
         upload_preferences = st.file_uploader(
-            f"Upload Preferences of shape ({n}, {m})", type=['csv'])
+            f"Upload Preferences of shape ({n}, {m})", type=UPLOAD_TYPES)
         
 # Agent Preferences
 ordinal = lambda n: "%s" % ("tsnrhtdd"[(n//10%10!=1)*(n%10<4)*n%10::4])    
@@ -301,74 +199,26 @@ ordinal = lambda n: "%s" % ("tsnrhtdd"[(n//10%10!=1)*(n%10<4)*n%10::4])
 st.markdown(
     f"🌟 Agent Preferences towards Items (ranks from {1}<sup>st</sup> to {m}<sup>{ordinal(m)}</sup> with ties permitted):", unsafe_allow_html=True)
 
-shuffle = st.button('Shuffle Rankings')
+st.button('Shuffle Rankings', on_click=next_seed,
+          help="Moves on to the next random seed, which regenerates the random rankings.")
 
 with st.spinner("Loading..."):
-    preferences = load_preferences(m, n, shuffle=shuffle)
-    for col in preferences.columns:
-        preferences[col] = preferences[col].map(str)
-
-preferences = load_preferences(m, n, upload_preferences)
-for col in preferences.columns:
-    preferences[col] = preferences[col].map(str)
-
-edited_prefs = st.data_editor(preferences,
-                              key="pref_editor",
-                              column_config={
-                                  f"Item {j}": st.column_config.TextColumn(
-                                      f"Item {j}",
-                                      help=f"Agents' Rankings towards Item {j} (values can be arbitrary; but we treat them as ordinal)",
-                                      max_chars=4,
-                                      validate=r"^(?:10|[1-9]\d{0,2}|0)$",
-                                      # width='small',  # Set the desired width here
-                                      # min_value=0,
-                                      # max_value=1000,
-                                      # step=1,
-                                      # format="%d",
-                                      required=True,
-                                  )
-                                  for j in range(1, m+1)
-                              }
-                              |
-                              {
-                                  "_index": st.column_config.Column(
-                                      "💡 Hint",
-                                      help="Support copy-paste from Excel sheets and bulk edits",
-                                      disabled=True,
-                                  ),
-                              },
-                              on_change=partial(
-                                  preference_change_callback, preferences),
-                              )
+    preferences = load_preferences(m, n, upload_preferences, seed)
+
+edited_prefs = int_table_editor(preferences, "pref_editor", 0, 999,
+                                help="Agents' Rankings towards {column} (values can be arbitrary; but we treat them as ordinal)")
 with st.spinner('Updating...'):
-    for col in edited_prefs.columns:
-        edited_prefs[col] = edited_prefs[col].apply(
-            lambda x: int(float(x)))
-    st.session_state.preferences = restore_orderings(edited_prefs)
+    state.preferences = restore_orderings(edited_prefs)
 
 st.markdown(
         f"Colored Ranking Table (Preview):", unsafe_allow_html=True)
     
-edited_prefs = st.session_state.preferences
-# Define formatter function
-def format_cell_color(val):
-    max_val = edited_prefs.values.astype(np.int32).max()
-    min_val = edited_prefs.values.astype(np.int32).min()
-    span = max_val - min_val + 1
-    cell_val = (max_val - int(float(val))) / span  # Normalize value between 0 and 1
-    thickness = int(10 * cell_val)  # Adjust thickness as per preference
-    color = f'rgba(67, 147, 195, {cell_val})'  # Blue color with alpha value based on normalized value
-    style = f'background-color: {color}; border-bottom: {thickness}px solid {color}'
-    return style
-
+edited_prefs = state.preferences
 with st.spinner("Loading Table..."):
-    st.dataframe(edited_prefs.style.applymap(format_cell_color))
+    show_ranking_preview(edited_prefs)
 
 # Download preferences as CSV
-preferences_csv = edited_prefs.to_csv()
-b64 = base64.b64encode(preferences_csv.encode()).decode()
-href = f'<a href="data:file/csv;base64,{b64}" download="preferences.csv">Download Preferences CSV</a>'
-st.markdown(href, unsafe_allow_html=True)
+download_table("Download Preferences", edited_prefs, "preferences")
 
 # Add expandable information card
 with st.expander("ℹ️ Information", expanded=False):
@@ -448,45 +298,43 @@ with st.expander("ℹ️ Information", expanded=False):
 
 
 start_algo = st.button("⏳ Run Rank Maximal Matching Algorithm ")
+# The algorithm runs as a background job; its outcome is kept for these inputs, so the page stays usable meanwhile
+run_key = content_hash(edited_prefs.values)
 if start_algo:
-    with st.spinner('Executing...'):
-        if n * m * 0.01 > 3:
-            time.sleep(2)
-        else:
-            time.sleep(n * m * 0.01)
-
-    start_time = time.time()
-    outcomes = algorithm(m, n, edited_prefs.values)
-    end_time = time.time()
-    elapsed_time = end_time - start_time
+    submit_job(state, "run", run_key, rank_maximal_matching.algorithm, edited_prefs.values, label="The rank maximal matching")
+run = job_result(state, "run", run_key)
+if run is not None:
+    items = run.result
+    elapsed_time = run.seconds
 
     st.write("🎉 Outcomes:")
 
-    outcomes_list = [[agent, item, get_rank(edited_prefs.values, agent, item)] 
-                     for agent, item in outcomes.items()]
+    outcomes_list = [[f"Agent {i+1}", f"Item {j+1}", edited_prefs.values[i, j]]
+                     for i, j in enumerate(items.tolist()) if j >= 0]
     outcomes_df = pd.DataFrame(outcomes_list, columns=['Agent', 'Item', 'Rank'])
     # Sort the table
     # outcomes_df = outcomes_df.sort_values(['Agent'], key = lambda x:x.apply(lambda y:int(y.split('Agent')[-1])))
 
-    st.data_editor(outcomes_df,
+    # Only a page of the outcomes is sent to the browser; search and sort run here
+    outcome_viewer(outcomes_df, "rmm_outcomes", ["Rank"],
                    column_config={
-                       "Agents": st.column_config.ListColumn(
+                       "Agent": st.column_config.TextColumn(
                            "Agent",
                            help="The list of agents that get allocated",
-                        #    step=1,
                        ),
-                       "Items": st.column_config.ListColumn(
-                           "Items",
+                       "Item": st.column_config.TextColumn(
+                           "Item",
                            help="The list of items allocated to agents",
                        ),
-                   },
-                   hide_index=True,
-                   disabled=True,
-                   )
+                       "Rank": st.column_config.NumberColumn(
+                           "Rank",
+                           help="The agent's rank of its item",
+                       ),
+                   })
 
     st.write("🗒️ Outcomes Summary:")
 
-    vector = algorithm_checker(outcomes, edited_prefs.values)
+    vector = cached(run_key, rank_maximal_matching.algorithm_checker, items, edited_prefs.values)
     vector_list = [[rank, count] for rank,count in vector.items()]
     vector_df = pd.DataFrame(vector_list, columns=['Rank', 'Count'])
     vector_df = vector_df.sort_values(['Rank'])
@@ -513,13 +361,8 @@ if start_algo:
     
     # Download outcomes in JSON format (if the outcome is large enough)
     if n * m > 20: 
-        outcomes_json = json.dumps({otc[0]: otc[1]
-                                for otc in outcomes_df.to_numpy()}, indent=4)
-        st.markdown("### Download Outcomes as JSON")
-        b64 = base64.b64encode(outcomes_json.encode()).decode()
-        href = f'<a href="data:application/json;base64,{b64}" download="outcomes.json">Download Outcomes JSON</a>'
-        st.markdown(href, unsafe_allow_html=True)
-        st.json(outcomes_json, )
+        show_outcomes_json(outcomes_df)
+        download_outcomes({i: [j] for i, j in enumerate(items.tolist()) if j >= 0}, "Agent", "Item")
 
     
 hide_streamlit_style = """
@@ -530,6 +373,10 @@ hide_streamlit_style = """
 """
 st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
+memory_report(state)
+cache_report()
+import_report(["networkz"])
+
 st.markdown(
     """
     <div class="footer" style="padding-top: 200px; margin-top: auto; text-align: left; font-size: 10px; color: #777777;">
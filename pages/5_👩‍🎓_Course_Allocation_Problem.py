@@ -1,13 +1,24 @@
 import logging
+import re
 
 # Required Libraries
-import base64
 from functools import partial
-import time
 import numpy as np
 import pandas as pd
 import streamlit as st
-import fairpyx
+
+from core import conflicts, generators
+from core.algorithms import course_allocation
+from core.cache import content_hash
+from core.formats import UPLOAD_TYPES, format_of, read_table
+from ui.downloads import download_options, download_table
+from ui.cache import cache_report, cached
+from ui.imports import import_report, warm_up
+from ui.jobs import job_result, submit_job
+from ui.outcomes import assignment_table, outcome_viewer
+from ui.tables import int_table_editor, read_upload
+from ui.state import PageState, memory_report
+from ui.widgets import next_seed, seed_input
 
 #--- Settings ---#
 MIN_AGENTS = 2
@@ -15,6 +26,12 @@ MAX_AGENTS = 500
 MIN_ITEMS = 3
 MAX_ITEMS = 100
 MAX_POINTS = 1000
+# Large instances: the picking-sequence algorithms of fairpyx allocate 4,000 x 400 in about 5-7 seconds
+# (and grow with students x courses); the matching-based ones take minutes already at 1,000 x 100
+LARGE_MAX_AGENTS = 4000
+LARGE_MAX_ITEMS = 400
+LARGE_ALGORITHMS = ("Round robin", "Bidirectional round robin", "Serial dictatorship")
+OUTCOMES_PER_PAGE = 50
 
 
 #--- Page elements ---#
@@ -26,6 +43,13 @@ st.set_page_config(
     layout="wide",
 )
 
+# Tables of this page live in their own namespace of the session state
+INPUT_TABLES = ["courses_capacities", "students_capacities", "preferences"]
+state = PageState("course_allocation", tables=INPUT_TABLES + [f"large_{name}" for name in INPUT_TABLES])
+
+# The solver libraries are imported in the background while the page renders
+warm_up()
+
 # Set page style
 st.markdown(
     """
@@ -100,7 +124,8 @@ st.markdown('<h1 class="header">Efficient and Fair Course Allocation</h1>',
 
 # Page sidebar - User guide
 # Insert header image
-st.sidebar.image("./resource/students.jpg", use_column_width=True,)
+st.sidebar.image("./resource/students.jpg", width="stretch")
+download_options()
 
 st.sidebar.title("User Guide")
 
@@ -134,11 +159,12 @@ st.sidebar.markdown(
     <ol>
         <li>Specify the number of students (n) and courses (m) using the number input boxes.</li>
         <li>Specify the capacity of each course and of each student by either uploading or editing  a courses_capacities / students_capacities table.</li>
+        <li>Optionally upload course conflicts, either as clashing pairs or as a time slot per course.</li>
         <li>Choose to either upload a preferences file or edit the preferences.</li>
         <li>Choose which algorithm to use. You can run several algorithms at once for comparison</li>
         <li>Click the 'Run Algorithm' button to start the algorithm.</li>
         <li>You can download the outcomes as a CSV file using the provided links.</li>
-        <li>Some algorithms provide detailed explanations for the outcomes. Click the text in the "Explanation" column for details.</li>
+        <li>Some algorithms provide detailed explanations for the outcomes. Open the "Explanations" section below the results and pick students (or browse page by page) for details.</li>
     </ol>
 
     <p><em><strong>Disclaimer:</strong> The generated outcomes are for demonstration purposes only and may not reflect real-world scenarios.</em></p>
@@ -149,444 +175,263 @@ st.sidebar.markdown(
     unsafe_allow_html=True
 )
 
-# Divide the page to 2 columns.
-coln, colm = st.columns(2)
-
-#--- Input components ---#
-# n students and m courses
-n = coln.number_input("Number of Students (n)",
-                      min_value=MIN_AGENTS, max_value=MAX_AGENTS, step=1)
-m = colm.number_input("Number of Courses (m)", min_value=MIN_ITEMS,
-                      max_value=MAX_ITEMS, value=MIN_ITEMS, step=1)
-
-
-# Upload input as csv file buttons
-upload_preferences = None
-upload_courses_capacities = None
-upload_students_capacities = None
-
-# Divide the page to 3 columns.
-col1, col2, col3 = st.columns(3)
-
-# Locate the upload buttons
-with col1:
-    if st.checkbox("⭐ Upload Local Courses Capacities CSV"):
-        upload_courses_capacities = st.file_uploader(
-            f"Upload Courses Capacities of shape ({m}, {1})", type=['csv'])   
-with col2:
-    if st.checkbox("⭐ Upload Local Students Capacities CSV"):
-        upload_students_capacities = st.file_uploader(
-            f"Upload Students Capacities of shape ({m}, {1})", type=['csv'])   
-with col3:
-    if st.checkbox("⭐ Upload Local Preferences CSV"):
-        upload_preferences = st.file_uploader(
-            f"Upload Preferences of shape ({m}, {1})", type=['csv'])
-# Shuffle data button
-shuffle = st.button('Shuffle All Data')
-
-# Table Change Callback: used in Streamlit widget on_click / on_change
-def change_callback(table):
-    for col in table.columns:
-        table[col] = table[col].apply(
-            lambda x: int(float(x)))
-    return table
-        
-#--- Courses courses_capacities ---#
-st.write("📊 Courses Capacities (10-100, copyable from local sheets):")
-
-# Load Courses Capacities - handle table initialization and changes
-def load_courses_capacities(m, upload_courses_capacities = False, shuffle = False):
-    MAX_CAPACITY = 100
-    MIN_CAPACITY = 10
-
-    if hasattr(st.session_state, "courses_capacities"): # if courses_capacities table is exist
+#--- Large-instance mode ---#
+# Uploaded instances with thousands of students skip the editable tables: the arrays are kept typed
+# in the session state and only summary statistics and a page of outcomes are rendered.
+large_mode = st.checkbox("⭐ Large-Instance Mode (uploaded data only)",
+                         help=f"For instances beyond {MAX_AGENTS} students or {MAX_ITEMS} courses, up to "
+                              f"{LARGE_MAX_AGENTS:,} students and {LARGE_MAX_ITEMS:,} courses. Upload all three "
+                              "tables; they are not editable in this mode, and only the round robin and serial "
+                              "dictatorship algorithms are offered.")
+
+# Load an uploaded table as a typed array - parsed (in chunks, validated while streaming) only once per uploaded file
+def load_large_table(upload, name, shape, max_shape, min_value, max_value):
+    key = (upload.name, upload.size)
+    if state.get(f"large_{name}_key") != key:
+        table = read_upload(upload, name.replace('_', ' '), shape, min_value, max_value,
+                            max_shape=max_shape, dtype=np.int32)
+        state[f"large_{name}"] = table.to_numpy()
+        state[f"large_{name}_key"] = key
+    return state[f"large_{name}"]
+
+if large_mode:
+    col1, col2, col3 = st.columns(3)
+    upload_preferences = col1.file_uploader("Upload Preferences of shape (n, m)", type=UPLOAD_TYPES)
+    upload_courses_capacities = col2.file_uploader("Upload Courses Capacities of shape (m, 1)", type=UPLOAD_TYPES)
+    upload_students_capacities = col3.file_uploader("Upload Students Capacities of shape (n, 1)", type=UPLOAD_TYPES)
+    if not (upload_preferences and upload_courses_capacities and upload_students_capacities):
+        st.info("Upload the preferences, courses capacities and students capacities tables to continue.")
+        st.stop()
+
+    preferences = load_large_table(upload_preferences, "preferences", (None, None),
+                                   (LARGE_MAX_AGENTS, LARGE_MAX_ITEMS), 0, 100)
+    courses_capacities = load_large_table(upload_courses_capacities, "courses_capacities", (None, 1),
+                                          (LARGE_MAX_ITEMS, 1), 10, 100)
+    students_capacities = load_large_table(upload_students_capacities, "students_capacities", (None, 1),
+                                           (LARGE_MAX_AGENTS, 1), 1, 10)
+    n, m = preferences.shape
+    if not (MIN_AGENTS <= n <= LARGE_MAX_AGENTS and MIN_ITEMS <= m <= LARGE_MAX_ITEMS):
+        st.error(f"Large instances may have {MIN_AGENTS}-{LARGE_MAX_AGENTS} students and {MIN_ITEMS}-{LARGE_MAX_ITEMS} courses, "
+                 f"but the preferences file has shape ({n}, {m}).")
+        st.stop()
+    if courses_capacities.shape != (m, 1) or students_capacities.shape != (n, 1):
+        st.error(f"The capacities files should have shapes ({m}, 1) for courses and ({n}, 1) for students.")
+        st.stop()
+
+    st.write("📊 Instance Summary:")
+    st.dataframe(pd.DataFrame({
+                    "Students": [n],
+                    "Courses": [m],
+                    "Course seats": [int(courses_capacities.sum(dtype=np.int64))],
+                    "Requested courses": [int(students_capacities.sum(dtype=np.int64))],
+                    "Mean preference": [round(float(preferences.mean()), 2)],
+                    "Memory (MB)": [round((preferences.nbytes + courses_capacities.nbytes + students_capacities.nbytes) / 2**20, 1)],
+                 }), hide_index=True)
+else:
+    # Divide the page to 2 columns.
+    coln, colm = st.columns(2)
+
+    #--- Input components ---#
+    # n students and m courses
+    n = coln.number_input("Number of Students (n)",
+                          min_value=MIN_AGENTS, max_value=MAX_AGENTS, step=1)
+    m = colm.number_input("Number of Courses (m)", min_value=MIN_ITEMS,
+                          max_value=MAX_ITEMS, value=MIN_ITEMS, step=1)
+
+
+    # Upload input as csv file buttons
+    upload_preferences = None
+    upload_courses_capacities = None
+    upload_students_capacities = None
+
+    # Divide the page to 3 columns.
+    col1, col2, col3 = st.columns(3)
+
+    # Locate the upload buttons
+    with col1:
+        if st.checkbox("⭐ Upload Local Courses Capacities CSV"):
+            upload_courses_capacities = st.file_uploader(
+                f"Upload Courses Capacities of shape ({m}, {1})", type=UPLOAD_TYPES)   
+    with col2:
+        if st.checkbox("⭐ Upload Local Students Capacities CSV"):
+            upload_students_capacities = st.file_uploader(
+                f"Upload Students Capacities of shape ({m}, {1})", type=UPLOAD_TYPES)   
+    with col3:
+        if st.checkbox("⭐ Upload Local Preferences CSV"):
+            upload_preferences = st.file_uploader(
+                f"Upload Preferences of shape ({m}, {1})", type=UPLOAD_TYPES)
+    # Shuffle data button and random seed
+    col1, col2 = st.columns([0.8, 0.2])
+    col1.button('Shuffle All Data', on_click=next_seed,
+                help="Moves on to the next random seed, which regenerates all random tables.")
+    seed = seed_input(col2)
+
+    #--- Courses courses_capacities ---#
+    st.write("📊 Courses Capacities (10-100, copyable from local sheets):")
+
+    # Load Courses Capacities - handle table initialization and changes
+    def load_courses_capacities(m, upload_courses_capacities = False, seed = 0):
+        MAX_CAPACITY = 100
+        MIN_CAPACITY = 10
+
         if upload_courses_capacities:                   # if user clicked on upload button
-            courses_capacities_default = None
             # Load the user-uploaded courses_capacities file
-            try:
-                courses_capacities_default = pd.read_csv(
-                    upload_courses_capacities, index_col=0)
-                
-                if courses_capacities_default.shape != (m,1): # if size doesn't match the input
-                    x, y = courses_capacities_default.shape
-                    st.session_state.courses_capacities.iloc[:x,
-                                                      :y] = courses_capacities_default
-                else:
-                    st.session_state.courses_capacities = pd.DataFrame(courses_capacities_default,
-                                                                columns=st.session_state.courses_capacities.columns,
-                                                                index=st.session_state.courses_capacities.index)
-                return st.session_state.courses_capacities
-            
-            except Exception as e:
-                st.error(f"An error occurred while loading the courses capacities file.")
-                logging.debug("file uploading error: ", e)
-                st.stop()
-                
-        old_m = st.session_state.courses_capacities.shape[0]     # the previous number of courses (before changes)
-        
-        if shuffle:
-            # Create m random values in range (min-max)
-            random_ranks = np.random.randint(MIN_CAPACITY, MAX_CAPACITY,(m))
-            # Apply the random ranks to the courses_capacities table
-            st.session_state.courses_capacities = pd.DataFrame(random_ranks,
-                                                                   columns=[
-                                                          "Capacity"],
-                                                          index=[f"Course {i+1}" for i in range(m)])
-            return st.session_state.courses_capacities
-        
-        # if user decrease the number of courses
-        if m <= old_m:
-            st.session_state.courses_capacities = st.session_state.courses_capacities.iloc[:m, :1]
-            return st.session_state.courses_capacities
-        # if user increase the number of courses
-        elif m > old_m:
-            st.session_state.courses_capacities = pd.concat([st.session_state.courses_capacities,
-                                                      pd.DataFrame(np.random.randint(MIN_CAPACITY, MAX_CAPACITY, (m - old_m,1)),
-                                                                   columns=["Capacity"],
-                                                          index=[f"Course {i+1}" for i in range(old_m, m)])],
-                                                     )
-            return st.session_state.courses_capacities
-    # if the table isn't exist and the user wants to upload a csv file
-    if upload_courses_capacities:
-            courses_capacities_default = None
-            # Load the user-uploaded courses_capacities file
-            try:
-                courses_capacities_default = pd.read_csv(upload_courses_capacities)
-                if courses_capacities_default.shape != (m, 1):
-                    st.error(
-                        f"The uploaded courses capacities file should have a shape of ({m}, {1}).")
-                    st.stop()
-            except Exception as e:
-                st.error("An error occurred while loading the courses capacities file.")
-                st.stop()
-    else:
-        # Create m random values in range (min-max) and insert them to a data frame
-        courses_capacities_default = pd.DataFrame(np.random.randint(MIN_CAPACITY,MAX_CAPACITY, (m)), 
-                                        columns=["Capacity"],
-                                        index=[f"Course {i+1}" for i in range(m)])
-
-    st.session_state.courses_capacities = courses_capacities_default
-    return st.session_state.courses_capacities
-
-# Loading the courses_capacities table (initial/after changes)
-with st.spinner("Loading..."):
-    courses_capacities=  load_courses_capacities(m,upload_courses_capacities,shuffle)
-    for col in courses_capacities.columns:
-        courses_capacities[col] = courses_capacities[col].map(str)
-
-# Courses Capacities Change Callback: used in Streamlit widget on_click / on_change
-def course_capacity_change_callback(courses_capacities):
-    st.session_state.courses_capacities = change_callback(courses_capacities)
-
-# Courses Capacities table as editor 
-edited_course_capa = st.data_editor(courses_capacities,
-                              key="course_capa_editor",
-                              column_config={
-                                  f"Capacity": st.column_config.NumberColumn(
-                                        f"Course Capacity",
-                                        help=f"Course Capacity",
-                                        min_value=10,
-                                        max_value=100,
-                                        required=True,
-                                  )
-                              }
-                              |
-                              {
-                                  "_index": st.column_config.Column(
-                                      "💡 Hint",
-                                      help="Support copy-paste from Excel sheets and bulk edits",
-                                      disabled=True,
-                                  ),
-                              },
-                              on_change=partial(
-                                  course_capacity_change_callback, courses_capacities),
-                              )
-
-# Convert the editor changes from str to float
-with st.spinner('Updating...'):
-    for col in edited_course_capa.columns:
-        edited_course_capa[col] = edited_course_capa[col].apply(
-            lambda x: int(float(x)))
-    st.session_state.courses_capacities = edited_course_capa
-
-# Apply the changes
-courses_capacities = edited_course_capa.values
-
-# Download courses_capacities as CSV
-courses_capacities_csv = edited_course_capa.to_csv()
-b64 = base64.b64encode(courses_capacities_csv.encode()).decode()
-href = f'<a href="data:file/csv;base64,{b64}" download="courses_capacities.csv">Download Courses Capacities CSV</a>'
-st.markdown(href, unsafe_allow_html=True)
-
-#--- Students Capacities (same as thr courses_capacities except the size [n instead of m]) ---#
-st.write("📊 Students Capacities (1-10, copyable from local sheets):")
-
-# Load s Capacities 
-def load_students_capacities(n, upload_students_capacities = False, shuffle = False):
-    MAX_CAPACITY = 10
-    MIN_CAPACITY = 1
-    if hasattr(st.session_state, "students_capacities"):
+            state.courses_capacities = read_upload(upload_courses_capacities, "courses capacities", (m, 1), MIN_CAPACITY, MAX_CAPACITY,
+                                                   index=[f"Course {i+1}" for i in range(m)],
+                                                   columns=["Capacity"])
+            return state.courses_capacities
+
+        # m random values in range (min-max), keeping the capacities edited by hand;
+        # a new seed (e.g. shuffle button clicked) drops the edits
+        previous = state.get("courses_capacities") if state.get("courses_capacities_seed") == seed else None
+        random_capacities = generators.resized(
+            lambda rows, _: generators.random_capacities(rows, MIN_CAPACITY, MAX_CAPACITY, [seed, 0])[:, None],
+            m, 1, previous)
+        state.courses_capacities = pd.DataFrame(random_capacities, columns=["Capacity"],
+                                                index=[f"Course {i+1}" for i in range(m)])
+        state.courses_capacities_seed = seed
+        return state.courses_capacities
+
+    # Loading the courses_capacities table (initial/after changes)
+    with st.spinner("Loading..."):
+        courses_capacities=  load_courses_capacities(m,upload_courses_capacities,seed)
+
+    # Courses Capacities table as editor 
+    edited_course_capa = int_table_editor(courses_capacities, "course_capa_editor", 10, 100,
+                                          help="Course Capacity", label="Course Capacity")
+    state.courses_capacities = edited_course_capa
+
+    # Apply the changes
+    courses_capacities = edited_course_capa.values
+
+    # Download courses_capacities as CSV
+    download_table("Download Courses Capacities", edited_course_capa, "courses_capacities")
+
+    #--- Students Capacities (same as thr courses_capacities except the size [n instead of m]) ---#
+    st.write("📊 Students Capacities (1-10, copyable from local sheets):")
+
+    # Load s Capacities 
+    def load_students_capacities(n, upload_students_capacities = False, seed = 0):
+        MAX_CAPACITY = 10
+        MIN_CAPACITY = 1
+
         if upload_students_capacities:
-            students_capacities_default = None
-            # Load the user-uploaded students_capacities file
-            try:
-                students_capacities_default = pd.read_csv(
-                    upload_students_capacities, index_col=0)
-                if students_capacities_default.shape != (n,1):
-                    x, y = students_capacities_default.shape
-                    st.session_state.students_capacities.iloc[:x,
-                                                      :y] = students_capacities_default
-                else:
-                    st.session_state.students_capacities = pd.DataFrame(students_capacities_default,
-                                                                columns=st.session_state.students_capacities.columns,
-                                                                index=st.session_state.students_capacities.index)
-                return st.session_state.students_capacities
-            except Exception as e:
-                st.error(f"An error occurred while loading the students_capacities file.")
-                logging.debug("file uploading error: ", e)
-                st.stop()
-                
-        old_n = st.session_state.students_capacities.shape[0]     
-   
-        if shuffle:
-            random_ranks = np.random.randint(MIN_CAPACITY, MAX_CAPACITY,(n))
-            st.session_state.students_capacities = pd.DataFrame(random_ranks,
-                                                                   columns=[
-                                                          "Capacity"],
-                                                          index=[f"Student {i+1}" for i in range(n)])
-            return st.session_state.students_capacities
-        
-        
-        if n <= old_n:
-            st.session_state.students_capacities = st.session_state.students_capacities.iloc[:n, :1]
-            return st.session_state.students_capacities
-        elif n > old_n:
-            st.session_state.students_capacities = pd.concat([st.session_state.students_capacities,
-                                                      pd.DataFrame(np.random.randint(MIN_CAPACITY, MAX_CAPACITY, (n - old_n,1)),
-                                                                   columns=[
-                                                          "Capacity"],
-                                                          index=[f"Student {i+1}" for i in range(old_n, n)])],
-                                                     )
-            return st.session_state.students_capacities
-        
-    if upload_students_capacities:
-            students_capacities_default = None
             # Load the user-uploaded students_capacities file
-            try:
-                students_capacities_default = pd.read_csv(upload_students_capacities)
-                if students_capacities_default.shape != (n, 1):
-                    st.error(
-                        f"The uploaded students_capacities file should have a shape of ({n}, {1}).")
-                    st.stop()
-            except Exception as e:
-                st.error("An error occurred while loading the students capacities file.")
-                st.stop()
-    else:
-        students_capacities_default = pd.DataFrame(np.random.randint(MIN_CAPACITY,MAX_CAPACITY, (n)), 
-                                        columns=["Capacity"],
-                                        index=[f"Student {i+1}" for i in range(n)])
-    st.session_state.students_capacities = students_capacities_default
-    return st.session_state.students_capacities
-
-
-with st.spinner("Loading..."):
-    students_capacities=  load_students_capacities(n,upload_students_capacities,shuffle)
-    for col in students_capacities.columns:
-        students_capacities[col] = students_capacities[col].map(str)
-
-def student_capacity_change_callback(students_capacities):
-    st.session_state.students_capacities = change_callback(students_capacities)
-
-edited_student_capa = st.data_editor(students_capacities,
-                              key="student_capa_editor",
-                              column_config={
-                                  f"Capacity": st.column_config.NumberColumn(
-                                      f"Student Capacity",
-                                        help=f" ",
-                                        min_value=1,
-                                        max_value=10,
-                                        required=True,
-                                  )
-                              }
-                              |
-                              {
-                                  "_index": st.column_config.Column(
-                                      "💡 Hint",
-                                      help="Support copy-paste from Excel sheets and bulk edits",
-                                      disabled=True,
-                                  ),
-                              },
-                              on_change=partial(
-                                  student_capacity_change_callback, students_capacities),
-                              )
-
-with st.spinner('Updating...'):
-    for col in edited_student_capa.columns:
-        edited_student_capa[col] = edited_student_capa[col].apply(
-            lambda x: int(float(x)))
-    st.session_state.students_capacities = edited_student_capa
-
-students_capacities = edited_student_capa.values
-
-# Download students_capacities as CSV
-students_capacities_csv = edited_student_capa.to_csv()
-b64 = base64.b64encode(students_capacities_csv.encode()).decode()
-href = f'<a href="data:file/csv;base64,{b64}" download="students_capacities.csv">Download Students Capacities CSV</a>'
-st.markdown(href, unsafe_allow_html=True)
-
-
-
-#--- Preferences ---#
-
-st.write("📊 Agent Preferences (0-100, copyable from local sheets):")
-
-# Helper - generate random values for the preferences table; each row sum is equal to MAXPOINTS.
-def generate_random_integers_array(m,n):
-    preferences = []
-    for i in range(n):
-        random_array = np.random.randint(0, 100, m)
-        scaled_array = random_array / random_array.sum() * MAX_POINTS
-        rounded_array = np.round(scaled_array).astype(int)
-        rounded_array[-1] += MAX_POINTS - rounded_array.sum()
-        preferences.append(random_array)
-    return preferences
-
-# Load Preferences
-def load_preferences(m, n, upload_preferences = False, shuffle = False):
-    if hasattr(st.session_state, "preferences"):
+            state.students_capacities = read_upload(upload_students_capacities, "students capacities", (n, 1), MIN_CAPACITY, MAX_CAPACITY,
+                                                    index=[f"Student {i+1}" for i in range(n)],
+                                                    columns=["Capacity"])
+            return state.students_capacities
+
+        previous = state.get("students_capacities") if state.get("students_capacities_seed") == seed else None
+        random_capacities = generators.resized(
+            lambda rows, _: generators.random_capacities(rows, MIN_CAPACITY, MAX_CAPACITY, [seed, 1])[:, None],
+            n, 1, previous)
+        state.students_capacities = pd.DataFrame(random_capacities, columns=["Capacity"],
+                                                 index=[f"Student {i+1}" for i in range(n)])
+        state.students_capacities_seed = seed
+        return state.students_capacities
+
+
+    with st.spinner("Loading..."):
+        students_capacities=  load_students_capacities(n,upload_students_capacities,seed)
+
+    edited_student_capa = int_table_editor(students_capacities, "student_capa_editor", 1, 10,
+                                           help=" ", label="Student Capacity")
+    state.students_capacities = edited_student_capa
+
+    students_capacities = edited_student_capa.values
+
+    # Download students_capacities as CSV
+    download_table("Download Students Capacities", edited_student_capa, "students_capacities")
+
+
+
+    #--- Preferences ---#
+
+    st.write("📊 Agent Preferences (0-100, copyable from local sheets):")
+
+    # Helper - generate random values for the preferences table
+    def generate_random_integers_array(m, n, seed):
+        return generators.random_valuations(n, m, 0, 100, [seed, 2])
+
+    # Load Preferences
+    def load_preferences(m, n, upload_preferences = False, seed = 0):
         if upload_preferences:
-            preferences_default = None
             # Load the user-uploaded preferences file
-            try:
-                preferences_default = pd.read_csv(
-                    upload_preferences, index_col=0)
-                if preferences_default.shape != (n, m):
-                    x, y = preferences_default.shape
-                    st.session_state.preferences.iloc[:x,
-                                                      :y] = preferences_default
-                else:
-                    st.session_state.preferences = pd.DataFrame(preferences_default,
-                                                                columns=st.session_state.preferences.columns,
-                                                                index=st.session_state.preferences.index)
-                return st.session_state.preferences
-            except Exception as e:
-                st.error(f"An error occurred while loading the preferences file.")
-                logging.debug("file uploading error: ", e)
-                st.stop()
-                
-        old_n = st.session_state.preferences.shape[0] # the previous number of students
-        old_m = st.session_state.preferences.shape[1] # the previous number of courses
-   
-        if shuffle: # shuffle button clicked
-            random_ranks = generate_random_integers_array(m,n)
-            st.session_state.preferences = pd.DataFrame(random_ranks,
-                                                                   columns=[
-                                                          f"Course {i+1}" for i in range(m)],
-                                                          index=[f"Student {i+1}" for i in range(n)])
-            return st.session_state.preferences
-        
-        # if n or m are decreased
-        if n <= old_n and m <= old_m:
-            st.session_state.preferences = st.session_state.preferences.iloc[:n, :m]
-            return st.session_state.preferences
-        # if user increase n
-        elif n > old_n:
-            # add one more row to preferences table
-            st.session_state.preferences = pd.concat([st.session_state.preferences,
-                                                      pd.DataFrame(generate_random_integers_array(m,n - old_n),
-                                                                   columns=[
-                                                          f"Course {i+1}" for i in range(m)],
-                                                          index=[f"Student {i+1}" for i in range(old_n, n)])],
-                                                     axis=0)
-            return st.session_state.preferences
-        # if user increase m
-        elif m > old_m:
-            # add one more column to preferences table
-            st.session_state.preferences =  pd.concat([st.session_state.preferences,
-                                                      pd.DataFrame(np.random.randint(1,MAX_POINTS,(n, m - old_m)),
-                                                                   columns=[
-                                                          f"Course {i+1}" for i in range(old_m,m)],
-                                                          index=[f"Student {i+1}" for i in range(n)])],
-                                                     axis=1)
-            return st.session_state.preferences
-        else:
-            random_ranks = generate_random_integers_array(m,n) # generate new random values
-            st.session_state.preferences = pd.DataFrame(random_ranks, columns=[f"Course {i+1}" for i in range(m)],
-                                                        index=[f"Student {i+1}" for i in range(n)])
-            return st.session_state.preferences
-
-    if upload_preferences:
-        preferences_default = None
-        # Load the user-uploaded preferences file
-        try:
-            preferences_default = pd.read_csv(upload_preferences)
-            if preferences_default.shape != (n, m):
-                st.error(
-                    f"The uploaded preferences file should have a shape of ({n}, {m}).")
-                st.stop()
-        except Exception as e:
-            st.error("An error occurred while loading the preferences file.")
-            st.stop()
-    else:
-        random_ranks = generate_random_integers_array(m,n) # generate new random values
-        # apply the random ranks to the table
-        preferences_default = pd.DataFrame(random_ranks,
-                                                                   columns=[
-                                                          f"Course {i+1}" for i in range(m)],
-                                                          index=[f"Student {i+1}" for i in range(n)])
-    st.session_state.preferences = preferences_default
-    return st.session_state.preferences
-
-with st.spinner("Loading..."):
-    preferences = load_preferences(m, n, shuffle=shuffle)
-    for col in preferences.columns:
-        preferences[col] = preferences[col].map(str)
-
-preferences = load_preferences(m, n, upload_preferences)
-for col in preferences.columns:
-    preferences[col] = preferences[col].map(str)
-
-def preference_change_callback(preferences):
-    st.session_state.preferences = change_callback(preferences)
-
-edited_prefs = st.data_editor(preferences,
-                              key="pref_editor",
-                              column_config={
-                                  f"Course {j}": st.column_config.NumberColumn(
-                                        f"Course {j}",
-                                        help=f"Students' Preferences towards Course {j}",
-                                        min_value=0,
-                                        max_value=100,
-                                        required=True,
-                                  )
-                                  for j in range(1, m+1)
-                              }
-                              |
-                              {
-                                  "_index": st.column_config.Column(
-                                      "💡 Hint",
-                                      help="Support copy-paste from Excel sheets and bulk edits",
-                                      disabled=True,
-                                  ),
-                              },
-                              on_change=partial(
-                                  preference_change_callback, preferences),
-                              )
-
-with st.spinner('Updating...'):
-    for col in edited_prefs.columns:
-        edited_prefs[col] = edited_prefs[col].apply(
-            lambda x: int(float(x)))
-    st.session_state.preferences = edited_prefs
-
-preferences = edited_prefs.values
-
-# Download preferences as CSV
-preferences_csv = edited_prefs.to_csv()
-b64 = base64.b64encode(preferences_csv.encode()).decode()
-href = f'<a href="data:file/csv;base64,{b64}" download="preferences.csv">Download Preferences CSV</a>'
-st.markdown(href, unsafe_allow_html=True)
-
+            state.preferences = read_upload(upload_preferences, "preferences", (n, m), 0, 100,
+                                            index=[f"Student {i+1}" for i in range(n)],
+                                            columns=[f"Course {j+1}" for j in range(m)])
+            return state.preferences
+
+        # the seeded table of the new size (n students, m courses), keeping the values edited by hand
+        previous = state.get("preferences") if state.get("preferences_seed") == seed else None
+        random_ranks = generators.resized(lambda rows, columns: generate_random_integers_array(columns, rows, seed),
+                                          n, m, previous)
+        state.preferences = pd.DataFrame(random_ranks, columns=[f"Course {i+1}" for i in range(m)],
+                                         index=[f"Student {i+1}" for i in range(n)])
+        state.preferences_seed = seed
+        return state.preferences
+
+    with st.spinner("Loading..."):
+        preferences = load_preferences(m, n, upload_preferences, seed)
+
+    edited_prefs = int_table_editor(preferences, "pref_editor", 0, 100,
+                                    help="Students' Preferences towards {column}")
+    state.preferences = edited_prefs
+
+    preferences = edited_prefs.values
+
+    # Download preferences as CSV
+    download_table("Download Preferences", edited_prefs, "preferences")
+
+
+#--- Courses Conflicts ---#
+
+# A course reference: "Course 3" or 3
+COURSE_PATTERN = r"(\d+)\s*$"
+
+# Helper - turn course references into 0-based course indices
+def parse_courses(column, m):
+    courses = column.astype(str).str.extract(COURSE_PATTERN)[0].astype(float) - 1
+    if courses.isna().any() or not courses.between(0, m - 1).all():
+        raise ValueError(f"Courses must be given as 1-{m} or 'Course 1'-'Course {m}'.")
+    return courses.astype(int).to_numpy()
+
+# Load Courses Conflicts - a list of clashing pairs, or a time slot per course
+def load_courses_conflicts(m, upload_courses_conflicts, conflicts_format):
+    try:
+        table = read_table(upload_courses_conflicts, header=None)
+        # a CSV file may start with a header row, which is dropped when its first cell is not a course
+        if format_of(upload_courses_conflicts.name) == "CSV" and len(table) \
+                and re.search(COURSE_PATTERN, str(table.iat[0, 0])) is None:
+            table = table.iloc[1:]
+        if conflicts_format == "Pairs":
+            if table.shape[1] != 2:
+                raise ValueError("The pairs file should have exactly 2 columns.")
+            return conflicts.masks_from_pairs(zip(parse_courses(table.iloc[:, 0], m),
+                                                  parse_courses(table.iloc[:, 1], m)), m)
+        if table.shape[1] != 2:
+            raise ValueError("The time slots file should have a course column and a slot column.")
+        slots = np.full(m, -1)
+        slot_codes, _ = pd.factorize(table.iloc[:, 1])   # missing slots get -1
+        slots[parse_courses(table.iloc[:, 0], m)] = slot_codes
+        return conflicts.masks_from_slots(slots)
+    except Exception as e:
+        st.error(f"An error occurred while loading the courses conflicts file: {e}")
+        logging.debug("file uploading error: ", e)
+        st.stop()
+
+courses_conflicts = [0] * m
+if st.checkbox("⭐ Upload Local Courses Conflicts CSV"):
+    col1, col2 = st.columns([0.3, 0.7])
+    conflicts_format = col1.radio("Conflicts format", ("Pairs", "Time slots"),
+                                  help="Pairs: one clashing pair of courses per row. "
+                                       "Time slots: a course and its time slot per row; courses sharing a slot clash.")
+    upload_courses_conflicts = col2.file_uploader(
+        "Upload Courses Conflicts (course, course) or (course, slot)", type=UPLOAD_TYPES)
+    if upload_courses_conflicts:
+        courses_conflicts = load_courses_conflicts(m, upload_courses_conflicts, conflicts_format)
+        st.write(f"📅 {conflicts.count_pairs(courses_conflicts)} pairs of clashing courses loaded.")
 
 # Add expandable information card
 with st.expander("ℹ️ Information", expanded=False):
@@ -665,156 +510,157 @@ with st.expander("ℹ️ Information", expanded=False):
 
 # Running Algorithm
     
-algorithms_options = {
-    "Iterated maximum matching unadjusted": fairpyx.algorithms.iterated_maximum_matching_unadjusted, 
-    "Iterated maximum matching adjusted": fairpyx.algorithms.iterated_maximum_matching_adjusted,
-    "Serial dictatorship": fairpyx.algorithms.serial_dictatorship,
-    "Round robin": fairpyx.algorithms.round_robin, 
-    "Bidirectional round robin": fairpyx.algorithms.bidirectional_round_robin, 
-    "Utilitarian matching": fairpyx.algorithms.utilitarian_matching
-}
-
-# Algorithm Implementation
-def algorithm(m, n, courses_capacities, students_capacities, preferences, algo_names: list):
-    pref_dict = {}
-    capa_dict = {}
-    req_dict = {}
-    students_conflicts = {}
-    courses_conflicts = {}
-
-    for i in range(n):
-        pref_dict[f"Student {i+1}"] = {}
-        req_dict[f"Student {i+1}"] = students_capacities[i,0]
-        students_conflicts[f"Student {i+1}"] = {}
-        for j in range(m):
-            pref_dict[f"Student {i+1}"][f"Course {j+1}"] = preferences[i,j]
-    for i in range(m):
-        capa_dict[f"Course {i+1}"] = courses_capacities[i,0]
-        courses_conflicts[f"Course {i+1}"] = {}
-
-    instance = fairpyx.Instance(
-        agent_capacities=req_dict, 
-        valuations=pref_dict,
-        item_capacities=capa_dict,
-        item_conflicts=courses_conflicts,
-        agent_conflicts=students_conflicts,
-        )
-
-    allocations = {} 
-
-    for algo_name in algo_names:
-        algorithm = algorithms_options[algo_name]
-        if algo_name.startswith("Iterated maximum matching"):
-        # string_explanation_logger = fairpyx.StringsExplanationLogger(instance.agents)
-            string_explanation_logger = fairpyx.StringsExplanationLogger({
-                agent for agent in instance.agents
-            },language='en', mode='w', encoding="utf-8")
-            allocation = fairpyx.divide(algorithm=algorithm, instance=instance, explanation_logger=string_explanation_logger)
-            allocations[algo_name] = (allocation,string_explanation_logger)
-        else:
-            allocation = fairpyx.divide(algorithm=algorithm, instance=instance)
-            allocations[algo_name] = (allocation, None)
-            string_explanation_logger = None
-    return allocations,instance
-
-# Checker Function for Algorithm
-def algorithm_checker(instance,allocations):
-    result_vector = []
-    for algo_name, allocation in allocations.items():
-        allocation = allocation[0]
-        matrix:fairpyx.AgentBundleValueMatrix = fairpyx.AgentBundleValueMatrix(instance, allocation)
-        values = np.round([matrix.utilitarian_value(),
-                            matrix.egalitarian_value(),
-                            matrix.max_envy(),
-                            matrix.mean_envy()])
-        result_vector.append([algo_name]+list(values))
-        logging.debug('Result Vector:', result_vector)
-    return result_vector
-
+# Full outcomes table (one (student, course) row per allocated course and algorithm), built only for downloads
+def outcomes_table(outcomes):
+    tables = []
+    for algo_name, (bundles, _) in outcomes.items():
+        table = assignment_table(dict(enumerate(bundles)), "Student", "Course")
+        table.insert(0, "Algorithm", algo_name)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+# Course names of a student's bundle, for the outcome tables
+def bundle_names(bundle):
+    return ", ".join(f"Course {j+1}" for j in bundle.tolist())
 
 algo_names = st.multiselect(
    "Which algorithm do you want to use?",
-   tuple(algorithms_options.keys()),
-   ["Iterated maximum matching adjusted"],
+   LARGE_ALGORITHMS if large_mode else tuple(course_allocation.ALGORITHMS),
+   ["Round robin"] if large_mode else ["Iterated maximum matching adjusted"],
    placeholder="Select Algorithm...",
+   key="large_algo_names" if large_mode else "algo_names",
 )
 
+EXPLANATIONS_PER_PAGE = 10
+
 start_algo = st.button(f"⏳ Run Algorithm")
+# The algorithms run as a background job; results are kept in the session for these inputs, so that
+# browsing explanations (which reruns the script) or editing other widgets does not discard them
+run_key = content_hash(courses_capacities, students_capacities, preferences, courses_conflicts, algo_names,
+                       large_mode)
 if start_algo:
-    with st.spinner('Executing...'):
-        if n * m * 0.01 > 3:
-            time.sleep(2)
-        else:
-            time.sleep(n * m * 0.01)
-
-    start_time = time.time()
-    outcomes, instance = algorithm(m, n, courses_capacities,students_capacities,preferences, algo_names)
-    end_time = time.time()
-    elapsed_time = end_time - start_time
-    st.write("🎉 Outcomes:")
-    for algo_name, values in outcomes.items():
-        outcomes_list = ['']*n
-        column_config = {}        
-        courses_head = [algo_name + ' Results']
-        column_config[algo_name + ' Results'] = st.column_config.ListColumn(
-                        algo_name + ' Results',
-                        help="The list of courses allocated to students",
-                    )
-        (allocation, explanation) = values            
-        if explanation:
-            courses_head+= ['Explanation']
-            for i in range(n):
-                outcomes_list[i] = [f"Student {i+1}"]
-                outcomes_courses = allocation[f"Student {i+1}"]
-                outcomes_str = ", ".join([courses for courses in outcomes_courses])
-                outcomes_list[i]+=[outcomes_str]+[explanation.agent_string(f'Student {i+1}')]
-        else:
-            for i in range(n):
-                outcomes_list[i] = [f"Student {i+1}"]
-                outcomes_courses = allocation[f"Student {i+1}"]
-                outcomes_str = ", ".join([courses for courses in outcomes_courses])
-                outcomes_list[i]+=[outcomes_str]
-            
-            
-        outcomes_df = pd.DataFrame(outcomes_list, columns=['Student']+courses_head)
-
-        st.data_editor(outcomes_df,
-                    column_config=column_config,
-                    hide_index=True,
-                    disabled=True,
-                    )
-
-    st.write("🗒️ Outcomes Summary:")
-
-    vector = algorithm_checker(instance,outcomes)
-    parameters = ["Algorithm","Utilitarian value","Egalitarian value","Max envy", "Mean envy"]
-    vector_df = pd.DataFrame(vector, columns=parameters)
-    st.data_editor(vector_df,
-                   column_config={
-                       "Algorithm": st.column_config.TextColumn(
-                           "Algorithm",
-                       ),
-                       parameters[1]: st.column_config.NumberColumn(
-                           parameters[1],
-                           help="sum of students' values",
-                       ),
-                       parameters[2]: st.column_config.NumberColumn(
-                           parameters[2],
-                           help="smallest value of a student",
-                       ),
-                       parameters[3]: st.column_config.NumberColumn(
-                           parameters[3],
-                           help="largest envy among all pairs of students",
-                       ),
-                       parameters[4]: st.column_config.NumberColumn(
-                           parameters[4],
-                           help="average over all students, of the maximum envy felt towards another student",
-                       ),
-                   },
-                   hide_index=True,
-                   disabled=True,
-                   )
+    submit_job(state, "course_run", run_key, course_allocation.algorithm, courses_capacities, students_capacities,
+               preferences, algo_names, courses_conflicts, explain=not large_mode, label="The course allocation")
+
+run = job_result(state, "course_run", run_key)
+if run is not None:
+    outcomes, instance = run.result
+    elapsed_time = run.seconds
+    if large_mode:
+        st.write("🎉 Outcomes (one page at a time):")
+        n_pages = (n - 1) // OUTCOMES_PER_PAGE + 1
+        page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, step=1,
+                               key="large_outcomes_page")
+        rows = range((page - 1) * OUTCOMES_PER_PAGE, min(page * OUTCOMES_PER_PAGE, n))
+        outcomes_df = pd.DataFrame({"Student": [f"Student {i+1}" for i in rows]}
+                                   | {algo_name + ' Results': [bundle_names(bundles[i]) for i in rows]
+                                      for algo_name, (bundles, _) in outcomes.items()})
+        st.dataframe(outcomes_df, hide_index=True)
+        download_table("Download Outcomes", partial(outcomes_table, outcomes), "outcomes")
+
+        st.write("🗒️ Outcomes Summary:")
+        vector = cached(run_key, course_allocation.large_algorithm_checker, outcomes, preferences, students_capacities, courses_conflicts)
+        parameters = ["Algorithm", "Utilitarian value", "Egalitarian value", "Fully served students",
+                      "Mean courses per student", "Clashes"]
+        st.dataframe(pd.DataFrame(vector, columns=parameters),
+                     column_config={
+                         parameters[1]: st.column_config.NumberColumn(
+                             parameters[1],
+                             help="average of students' values, as a percentage of their maximum possible value",
+                         ),
+                         parameters[2]: st.column_config.NumberColumn(
+                             parameters[2],
+                             help="smallest value of a student, as a percentage of its maximum possible value",
+                         ),
+                         parameters[3]: st.column_config.NumberColumn(
+                             parameters[3],
+                             help="number of students who received as many courses as they requested",
+                         ),
+                         parameters[5]: st.column_config.NumberColumn(
+                             parameters[5],
+                             help="number of students whose courses include a clashing pair",
+                         ),
+                     },
+                     hide_index=True,
+                     )
+        st.caption("Envy measures are omitted in large-instance mode, as they compare every pair of students.")
+    else:
+        st.write("🎉 Outcomes:")
+        for algo_name, values in outcomes.items():
+            column_config = {}
+            courses_head = [algo_name + ' Results']
+            column_config[algo_name + ' Results'] = st.column_config.TextColumn(
+                            algo_name + ' Results',
+                            help="The list of courses allocated to students",
+                        )
+            (bundles, explanation) = values
+            outcomes_list = [[f"Student {i+1}", bundle_names(bundles[i]), len(bundles[i]),
+                              int(preferences[i, bundles[i]].sum())] for i in range(n)]
+            outcomes_df = pd.DataFrame(outcomes_list, columns=['Student']+courses_head+['Course count', 'Value'])
+
+            outcome_viewer(outcomes_df, f"outcomes_{algo_name}", ['Course count', 'Value'],
+                           column_config=column_config)
+
+            if explanation:
+                # Explanations are only rendered while their expander is open
+                expander = st.expander(f"📖 {algo_name} Explanations", key=f"explain_{algo_name}",
+                                       on_change="rerun")
+                if expander.open:
+                    with expander:
+                        students = [f"Student {i+1}" for i in range(n)]
+                        selected = st.multiselect("Students to explain", students,
+                                                  key=f"explain_select_{algo_name}",
+                                                  placeholder="Select students, or browse page by page below...")
+                        if not selected:
+                            n_pages = (n - 1) // EXPLANATIONS_PER_PAGE + 1
+                            page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, step=1,
+                                                   key=f"explain_page_{algo_name}")
+                            selected = students[(page - 1) * EXPLANATIONS_PER_PAGE:page * EXPLANATIONS_PER_PAGE]
+                        for student in selected:
+                            st.markdown(f"**{student}**")
+                            st.text(explanation.agent_string(student))
+
+        download_table("Download Outcomes", partial(outcomes_table, outcomes), "outcomes")
+
+        st.write("🗒️ Outcomes Summary:")
+
+        vector = cached(run_key, course_allocation.algorithm_checker, instance, outcomes, courses_conflicts)
+        parameters = ["Algorithm","Utilitarian value","Egalitarian value","Max envy", "Mean envy", "Clashes"]
+        vector_df = pd.DataFrame(vector, columns=parameters)
+        st.data_editor(vector_df,
+                       column_config={
+                           "Algorithm": st.column_config.TextColumn(
+                               "Algorithm",
+                           ),
+                           parameters[1]: st.column_config.NumberColumn(
+                               parameters[1],
+                               help="sum of students' values",
+                           ),
+                           parameters[2]: st.column_config.NumberColumn(
+                               parameters[2],
+                               help="smallest value of a student",
+                           ),
+                           parameters[3]: st.column_config.NumberColumn(
+                               parameters[3],
+                               help="largest envy among all pairs of students",
+                           ),
+                           parameters[4]: st.column_config.NumberColumn(
+                               parameters[4],
+                               help="average over all students, of the maximum envy felt towards another student",
+                           ),
+                           parameters[5]: st.column_config.NumberColumn(
+                               parameters[5],
+                               help="number of students whose courses include a clashing pair",
+                           ),
+                       },
+                       hide_index=True,
+                       disabled=True,
+                       )
 
     # Print timing results
     st.write(f"⏱️ Timing Results:")
     st.write(f"Elapsed Time: {elapsed_time:.4f} seconds")
+
+memory_report(state)
+cache_report()
+import_report(["fairpyx"])
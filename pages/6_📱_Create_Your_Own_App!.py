@@ -1,45 +1,26 @@
-from functools import partial
-
 import numpy as np
 import pandas as pd
 import streamlit as st
 
+from core import generators, sandbox, scaling
+from core.cache import content_hash
+from ui.jobs import job_result, submit_job
+from ui.state import PageState
+from ui.tables import int_table_editor
 
-def load_table(m, n, i):
-    if hasattr(st.session_state, f"table_{i}"):
-        table = getattr(st.session_state, f"table_{i}")
-        old_n = table.shape[0]
-        old_m = table.shape[1]
-        if n <= old_n and m <= old_m:
-            setattr(st.session_state, f"table_{i}", table.iloc[:n, :m])
-        elif n > old_n:
-            setattr(st.session_state, f"table_{i}", pd.concat([table, 
-                                                               pd.DataFrame(np.random.randint(1, 100, (n - old_n, m)),
-                                                                            columns=[
-                                                                                f"Column Entity {i+1}" for i in range(m)],
-                                                                            index=[f"Row Entity {i+1}" for i in range(old_n, n)])],
-                                                              axis=0))
-        elif m > old_m:
-            setattr(st.session_state, f"table_{i}", pd.concat([table, 
-                                                               pd.DataFrame(np.random.randint(1, 100, (n, m - old_m)),
-                                                                            columns=[
-                                                                                f"Column Entity {i+1}" for i in range(old_m, m)],
-                                                                            index=[f"Row Entity {i+1}" for i in range(n)])],
-                                                              axis=1))
-        else:
-            raise ValueError("Cannot alter both dimensions of table at the same time.")
-    else:
-        setattr(st.session_state, f"table_{i}", pd.DataFrame(np.random.randint(1, 100, (n, m)), 
-                                                             columns=[f"Column Entity {i+1}" for i in range(m)],
-                                                             index=[f"Row Entity {i+1}" for i in range(n)]))
-    return getattr(st.session_state, f"table_{i}")
+# Input widgets of the generated app (each may be an example table)
+MAX_INPUTS = 10
 
+# Tables of this page live in their own namespace of the session state
+state = PageState("create_your_own_app", tables=[f"table_{i}" for i in range(MAX_INPUTS)])
 
-def tchange_callback(table, i):
-    for col in table.columns:
-        table[col] = table[col].apply(
-            lambda x: int(float(x)))
-    setattr(st.session_state, f"table_{i}", table)
+
+# The i-th example table at size n x m: a seeded random table, keeping the entries already edited
+def load_table(m, n, i):
+    values = generators.resized(lambda rows, columns: generators.random_valuations(rows, columns, 1, 100, i),
+                                n, m, state.get(f"table_{i}"))
+    return pd.DataFrame(values, columns=[f"Column Entity {j+1}" for j in range(m)],
+                        index=[f"Row Entity {j+1}" for j in range(n)])
 
 
 def main():
@@ -173,6 +154,13 @@ def main():
                                             """, 
                                 help="If unsure about the input data format, click 'Generate Code' first. Refer to this guide for more instructions: https://github.com/JThh/fair-alloc-app-ra/blob/new_main/contribution/CONTRIBUTION.md")
         st.code(algorithm, language="python")
+
+    # Test run
+    st.header("Test Run")
+    if st.toggle("🧪 Test-run the algorithm on generated inputs", key="test_run_enabled",
+                 help="Runs your function in a separate process with CPU-time and memory limits, "
+                      "and reports how its run time and memory grow with the input size."):
+        test_run_panel(algorithm, algorithm_name, input_widget_config)
     
 
     # Generate code button
@@ -225,7 +213,7 @@ def generate_widget_config():
     widget_config = {}
 
     col1, col2 = st.columns([0.4,0.6])
-    num_inputs = col1.number_input("Number of input widgets:", min_value=1, max_value=10, value=1, step=1)
+    num_inputs = col1.number_input("Number of input widgets:", min_value=1, max_value=MAX_INPUTS, value=1, step=1)
 
     for i in range(num_inputs):
         col1, col2, _ = st.columns([0.4,0.4,0.2])
@@ -265,31 +253,8 @@ def generate_widget_config():
             n = subcol2.number_input("Number of Row Entities (m)", min_value=min_row,
                                 max_value=max_row, value=3, step=1, key=f"{i}_nbr_row")
             table = load_table(m, n, i)
-            for col in table.columns:
-                table[col] = table[col].map(str)
-            edited_table = st.data_editor(table,
-                                        key=f"table_editor_{i}",
-                                        column_config={
-                                            f"Column Entity {j}": st.column_config.TextColumn(
-                                                f"Column Entity {j}",
-                                                max_chars=4,
-                                                validate=r"^(?:1000|[1-9]\d{0,2}|0)$",
-                                                required=True,
-                                            )
-                                            for j in range(1, m+1)
-                                        }
-                                        |
-                                        {
-                                            "_index": st.column_config.Column(
-                                                "💡 Hint",
-                                                disabled=True,
-                                            ),
-                                        },
-                                        on_change=partial(
-                                            tchange_callback, table, i),
-                                        )
-            with st.spinner('Updating...'):
-                tchange_callback(edited_table, i)
+            edited_table = int_table_editor(table, f"table_editor_{i}", 0, 1000, help="{column}")
+            setattr(state, f"table_{i}", edited_table)
             col1.write("💡 You may use this to collect tabular inputs (e.g. preference table).")
         else:
             col1.checkbox("Example check box", value=True, 
@@ -319,62 +284,134 @@ def generate_widget_config():
     return widget_config
 
 
+# Sizes (rows, columns) of the test run: the base size, doubled `steps - 1` times along `grow`
+def test_run_sizes(rows, columns, grow, steps):
+    return [(rows * 2**k if grow != "Columns" else rows, columns * 2**k if grow != "Rows" else columns)
+            for k in range(steps)]
+
+
+# Exponent of the cost in the growing size, e.g. "time ∝ rows^1.98"
+def growth_text(runs, grow, column, name):
+    sizes = runs["rows"] if grow != "Columns" else runs["columns"]
+    fit = scaling.fit_power_law(sizes, np.ones(len(runs)), runs[column])
+    if fit is None or fit.a is None:
+        return f"{name}: not enough sizes to fit."
+    size = {"Rows": "rows", "Columns": "columns", "Both": "size"}[grow]
+    return f"{name} ∝ {size}^{fit.a:.2f}"
+
+
+# Test-run controls and report: the algorithm runs as a background job, in a sandboxed process
+def test_run_panel(algorithm, algorithm_name, input_widget_config):
+    col1, col2, col3, col4 = st.columns(4)
+    rows = col1.number_input("Rows (e.g. agents)", min_value=1, max_value=1000, value=10, step=1,
+                             key="test_run_rows", help="Rows of the generated tables, and the value of number inputs.")
+    columns = col2.number_input("Columns (e.g. items)", min_value=1, max_value=1000, value=20, step=1,
+                                key="test_run_columns")
+    grow = col3.selectbox("Grow", ["Rows", "Columns", "Both"], key="test_run_grow",
+                          help="The dimension that doubles from one size to the next.")
+    steps = col4.number_input("Sizes", min_value=1, max_value=8, value=4, step=1, key="test_run_steps")
+    col1, col2, col3, _ = st.columns(4)
+    cpu_seconds = col1.number_input("⏱️ CPU-time limit (seconds)", min_value=1, max_value=60,
+                                    value=sandbox.CPU_SECONDS, step=1, key="test_run_cpu",
+                                    help="For all sizes together.")
+    memory_mb = col2.number_input("🧮 Memory limit (MB)", min_value=64, max_value=2048, value=sandbox.MEMORY_MB,
+                                  step=64, key="test_run_memory")
+    top = col3.number_input("Hotspots", min_value=5, max_value=50, value=sandbox.TOP, step=5, key="test_run_top")
+
+    sizes = test_run_sizes(rows, columns, grow, steps)
+    st.caption("Sizes (rows × columns): " + ", ".join(f"{n} × {m}" for n, m in sizes))
+    run_key = content_hash(algorithm, algorithm_name, input_widget_config, sizes, cpu_seconds, memory_mb, top)
+    if st.button("⏳ Test run"):
+        submit_job(state, "test_run", run_key, sandbox.test_run, algorithm, algorithm_name, input_widget_config,
+                   sizes, cpu_seconds, memory_mb, top, label="The test run", queue="test_runs")
+
+    run = job_result(state, "test_run", run_key)
+    if run is None:
+        return
+    report = run.result
+    if report["error"]:
+        st.error(f"The test run stopped: {report['error']}")
+    if report["limited"] is False:
+        st.warning("The CPU-time and memory limits are not supported on this platform; only the time limit applied.")
+    if report["runs"]:
+        runs = pd.DataFrame(report["runs"])
+        runs["peak MB"] = runs.pop("peak_bytes") / 2**20
+        st.write(f"⏱️ Run time per size (test run took {run.seconds:.1f} s):")
+        st.dataframe(runs, column_config={"seconds": st.column_config.NumberColumn("Seconds", format="%.4f"),
+                                          "peak MB": st.column_config.NumberColumn("Peak MB", format="%.2f")},
+                     hide_index=True)
+        if len(runs) > 1:
+            st.caption(growth_text(runs, grow, "seconds", "Time") + " · "
+                       + growth_text(runs, grow, "peak MB", "Memory"))
+            st.line_chart(runs, x="rows" if grow != "Columns" else "columns", y="seconds")
+    if report["profile"]:
+        n, m = sizes[len(report["runs"]) - 1]
+        st.write(f"🔥 Hotspots at {n} × {m} (time in each function's own code):")
+        st.dataframe(pd.DataFrame(report["profile"]),
+                     column_config={"own_seconds": st.column_config.NumberColumn("Own seconds", format="%.4f"),
+                                    "total_seconds": st.column_config.NumberColumn("Total seconds", format="%.4f")},
+                     hide_index=True)
+    if report["output"]:
+        st.write("🖨️ Printed output:")
+        st.code(report["output"], language="plaintext")
+
+
 # Function to generate code
 def generate_code(algorithm, algorithm_name, input_widget_config):
+    n_tables = list(input_widget_config.values()).count("Table Input")
+    has_tables = n_tables > 0
     # Code template
     code = """
+import cProfile
+import time
+
+import pandas as pd
 import streamlit as st
-    """
-    
-    if "Table Input" in input_widget_config.values():
-        code = """
+"""
+    if has_tables:
+        code += """
 import numpy as np
-import pandas as pd    
-import streamlit as st    
-
-from functools import partial
-
-# NOTE: auxiliary functions (necessary if table inputs are used)
-def load_table(m, n, i): # i-th table
-    if hasattr(st.session_state, f"table_{i}"):
-        table = getattr(st.session_state, f"table_{i}")
-        old_n = table.shape[0]
-        old_m = table.shape[1]
-        if n <= old_n and m <= old_m:
-            setattr(st.session_state, f"table_{i}", table.iloc[:n, :m])
-        elif n > old_n:
-            setattr(st.session_state, f"table_{i}", pd.concat([table, 
-                                                               pd.DataFrame(np.random.randint(1, 100, (n - old_n, m)),
-                                                                            columns=[
-                                                                                f"Column Entity {i+1}" for i in range(m)],
-                                                                            index=[f"Row Entity {i+1}" for i in range(old_n, n)])],
-                                                              axis=0))
-        elif m > old_m:
-            setattr(st.session_state, f"table_{i}", pd.concat([table, 
-                                                               pd.DataFrame(np.random.randint(1, 100, (n, m - old_m)),
-                                                                            columns=[
-                                                                                f"Column Entity {i+1}" for i in range(old_m, m)],
-                                                                            index=[f"Row Entity {i+1}" for i in range(n)])],
-                                                              axis=1))
-        else:
-            raise ValueError("Cannot alter both dimensions of table at the same time.")
-    else:
-        setattr(st.session_state, f"table_{i}", pd.DataFrame(np.random.randint(1, 100, (n, m)), 
-                                                             columns=[f"Column Entity {i+1}" for i in range(m)],
-                                                             index=[f"Row Entity {i+1}" for i in range(n)]))
-    return getattr(st.session_state, f"table_{i}")
 
-
-def tchange_callback(table, i):
-    for col in table.columns:
-        table[col] = table[col].apply(
-            lambda x: int(float(x)))
-    setattr(st.session_state, f"table_{i}", table)
+from core import generators
+"""
+    code += """
+from core.cache import content_hash
+from core.sandbox import hotspots
+from ui.cache import cached
+from ui.state import PageState
+"""
+    if has_tables:
+        code += """from ui.tables import int_table_editor
+from ui.widgets import seed_input
+"""
+    tables = ", ".join(f'"table_{i}"' for i in range(n_tables))
+    code += f"""
+# Tables and results of this page live in their own namespace of the session state; only the input
+# tables are stored compact, the result of the algorithm is kept exactly as it was returned
+state = PageState("{algorithm_name}", tables=[{tables}])
+"""
+    if has_tables:
+        code += """
+# NOTE: auxiliary function (necessary if table inputs are used)
+# The i-th table at size n x m: a seeded random table, keeping the entries edited by hand (until the seed changes)
+def load_table(m, n, i, seed):
+    previous = state.get(f"table_{i}") if state.get(f"table_{i}_seed") == seed else None
+    values = generators.resized(lambda rows, columns: generators.random_valuations(rows, columns, 1, 100, [seed, i]),
+                                n, m, previous)
+    state[f"table_{i}_seed"] = seed
+    return pd.DataFrame(values, columns=[f"Column Entity {j+1}" for j in range(m)],
+                        index=[f"Row Entity {j+1}" for j in range(n)])
+"""
+    code += """
 
 # Input Widgets
 input_data = dict()
+"""
+    if has_tables:
+        code += """seed = seed_input()
 """
 
+    table_index = 0
     for widget_name, widget_type in input_widget_config.items():
         if widget_type == "Text Input":
             code += f"""
@@ -382,7 +419,7 @@ input_data['{widget_name}'] = st.text_input("{widget_name}:")
 """
         elif widget_type == "Number Input":
             code += f"""
-input_data['{widget_name}'] = st.number_input("{widget_name}:")
+input_data['{widget_name}'] = st.number_input("{widget_name}:", step=1)
 """
         elif widget_type == "Slider":
             code += f"""
@@ -393,58 +430,48 @@ input_data['{widget_name}'] = st.slider("{widget_name}:")
 input_data['{widget_name}'] = st.checkbox("{widget_name}")
 """
         elif widget_type == "Table Input":
-            code += """
-i = ... # TODO: replace i with the index of table (ith table; avoid collision of session states).
-
-# adjust limit of table sizes (and row/col names) if necessary.
-min_col, max_col = 2, 100
-min_row, max_row = 2, 100
-
-m = subcol1.number_input("Number of Column Entities (n)",
-                    min_value=min_col, max_value=max_col, step=1, key=f"{i}_nbr_col")
-n = subcol2.number_input("Number of Row Entities (m)", min_value=min_row,
-                    max_value=max_row, value=3, step=1, key=f"{i}_nbr_row")
-
-table = load_table(m, n, i)
-for col in table.columns:
-    table[col] = table[col].map(str)  # map to string for regex verification
-
-edited_table = st.data_editor(table,
-                            key=f"table_editor_{i}",
-                            column_config={
-                                f"Column Entity {j}": st.column_config.TextColumn(
-                                    f"Column Entity {j}",
-                                    max_chars=4,
-                                    validate=r"^(?:1000|[1-9]\d{0,2}|0)$",
-                                    required=True,
-                                )
-                                for j in range(1, m+1)
-                            }
-                            |
-                            {
-                                "_index": st.column_config.Column(
-                                    "💡 Hint",
-                                    disabled=True,
-                                ),
-                            },
-                            on_change=partial(
-                                tchange_callback, table, i),
-                            )            
-"""
             code += f"""
+# {widget_name}: adjust the limits of the table size (and the row/column names) if necessary
+col1, col2 = st.columns(2)
+m = col1.number_input("Number of Column Entities (m)", min_value=2, max_value=100, value=3, step=1,
+                      key="{table_index}_nbr_col")
+n = col2.number_input("Number of Row Entities (n)", min_value=2, max_value=100, value=3, step=1,
+                      key="{table_index}_nbr_row")
+table = load_table(m, n, {table_index}, seed)
+# the editor keeps the values integers in 0-1000, and returns the table as int64
+state["table_{table_index}"] = int_table_editor(table, "table_editor_{table_index}", 0, 1000, help="{{column}}")
+input_data['{widget_name}'] = state["table_{table_index}"].to_numpy(dtype=np.int64, copy=True)
+"""
+            table_index += 1
 
-input_data['{widget_name}'] = edited_table.values # convert pd.dataframe to python lists
-            """
-            
-            
     code += f"""
+
 {algorithm}
 
-# Execute the algorithm function
-result = {algorithm_name}(input_data)
 
-# Display the outputs
-st.write(result)
+# Run the algorithm only when asked; its result is cached on the content of the inputs, across sessions
+run_key = content_hash("{algorithm_name}", input_data)
+if st.button("Run {algorithm_name}"):
+    start = time.perf_counter()
+    state.result = cached(run_key, {algorithm_name}, input_data)
+    state.seconds = time.perf_counter() - start
+    state.run_key = run_key
+
+if state.get("run_key") == run_key:
+    # Display the outputs
+    st.write(state.result)
+    st.caption(f"⏱️ Returned in {{state.seconds:.4f}} seconds (a cached result returns at once).")
+
+    # Timing and profiling panel: a fresh, uncached run under cProfile
+    with st.expander("🔥 Timing and Profile"):
+        if st.button("Profile a fresh run"):
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            profile.runcall({algorithm_name}, input_data)
+            st.write(f"The run took {{time.perf_counter() - start:.4f}} seconds under the profiler.")
+            st.dataframe(pd.DataFrame(hotspots(profile, 15)), hide_index=True)
+elif "run_key" in state:
+    st.info("The inputs changed: click 'Run {algorithm_name}' to run the algorithm on them.")
 """
 
     return code
@@ -0,0 +1,219 @@
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from core import scaling
+from core.benchmark import PAGE_MAX
+from core.tasks import FAIRPYX_TASKS
+from ui.jobs import MAX_CONCURRENT_MEASUREMENTS, measurement_slots
+from ui.state import PageState
+from ui.widgets import seed_input
+
+# task -> label of the algorithm (and its page)
+TASK_LABELS = {
+    "picking": "🍊 Weighted Picking Sequence - WEF(x, 1-x)",
+    "teams": "🔄 Team Distribution - EF[1,1]",
+    "houses": "🏠 Envy-Free House Assignment",
+    "rmm": "⚖️ Rank Maximal Matching",
+} | {function: f"👩‍🎓 Course Allocation - {name}" for function, name in FAIRPYX_TASKS.items()}
+
+
+# Set page configuration
+st.set_page_config(
+    page_title="Scaling Curves",
+    page_icon="📈",
+    layout="wide",
+)
+
+# Tables of this page live in their own namespace of the session state
+state = PageState("scaling_curves")
+
+# Custom CSS styles
+st.markdown(
+    """
+    <style>
+    .header {
+        color: #28517f;
+        font-size: 40px;
+        padding: 20px 0 20px 0;
+        text-align: center;
+        font-weight: bold;
+    }
+    .guide {
+        font-size: 16px;
+        line-height: 1.6;
+        padding: 20px;
+        border-radius: 8px;
+    }
+    </style>
+    """,
+    unsafe_allow_html=True
+)
+
+st.markdown('<h1 class="header">Scaling Curves</h1>', unsafe_allow_html=True)
+
+st.sidebar.title("User Guide")
+st.sidebar.markdown(
+    """
+    <div class="guide" style="background-color: #eef4ff; color: #333333">
+    <p>This page measures how the running time and memory of an algorithm grow with the number of agents (n)
+    and items (m).</p>
+    <ol>
+        <li>Choose an algorithm and the range of sizes to measure.</li>
+        <li>Click 'Measure' - random instances of every size are solved in a background worker,
+        and the curves fill in as the sizes finish. A size that takes longer than a minute is stopped,
+        and 'Stop' ends the measurement at once. Measurements of all users run one at a time; yours
+        waits for a free slot.</li>
+        <li>The fitted exponents estimate the complexity, e.g. time ∝ n<sup>2</sup> m.</li>
+        <li>The suggested limits are the largest sizes that stay within the time and memory budgets
+        on this machine.</li>
+    </ol>
+    </div>
+    """,
+    unsafe_allow_html=True
+)
+
+# Add input components
+task = st.selectbox("Algorithm", list(TASK_LABELS), format_func=TASK_LABELS.get)
+n_cap, m_cap = PAGE_MAX[task]
+
+col1, col2, col3 = st.columns(3)
+n_range = col1.slider("Number of Agents (n)", 2, 2 * n_cap, (max(2, n_cap // 20), n_cap),
+                      help=f"The page accepts up to {n_cap} agents.")
+m_range = col2.slider("Number of Items (m)", 2, 2 * m_cap, (max(3, m_cap // 20), m_cap),
+                      help=f"The page accepts up to {m_cap} items.")
+points = col3.number_input("Sizes per axis", min_value=1, max_value=8, value=3, step=1,
+                           help="Sizes are spread geometrically over each range; 1 keeps that size fixed at its maximum.")
+
+col1, col2, col3 = st.columns(3)
+time_budget = col1.number_input("⏱️ Time budget (seconds)", min_value=0.1, value=5.0, step=0.5,
+                                help="The longest run that is still acceptable on a page.")
+memory_budget = col2.number_input("🧮 Memory budget (MB)", min_value=1, value=512, step=64,
+                                  help="The largest peak memory that is still acceptable on a page.")
+with col3:
+    seed = seed_input()
+
+ns = scaling.size_grid(*n_range, points) if points > 1 else [n_range[1]]
+ms = scaling.size_grid(*m_range, points) if points > 1 else [m_range[1]]
+sizes = [(n, m) for m in ms for n in ns]
+st.caption(f"{len(sizes)} sizes: n ∈ {ns}, m ∈ {ms}.")
+
+
+# Stop the running measurement; sizes already measured are kept
+def stop_run():
+    run = state.get("scaling_run")
+    if run is not None:
+        run["measurement"].stop()
+
+
+col1, col2 = st.columns([0.2, 0.8])
+if col1.button("⏳ Measure"):
+    stop_run()
+    # sizes are measured one at a time in a worker process, away from the app's own threads and memory
+    state.scaling_run = {"task": task,
+                         "measurement": scaling.Measurement(task, sizes, seed, slots=measurement_slots())}
+col2.button("⏹️ Stop", on_click=stop_run)
+
+
+# Measurements finished so far, and whether any size is still pending
+def collect(run):
+    measurement = run["measurement"]
+    records = pd.DataFrame(list(measurement.records), columns=["agents", "items", "seconds", "peak_bytes"])
+    return records, list(measurement.errors), measurement.pending()
+
+
+# Log-log curves of a measure against n, one line per m
+def curve_chart(records, column, title):
+    return alt.Chart(records).mark_line(point=True).encode(
+        x=alt.X("agents:Q", scale=alt.Scale(type="log"), title="Agents (n)"),
+        y=alt.Y(f"{column}:Q", scale=alt.Scale(type="log"), title=title),
+        color=alt.Color("items:N", title="Items (m)"),
+        tooltip=["agents", "items", column],
+    )
+
+
+def exponents_text(fit, name):
+    if fit is None:
+        return f"{name}: not enough sizes to fit."
+    terms = [f"n^{fit.a:.2f}" if fit.a is not None else None, f"m^{fit.b:.2f}" if fit.b is not None else None]
+    return f"{name} ∝ " + " · ".join(term for term in terms if term)
+
+
+# Suggested limit for display; fits are not extrapolated beyond 100x the page limit
+def limit_text(limits, cap):
+    if not limits:
+        return "no growth measured"
+    limit = min(limits)
+    return f"≥ {100 * cap:,}" if limit >= 100 * cap else f"{limit:,}"
+
+
+# Largest sizes within both budgets, at the page's cap of the other size
+def suggested_limits(records, task):
+    n_cap, m_cap = PAGE_MAX[task]
+    time_fit = scaling.fit_power_law(records["agents"], records["items"], records["seconds"])
+    memory_fit = scaling.fit_power_law(records["agents"], records["items"], records["peak_bytes"])
+    limits = []
+    for fit, budget in ((time_fit, time_budget), (memory_fit, memory_budget * 2**20)):
+        if fit is not None:
+            limits.append((fit.limit(budget, m=m_cap), fit.limit(budget, n=n_cap)))
+    n_limits = [n for n, _ in limits if n is not None]
+    m_limits = [m for _, m in limits if m is not None]
+    return time_fit, memory_fit, pd.DataFrame({
+        "Size": ["Agents (n)", "Items (m)"],
+        "Page limit": [n_cap, m_cap],
+        "Suggested limit": [limit_text(n_limits, n_cap), limit_text(m_limits, m_cap)],
+        "At": [f"m = {m_cap}", f"n = {n_cap}"],
+    })
+
+
+def show_run():
+    run = state.get("scaling_run")
+    if run is None:
+        return
+    records, errors, pending = collect(run)
+    measurement = run["measurement"]
+    total = len(measurement.sizes)
+    if pending and measurement.waiting:
+        st.info(f"⏳ {TASK_LABELS[run['task']]}: waiting for other measurements to finish "
+                f"(at most {MAX_CONCURRENT_MEASUREMENTS} run at a time)...")
+    # failed and skipped sizes count as done, so the bar always ends full
+    st.progress(measurement.finished / total,
+                text=f"{TASK_LABELS[run['task']]}: {measurement.finished} of {total} sizes done, "
+                     f"{len(records)} measured" + ("..." if pending else "."))
+    for error in errors:
+        st.error(error)
+    if records.empty:
+        return
+
+    records["peak_mb"] = records["peak_bytes"] / 2**20
+    col1, col2 = st.columns(2)
+    col1.altair_chart(curve_chart(records, "seconds", "Time (seconds)"), width="stretch")
+    col2.altair_chart(curve_chart(records, "peak_mb", "Peak memory (MB)"), width="stretch")
+
+    time_fit, memory_fit, limits = suggested_limits(records, run["task"])
+    st.write("📐 Fitted complexity:")
+    st.markdown(f"- {exponents_text(time_fit, 'Time')}\n- {exponents_text(memory_fit, 'Memory')}")
+    st.write(f"🛡️ Suggested limits for a {time_budget:g} s / {memory_budget} MB budget on this machine:")
+    st.dataframe(limits, hide_index=True)
+    with st.expander("Measurements"):
+        st.dataframe(records.drop(columns="peak_bytes"), hide_index=True)
+
+    if not pending and run.get("polling"):
+        # all sizes are measured: stop polling
+        run["polling"] = False
+        st.rerun(scope="app")
+
+
+# While sizes are pending, the results are refreshed every second without rerunning the page
+run = state.get("scaling_run")
+if run is not None:
+    run["polling"] = run["measurement"].pending()
+    st.fragment(show_run, run_every=1.0 if run["polling"] else None)()
+
+hide_streamlit_style = """
+    <style>
+        #MainMenu {visibility: hidden;}
+        footer {visibility: hidden;}
+    </style>
+"""
+st.markdown(hide_streamlit_style, unsafe_allow_html=True)
@@ -0,0 +1,30 @@
+import streamlit as st
+
+from core.cache import LRUCache, content_hash
+
+# Memory the cached results of all sessions may take together
+CACHE_BYTES = 256 * 2**20
+
+
+# The server's result cache, shared by every session
+@st.cache_resource
+def result_cache():
+    return LRUCache(CACHE_BYTES)
+
+
+# Cache key of function(...) run for the inputs `key` (a content hash of everything the call depends on)
+def cache_key(function, key):
+    return content_hash(function.__module__, function.__qualname__, key)
+
+
+# function(*args, **kwargs), computed once per inputs `key` across all sessions
+def cached(key, function, *args, **kwargs):
+    return result_cache().get_or_compute(cache_key(function, key), function, *args, **kwargs)
+
+
+# Sidebar caption with the counters of the result cache
+def cache_report(container=st.sidebar):
+    stats = result_cache().stats()
+    container.caption(f"♻️ Shared result cache: {stats['entries']} results, {stats['bytes'] / 2**20:.1f} of "
+                      f"{stats['max_bytes'] / 2**20:.0f} MB, {stats['hits']} hits, {stats['misses']} misses, "
+                      f"{stats['evictions']} evictions.")
@@ -0,0 +1,42 @@
+import gzip
+
+import streamlit as st
+
+from core.formats import FORMATS, write_table
+
+
+# Sidebar options shared by all downloads of the page: table file format and gzip compression
+def download_options(container=st.sidebar):
+    # re-assign the keyed values so they survive switching between pages
+    st.session_state.download_format = st.session_state.get("download_format", "CSV")
+    st.session_state.gzip_downloads = st.session_state.get("gzip_downloads", False)
+    container.selectbox("💾 Table download format", list(FORMATS), key="download_format",
+                        help="Parquet, Arrow IPC and NumPy (.npz) files keep the column types and are "
+                             "much faster to load back than CSV. All of them can be uploaded again.")
+    container.checkbox("🗜️ Compress downloads (gzip)", key="gzip_downloads",
+                       help="Downloads are served as .gz files, which is much smaller for large tables.")
+
+
+# Download button backed by a callable: `make` (returning str or bytes) runs only when the button is clicked,
+# so nothing is encoded or sent to the browser on reruns
+def download_button(label, make, file_name, mime, container=st):
+    compress = st.session_state.get("gzip_downloads", False)
+
+    def data():
+        content = make()
+        if isinstance(content, str):
+            content = content.encode()
+        return gzip.compress(content) if compress else content
+
+    if compress:
+        file_name, mime = file_name + ".gz", "application/gzip"
+    container.download_button(label, data, file_name=file_name, mime=mime, on_click="ignore")
+
+
+# Download button for a table in the format chosen in the sidebar, e.g. "preferences" -> preferences.parquet.
+# `table` may also be a callable returning the table, so that it is only built when clicked.
+def download_table(label, table, name, container=st):
+    fmt = st.session_state.get("download_format", "CSV")
+    extension, mime = FORMATS[fmt]
+    download_button(f"{label} {fmt}", lambda: write_table(table() if callable(table) else table, fmt),
+                    f"{name}.{extension}", mime, container)
@@ -0,0 +1,27 @@
+import streamlit as st
+
+from ui.downloads import download_button
+
+EXPLANATION_LINES_PER_PAGE = 50
+
+
+# Expander showing an explanation (see core.explain) a page of lines at a time. Nothing is built while
+# the expander is closed, and the full text only when it is downloaded.
+def explanation_expander(label, explanation, file_name, key, expanded=False):
+    expander = st.expander(label, expanded=expanded, key=key, on_change="rerun")
+    if not expander.open:
+        return
+    with expander:
+        n_pages = max(1, -(-len(explanation) // EXPLANATION_LINES_PER_PAGE))
+        page = 1
+        if n_pages > 1:
+            page_key = f"{key}_page"
+            # a new outcome may have fewer pages than the one browsed before
+            if st.session_state.get(page_key, 1) > n_pages:
+                st.session_state[page_key] = 1
+            page = st.number_input(f"Page (of {n_pages}, {EXPLANATION_LINES_PER_PAGE} lines each)",
+                                   min_value=1, max_value=n_pages, step=1, key=page_key)
+        download_button("Download Full Explanations", explanation.text, file_name, "text/plain")
+        start = (page - 1) * EXPLANATION_LINES_PER_PAGE
+        st.markdown("\n\n".join(explanation.lines(start, start + EXPLANATION_LINES_PER_PAGE)),
+                    unsafe_allow_html=True)
@@ -0,0 +1,71 @@
+import numpy as np
+import streamlit as st
+
+# Above this many cells the preview is drawn as an image instead of a styled table
+MAX_STYLED_CELLS = 20000
+# Largest side (in cells) of the downsampled heatmap image
+MAX_HEATMAP_SIDE = 500
+# Smallest side (in pixels) of the heatmap image, so thin tables stay visible
+MIN_HEATMAP_PIXELS = 120
+
+HEATMAP_RGB = (67, 147, 195)
+
+
+# Color strength of every cell: 1 for the best (lowest) rank, fading towards the worst rank
+def rank_strengths(values):
+    values = np.asarray(values, dtype=np.int64)
+    if values.size == 0:
+        return np.zeros(values.shape)
+    max_val = values.max()
+    min_val = values.min()
+    span = max_val - min_val + 1
+    return (max_val - values) / span
+
+
+# CSS of every cell, built for the whole matrix at once: one style per distinct value, then a lookup
+def rank_styles(values):
+    values = np.asarray(values, dtype=np.int64)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    styles = []
+    for strength in rank_strengths(distinct):
+        color = f"rgba(67, 147, 195, {strength:.3f})"
+        styles.append(f"background-color: {color}; border-bottom: {int(10 * strength)}px solid {color}")
+    return np.array(styles, dtype=object)[inverse].reshape(values.shape)
+
+
+# Mean of each block of cells, so that no side is longer than max_side
+def downsample(values, max_side=MAX_HEATMAP_SIDE):
+    for axis in (0, 1):
+        size = values.shape[axis]
+        if size > max_side:
+            edges = np.linspace(0, size, max_side + 1).astype(np.int64)[:-1]
+            counts = np.diff(np.append(edges, size))
+            values = np.add.reduceat(values, edges, axis=axis)
+            values = values / (counts[:, None] if axis == 0 else counts[None, :])
+    return values
+
+
+# RGB image of the rank strengths, blended over a white background
+def heatmap_image(values, max_side=MAX_HEATMAP_SIDE):
+    strengths = downsample(rank_strengths(values), max_side)
+    rows, cols = strengths.shape
+    strengths = np.repeat(strengths, -(-MIN_HEATMAP_PIXELS // rows), axis=0)
+    strengths = np.repeat(strengths, -(-MIN_HEATMAP_PIXELS // cols), axis=1)
+    rgb = np.array(HEATMAP_RGB, dtype=np.float64)
+    image = 255 * (1 - strengths[..., None]) + rgb * strengths[..., None]
+    return image.round().astype(np.uint8)
+
+
+# Colored ranking table (preview): a styled table for small tables, a heatmap image for large ones
+def show_ranking_preview(table, max_styled_cells=MAX_STYLED_CELLS):
+    values = table.to_numpy(dtype=np.int64)
+    if values.size <= max_styled_cells:
+        styles = rank_styles(values)
+        st.dataframe(table.style.apply(lambda _: styles, axis=None))
+        return
+
+    n, m = values.shape
+    st.image(heatmap_image(values), width="stretch")
+    st.caption(f"The table has {n} × {m} cells, so it is shown as a heatmap "
+               f"(rows: {table.index[0]} … {table.index[-1]}, columns: {table.columns[0]} … {table.columns[-1]}); "
+               "darker cells are better ranks, and each pixel averages a block of cells.")
@@ -0,0 +1,25 @@
+import streamlit as st
+
+from core import imports
+
+
+# Import the heavy solver libraries in a background thread, once per server (its first session)
+@st.cache_resource
+def warm_up():
+    return imports.warm_up()
+
+
+# Sidebar caption with the import times of the libraries a page depends on
+def import_report(names, container=st.sidebar):
+    lines = []
+    for name in names:
+        timing = imports.import_time(name)
+        if timing is not None:
+            seconds, thread = timing
+            lines.append(f"{name} imported in {seconds:.2f} s "
+                         f"({'background warm-up' if thread == 'warm-up' else 'on first use'})")
+        elif warm_up().is_alive():
+            lines.append(f"{name} is loading in the background")
+        else:
+            lines.append(f"{name} loads on the first run")
+    container.caption("📦 " + "; ".join(lines) + ".")
@@ -0,0 +1,94 @@
+import threading
+
+import streamlit as st
+
+from core.jobs import JobQueue
+from ui.cache import cache_key, result_cache
+
+# Algorithm runs executing at the same time, across all sessions of the server
+MAX_CONCURRENT_JOBS = 2
+# Test runs of contributed code (the Create Your Own App page) have their own queue, so that they never
+# hold the slots of the algorithm pages
+MAX_CONCURRENT_TEST_RUNS = 1
+QUEUE_WORKERS = {"algorithms": MAX_CONCURRENT_JOBS, "test_runs": MAX_CONCURRENT_TEST_RUNS}
+# Scaling measurements (the Scaling Curves page) running at the same time, across all sessions of the server
+MAX_CONCURRENT_MEASUREMENTS = 1
+POLL_SECONDS = 0.5
+
+
+# The server's job queue of that name, shared by every session
+@st.cache_resource
+def job_queue(name="algorithms"):
+    return JobQueue(QUEUE_WORKERS[name])
+
+
+# Slots of the scaling measurements, shared by every session (see core.scaling.Measurement)
+@st.cache_resource
+def measurement_slots():
+    return threading.BoundedSemaphore(MAX_CONCURRENT_MEASUREMENTS)
+
+
+# Run function(*args) as a background job of the page; its result belongs to the inputs `key`
+# (a content hash of everything the call depends on), and replaces any earlier run stored under `name`.
+# When any session already ran the function for these inputs, its finished job is reused from the cache.
+# `queue` names the job queue (see QUEUE_WORKERS) the job waits in.
+def submit_job(state, name, key, function, *args, label="", queue="algorithms", **kwargs):
+    previous = state.get(name)
+    if previous is not None and previous["job"] is not None:
+        job_queue(previous["queue"]).cancel(previous["job"])
+    entry = {"key": key, "job": None, "result": None, "error": None, "queue": queue,
+             "cache_key": cache_key(function, key), "cached": False}
+    entry["result"] = result_cache().get(entry["cache_key"])
+    if entry["result"] is None:
+        entry["job"] = job_queue(queue).submit(function, *args, label=label, **kwargs)
+    else:
+        entry["cached"] = True
+    state[name] = entry
+
+
+# The finished job of the page stored under `name`, if it was run for the inputs `key`; None otherwise.
+# While the job is pending, its status is shown in a fragment that polls the queue and reruns the
+# page once the job finishes; the finished job is then attached to the session.
+def job_result(state, name, key):
+    entry = state.get(name)
+    if entry is None or entry["key"] != key:
+        return None
+    if entry["error"] is not None:
+        st.error(f"The run failed: {entry['error']}")
+    if entry["cached"]:
+        st.caption("♻️ These inputs were solved before; the outcome is reused from the server's cache.")
+    if entry["job"] is None:
+        return entry["result"]
+
+    job = job_queue(entry["queue"]).get(entry["job"])
+    if job is None:
+        return None
+    if job.done():
+        entry["job"] = None
+        if job.status == "failed":
+            entry["error"] = job.error
+            st.error(f"The run failed: {job.error}")
+        elif job.status == "done":
+            entry["result"] = job
+            result_cache().put(entry["cache_key"], job)
+        return entry["result"]
+
+    st.fragment(_job_status, run_every=POLL_SECONDS)(job.id, entry["queue"])
+    return None
+
+
+def _job_status(job_id, queue_name):
+    queue = job_queue(queue_name)
+    job = queue.get(job_id)
+    if job is None or job.done():
+        st.rerun(scope="app")
+    if job.status == "queued":
+        ahead = queue.position(job_id)
+        st.info(f"⏳ {job.label} is queued (job {job.id}, {ahead} job(s) ahead, "
+                f"at most {queue.max_workers} run at a time)...")
+        if st.button("Cancel", key=f"cancel_{job_id}"):
+            queue.cancel(job_id)
+            st.rerun(scope="app")
+    else:
+        st.info(f"⏳ {job.label} is running (job {job.id}, {job.seconds:.1f} s)... "
+                "You can keep editing the page meanwhile.")
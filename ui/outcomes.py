@@ -0,0 +1,91 @@
+import json
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from ui.downloads import download_button, download_table
+
+OUTCOME_ROWS_PER_PAGE = 25
+# Outcomes with more rows are only offered for download as JSON, not displayed
+JSON_DISPLAY_ROWS = 100
+
+
+# Rows of the table with `query` in one of the columns: a number matches whole numbers only (item 1 is not
+# item 12), any other text is a case-insensitive substring
+def search(table, columns, query):
+    query = query.strip()
+    if not query:
+        return table
+    pattern = rf"(?<!\d){query}(?!\d)" if query.isdigit() else re.escape(query)
+    mask = pd.Series(False, index=table.index)
+    for column in columns:
+        mask |= table[column].astype(str).str.contains(pattern, case=False, regex=True)
+    return table[mask]
+
+
+# Summary statistics of the numeric columns, e.g. "Items: mean 4.2, min 3, max 5"
+def summary_text(table, columns):
+    parts = [f"{len(table)} rows"]
+    for column in columns:
+        values = table[column]
+        if len(values):
+            parts.append(f"{column}: mean {values.mean():.2f}, min {values.min()}, max {values.max()}")
+    return " · ".join(parts)
+
+
+# Outcome table of which only one page of rows is sent to the browser, with summary statistics of the
+# `stat_columns`. Rows can be searched and sorted on the server: by the table order (e.g. by agent)
+# or by any of the `stat_columns`. `style` optionally maps a cell value to its CSS style.
+def outcome_viewer(table, key, stat_columns=(), column_config=None, style=None):
+    st.caption(summary_text(table, stat_columns))
+    if len(table) > OUTCOME_ROWS_PER_PAGE:
+        col1, col2, col3 = st.columns([0.4, 0.3, 0.3])
+        query = col1.text_input("🔍 Search", key=f"{key}_search",
+                                placeholder=f"{table.columns[0]} or {table.columns[1]}...")
+        order = [table.columns[0]] + list(stat_columns)
+        sort_by = col2.selectbox("Sort by", order, key=f"{key}_sort")
+        descending = col3.toggle("Descending", key=f"{key}_descending")
+        rows = search(table, table.columns[:2], query)
+        if sort_by == table.columns[0]:
+            rows = rows.iloc[::-1] if descending else rows
+        else:
+            rows = rows.sort_values(sort_by, ascending=not descending, kind="stable")
+
+        n_pages = max(1, -(-len(rows) // OUTCOME_ROWS_PER_PAGE))
+        page_key = f"{key}_page"
+        # a new search may match fewer pages than the one browsed before
+        if st.session_state.get(page_key, 1) > n_pages:
+            st.session_state[page_key] = 1
+        page = st.number_input(f"Page (of {n_pages}, {len(rows)} matching rows)", min_value=1, max_value=n_pages,
+                               step=1, key=page_key)
+        table = rows.iloc[(page - 1) * OUTCOME_ROWS_PER_PAGE:page * OUTCOME_ROWS_PER_PAGE]
+    st.dataframe(table.style.map(style) if style is not None else table, column_config=column_config,
+                 hide_index=True)
+
+
+# JSON download of the outcomes {first column: second column}; the JSON is built when it is downloaded,
+# and only displayed for small outcomes
+def show_outcomes_json(table):
+    def make():
+        return json.dumps({str(key): value for key, value in table.iloc[:, :2].to_numpy()}, indent=4)
+
+    st.markdown("### Download Outcomes as JSON")
+    download_button("Download Outcomes JSON", make, "outcomes.json", "application/json")
+    if len(table) <= JSON_DISPLAY_ROWS:
+        st.json(make())
+    else:
+        st.caption(f"The JSON of {len(table)} rows is too large to display; download it instead.")
+
+
+# Outcome bundles {agent: items} (0-based) as a long-form table of 1-based (agent, item) integer rows, one per
+# allocated item: every download format keeps its types, and core.formats.read_table reads it back as it was
+def assignment_table(bundles, agent="Agent", item="Item"):
+    pairs = [(key, value) for key, values in bundles.items() for value in values]
+    return pd.DataFrame(np.array(pairs, dtype=np.int64).reshape(-1, 2) + 1, columns=[agent, item])
+
+
+# Download button of the outcome bundles as an (agent, item) table, which is only built when clicked
+def download_outcomes(bundles, agent="Agent", item="Item"):
+    download_table("Download Outcomes", lambda: assignment_table(bundles, agent, item), "outcomes")
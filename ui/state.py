@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Integer dtypes tables are stored with, smallest first (ranks fit int16, values int32)
+COMPACT_DTYPES = (np.int16, np.int32, np.int64)
+
+
+# Smallest integer dtype that holds every value of an integer array
+def compact_dtype(values):
+    if values.size == 0:
+        return COMPACT_DTYPES[0]
+    low, high = values.min(), values.max()
+    for dtype in COMPACT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return values.dtype
+
+
+# Integer tables / arrays with the smallest sufficient dtype; other values as they are
+def compact(value):
+    if isinstance(value, pd.DataFrame) and len(value.columns) \
+            and all(pd.api.types.is_integer_dtype(dtype) for dtype in value.dtypes):
+        return value.astype(compact_dtype(value.to_numpy()), copy=False)
+    if isinstance(value, np.ndarray) and np.issubdtype(value.dtype, np.integer):
+        return value.astype(compact_dtype(value), copy=False)
+    return value
+
+
+# Bytes held by tables and arrays inside a value (containers are walked; other objects are not counted)
+def nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(nbytes(item) for item in value)
+    return 0
+
+
+# Session state of one page: its keys live in their own namespace (st.session_state.pages[page]),
+# so pages that use the same names (e.g. "preferences") never see each other's tables.
+# Supports the same attribute / item access as st.session_state.
+# Only the keys named in `tables` - the page's input tables - are stored compact (see `compact`); every other
+# value (results, seeds, jobs, memos) is stored exactly as given, so e.g. a result keeps its dtypes.
+class PageState:
+    def __init__(self, page, tables=()):
+        pages = st.session_state.setdefault("pages", {})
+        object.__setattr__(self, "page", page)
+        object.__setattr__(self, "tables", frozenset(tables))
+        object.__setattr__(self, "_data", pages.setdefault(page, {}))
+
+    def __getattr__(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(f"{self.page} state has no key {name!r}")
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __getitem__(self, name):
+        return self._data[name]
+
+    def __setitem__(self, name, value):
+        self._data[name] = compact(value) if name in self.tables else value
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def get(self, name, default=None):
+        return self._data.get(name, default)
+
+    def setdefault(self, name, default):
+        return self._data.setdefault(name, default)
+
+    def pop(self, name, default=None):
+        return self._data.pop(name, default)
+
+    # Bytes held by this page's tables
+    def memory(self):
+        return nbytes(self._data)
+
+
+# Bytes held by the tables of all pages in this session
+def session_memory():
+    return nbytes(st.session_state.get("pages", {}))
+
+
+# Sidebar note with the memory held by the page's tables
+def memory_report(state, container=st.sidebar):
+    container.caption(f"🧮 Session tables: {state.memory() / 2**20:.2f} MB on this page, "
+                      f"{session_memory() / 2**20:.2f} MB across all pages.")
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from core.ingest import TableError, read_int_table
+
+DEFAULT_HINT = "Support copy-paste from Excel sheets and bulk edits"
+
+
+# Integer column for st.data_editor: the editor itself enforces the range, and values stay ints
+def int_column(label, help, min_value, max_value):
+    return st.column_config.NumberColumn(label, help=help, min_value=min_value, max_value=max_value,
+                                         step=1, format="%d", required=True)
+
+
+# Column config of an integer table; `label` and `help` may use {column} for the column name
+def int_columns(columns, min_value, max_value, help, label="{column}", hint=DEFAULT_HINT):
+    return {
+        column: int_column(label.format(column=column), help.format(column=column), min_value, max_value)
+        for column in columns
+    } | {
+        "_index": st.column_config.Column("💡 Hint", help=hint, disabled=True),
+    }
+
+
+# Columns whose cells were changed in the data editor `key` (from the editor's own edit record)
+def edited_columns(key):
+    state = st.session_state.get(key) or {}
+    return {column for row in state.get("edited_rows", {}).values() for column in row}
+
+
+# Convert an edited table back to int64, touching only the edited (or non-integer) columns,
+# and check the range of the whole table at once. Reports the first offending cell and stops.
+def to_int_table(table, min_value, max_value, key=None):
+    changed = edited_columns(key) if key is not None else set()
+    changed |= {column for column, dtype in table.dtypes.items() if not pd.api.types.is_integer_dtype(dtype)}
+    changed = [column for column in table.columns if column in changed]
+
+    if changed:
+        values = table[changed].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        bad = np.isnan(values) | (values != np.round(values))
+        if bad.any():
+            row, col = np.argwhere(bad)[0]
+            st.error(f"{table.index[row]}, {changed[col]}: please enter a whole number "
+                     f"between {min_value} and {max_value}.")
+            st.stop()
+        table = table.copy()
+        table[changed] = values.astype(np.int64)
+
+    values = table.to_numpy(dtype=np.int64)
+    bad = (values < min_value) | (values > max_value)
+    if bad.any():
+        row, col = np.argwhere(bad)[0]
+        st.error(f"{table.index[row]}, {table.columns[col]}: {values[row, col]} is outside "
+                 f"the allowed range {min_value}-{max_value}.")
+        st.stop()
+    return table
+
+
+# st.data_editor over an integer table; returns the edited table as int64
+def int_table_editor(table, key, min_value, max_value, help, label="{column}", hint=DEFAULT_HINT, **kwargs):
+    edited = st.data_editor(table.astype(np.int64, copy=False), key=key,
+                            column_config=int_columns(table.columns, min_value, max_value, help, label, hint),
+                            **kwargs)
+    return to_int_table(edited, min_value, max_value, key)
+
+
+# Read and validate an uploaded integer table (see core.ingest.read_int_table); reports the offending
+# row / column and stops. `index` / `columns` relabel the table after loading.
+def read_upload(upload, name, shape=(None, None), min_value=None, max_value=None, index=None, columns=None, **kwargs):
+    try:
+        table = read_int_table(upload, shape, min_value=min_value, max_value=max_value, **kwargs)
+    except TableError as e:
+        st.error(f"The uploaded {name} file is invalid: {e}.")
+        st.stop()
+    if index is not None:
+        table.index = index
+    if columns is not None:
+        table.columns = columns
+    return table
@@ -0,0 +1,18 @@
+import streamlit as st
+
+DEFAULT_SEED = 0
+
+
+# Random seed input - one seed is shared by all pages, so any random instance can be regenerated exactly
+def seed_input(container=st):
+    # re-assign the keyed value so it survives switching between pages
+    st.session_state.seed = st.session_state.get("seed", DEFAULT_SEED)
+    container.number_input("🎲 Random Seed", min_value=0, max_value=2**32 - 1, step=1, key="seed",
+                           help="Random tables are generated from this seed. "
+                                "Enter the same seed and sizes to regenerate the same data.")
+    return int(st.session_state.seed)
+
+
+# Shuffle Callback: used in Streamlit widget on_click - moves on to the next seed
+def next_seed():
+    st.session_state.seed = st.session_state.get("seed", DEFAULT_SEED) + 1